@@ -1,6 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
 import numpy as np
-from scipy.stats import spearmanr
-import copy
+from extract_data import DestinationTable
 import methods.topsis as topsis
 import methods.rsm as rsm
 import methods.UTA as UTA
@@ -32,71 +33,267 @@ def generate_ahp_comparisons(weights):
     return comparisons
 
 
-def perform_analysis(data, lower, upper, weights, benefits):
-    rankings = {}
-    num_criteria = len(data[0]) - 1
+def _run_topsis(data, is_table, lower, upper, weights, benefits, top_k=None):
+    if is_table:
+        return get_ids(topsis.topsis_table(data, lower, upper, weights, benefits, top_k))
+    return get_ids(topsis.topsis(data, lower, upper, weights, benefits, top_k))
 
-    # 1. TOPSIS
-    try:
-        rankings['TOPSIS'] = get_ids(topsis.topsis(copy.deepcopy(data), lower, upper, weights, benefits))
-    except Exception as e:
-        print(f"TOPSIS error: {e}")
-        rankings['TOPSIS'] = []
 
-    # 2. RSM
-    try:
-        is_active = [1] * len(weights)
-        rankings['RSM'] = get_ids(rsm.rsm(copy.deepcopy(data), lower, upper, is_active, benefits))
-    except Exception as e:
-        print(f"RSM error: {e}")
-        rankings['RSM'] = []
+def _run_rsm(data, is_table, lower, upper, weights, benefits, top_k=None):
+    is_active = [1] * len(weights)
+    if is_table:
+        return get_ids(rsm.rsm_table(data, lower, upper, is_active, benefits, top_k))
+    return get_ids(rsm.rsm(data, lower, upper, is_active, benefits, top_k))
+
+
+def _run_uta(data, is_table, lower, upper, weights, benefits, top_k=None):
+    comps = [5] * len(weights)
+    if is_table:
+        u_ids = UTA.UTA_star_table(data, lower, upper, weights, benefits, comps, top_k)
+        return u_ids if isinstance(u_ids, list) else []
+    u_idx = UTA.UTA_star(data, lower, upper, weights, benefits, comps, top_k)
+    if isinstance(u_idx, list):
+        return [int(data[i][0]) for i in u_idx if i < len(data)]
+    return []
+
+
+def _run_ahp(data, is_table, lower, upper, weights, benefits, top_k=None):
+    crit_idxs = list(range(len(weights)))
+    ahp_comparisons = generate_ahp_comparisons(weights)
+    if is_table:
+        return get_ids(AHP.ahp_table(data, lower, upper, crit_idxs, ahp_comparisons, benefits, top_k=top_k))
+    return get_ids(AHP.ahp(data, lower, upper, crit_idxs, ahp_comparisons, benefits, top_k=top_k))
+
+
+def _run_sp_cs(data, is_table, lower, upper, weights, benefits, top_k=None):
+    # The three most important criteria
+    if len(weights) > 3:
+        sorted_indices = np.argsort(weights)[::-1]
+        selected_crit_idxs = sorted_indices[:3].tolist()
+    else:
+        selected_crit_idxs = list(range(len(weights)))
+
+    if is_table:
+        return get_ids(Sp_Cs.sp_cs_table(data, lower, upper, selected_crit_idxs, benefits, top_k=top_k))
+    return get_ids(Sp_Cs.sp_cs(data, lower, upper, selected_crit_idxs, benefits, top_k=top_k))
+
+
+# Methods compared by perform_analysis, in the order of its results
+METHOD_RUNNERS = {
+    'TOPSIS': _run_topsis,
+    'RSM': _run_rsm,
+    'UTA': _run_uta,
+    'AHP': _run_ahp,
+    'SP-CS': _run_sp_cs,
+}
+
+# Executor of every method in the "auto" mode: threads for the NumPy-bound methods (which release the GIL),
+# processes for the ones that spend their time in Python loops or Qhull
+METHOD_EXECUTORS = {
+    'TOPSIS': 'thread',
+    'RSM': 'process',
+    'UTA': 'thread',
+    'AHP': 'thread',
+    'SP-CS': 'process',
+}
+
+# Seconds between two checks of the running methods
+POLL_SECONDS = 0.01
+
+
+def _share_array(array):
+    """Copy an array into a new shared memory block; returns the block and the (name, shape, dtype) to attach it."""
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
 
-    # 3. UTA
+def _run_shared(name, ids_block, matrix_block, lower, upper, weights, benefits, top_k=None):
+    """Worker process: run one method on a DestinationTable over the shared ids and matrix."""
+    from multiprocessing import shared_memory
+
+    blocks = [shared_memory.SharedMemory(name=block[0]) for block in (ids_block, matrix_block)]
     try:
-        comps = [5] * num_criteria
-        u_idx = UTA.UTA_star(copy.deepcopy(data), lower, upper, weights, benefits, comps)
-        if isinstance(u_idx, list):
-            u_ids = [int(data[i][0]) for i in u_idx if i < len(data)]
-            rankings['UTA'] = u_ids
-        else:
-            rankings['UTA'] = []
-    except Exception as e:
-        print(f"UTA error: {e}")
-        rankings['UTA'] = []
+        ids, matrix = [np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                       for shm, (_, shape, dtype) in zip(blocks, (ids_block, matrix_block))]
+        table = DestinationTable([], [], ids, matrix, np.full(len(ids), "", dtype=object),
+                                 np.full(len(ids), "", dtype=object))
+        try:
+            return METHOD_RUNNERS[name](table, True, lower, upper, weights, benefits, top_k)
+        finally:
+            # Views of the blocks must be gone before closing them
+            del table, ids, matrix
+    finally:
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:
+                # Still viewed, e.g. by the frames of the traceback of a failed method: the block is unmapped
+                # when the process exits, and the method error (if any) propagates unchanged
+                pass
 
-    # 4. AHP (FIXED)
+
+def _process_worker(connection, name, ids_block, matrix_block, *args):
+    """Process of one method: sends ('ok', ranking) or ('error', message) back through the connection."""
     try:
-        crit_idxs = list(range(num_criteria))
-        ahp_comparisons = generate_ahp_comparisons(weights)
-
-        # Verify function exists and call it
-        if hasattr(AHP, 'ahp'):
-            rankings['AHP'] = get_ids(AHP.ahp(copy.deepcopy(data), lower, upper, crit_idxs, ahp_comparisons, benefits))
-        else:
-            print("AHP module missing 'ahp' function.")
-            rankings['AHP'] = []
+        connection.send(('ok', _run_shared(name, ids_block, matrix_block, *args)))
     except Exception as e:
-        print(f"AHP error: {e}")
-        rankings['AHP'] = []
+        connection.send(('error', str(e)))
+    finally:
+        connection.close()
+
+
+def _run_started(started, name, runner, *args):
+    """Thread pool worker: remember when the method starts, its timeout counts from there."""
+    started[name] = time.monotonic()
+    return runner(*args)
+
+
+def _run_methods(data, lower, upper, weights, benefits, executor, timeout, max_workers, top_k=None):
+    """Rankings of every method of METHOD_RUNNERS, run with the given executor mode (see perform_analysis)."""
+    is_table = isinstance(data, DestinationTable)
+    if is_table:
+        # Every method ranks the same content, even if the table changes meanwhile
+        data = data.snapshot()
+    args = (lower, upper, weights, benefits, top_k)
+    rankings = {}
+
+    if executor == 'serial':
+        for name, runner in METHOD_RUNNERS.items():
+            try:
+                rankings[name] = runner(data, is_table, *args)
+            except Exception as e:
+                print(f"{name} error: {e}")
+                rankings[name] = []
+        return rankings
 
-    # 5. SP-CS
+    if executor not in ('thread', 'process', 'auto'):
+        raise ValueError(f"Unknown executor mode: {executor}")
+    modes = {name: (METHOD_EXECUTORS[name] if executor == 'auto' else executor) for name in METHOD_RUNNERS}
+    thread_names = [name for name in METHOD_RUNNERS if modes[name] == 'thread']
+    process_names = [name for name in METHOD_RUNNERS if modes[name] == 'process']
+
+    pool = None
+    blocks = []
+    futures = {}
+    started = {}
+    processes = {}
     try:
-        if num_criteria > 3:
-            sorted_indices = np.argsort(weights)[::-1]
-            selected_crit_idxs = sorted_indices[:3].tolist()
-        else:
-            selected_crit_idxs = list(range(num_criteria))
-
-        if hasattr(Sp_Cs, 'sp_cs'):
-            rankings['SP-CS'] = get_ids(Sp_Cs.sp_cs(copy.deepcopy(data), lower, upper, selected_crit_idxs, benefits))
-        elif hasattr(Sp_Cs, 'ranking_multidimensional'):
-            rankings['SP-CS'] = get_ids(
-                Sp_Cs.ranking_multidimensional(copy.deepcopy(data), lower, upper, weights, benefits))
-        else:
-            rankings['SP-CS'] = []
-    except Exception as e:
-        print(f"SP-CS error: {e}")
-        rankings['SP-CS'] = []
+        if thread_names:
+            pool = ThreadPoolExecutor(max_workers=max_workers or len(thread_names))
+            for name in thread_names:
+                futures[name] = pool.submit(_run_started, started, name, METHOD_RUNNERS[name], data, is_table, *args)
+
+        if process_names:
+            # multiprocessing is only imported when processes are used
+            import multiprocessing
+            from multiprocessing.connection import wait
+
+            # The processes attach the data from shared memory instead of receiving a pickled copy
+            if is_table:
+                ids, matrix = data.ids, data.matrix
+            else:
+                rows = np.asarray(data)
+                ids = rows[:, 0].astype(np.int64)
+                matrix = np.ascontiguousarray(rows[:, 1:], dtype=np.float64)
+            ids_shm, ids_block = _share_array(ids)
+            blocks.append(ids_shm)
+            matrix_shm, matrix_block = _share_array(matrix)
+            blocks.append(matrix_shm)
+
+        # One process per method, at most max_workers at a time: a method that times out is terminated
+        waiting = list(process_names)
+        pending = set(METHOD_RUNNERS)
+        while pending:
+            while waiting and len(processes) < (max_workers or len(process_names)):
+                name = waiting.pop(0)
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=_process_worker, daemon=True,
+                                                  args=(sender, name, ids_block, matrix_block) + args)
+                process.start()
+                sender.close()
+                # The timeout of a method counts from its start
+                processes[name] = (process, receiver, time.monotonic())
+
+            now = time.monotonic()
+            for name, (process, receiver, start) in list(processes.items()):
+                if receiver.poll():
+                    try:
+                        status, value = receiver.recv()
+                    except EOFError:
+                        status, value = 'error', f"worker exited with code {process.exitcode}"
+                elif timeout is not None and now - start > timeout:
+                    process.terminate()
+                    status, value = 'error', f"timed out after {timeout} s"
+                else:
+                    continue
+                process.join()
+                receiver.close()
+                del processes[name]
+                pending.discard(name)
+                if status == 'ok':
+                    rankings[name] = value
+                else:
+                    print(f"{name} error: {value}")
+                    rankings[name] = []
+
+            for name, future in futures.items():
+                if name not in pending:
+                    continue
+                if future.done():
+                    try:
+                        rankings[name] = future.result()
+                    except Exception as e:
+                        print(f"{name} error: {e}")
+                        rankings[name] = []
+                elif timeout is not None and name in started and now - started[name] > timeout:
+                    # A thread cannot be stopped: it finishes in the background, its result is ignored
+                    future.cancel()
+                    print(f"{name} error: timed out after {timeout} s")
+                    rankings[name] = []
+                else:
+                    continue
+                pending.discard(name)
+
+            if pending:
+                if processes:
+                    wait([receiver for _, receiver, _ in processes.values()], timeout=POLL_SECONDS)
+                else:
+                    time.sleep(POLL_SECONDS)
+    finally:
+        for process, receiver, _ in processes.values():
+            process.terminate()
+            process.join()
+            receiver.close()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return {name: rankings[name] for name in METHOD_RUNNERS}
+
+
+def perform_analysis(data, lower, upper, weights, benefits, executor='serial', timeout=None, max_workers=None,
+                     top_k=None):
+    """
+    Run every method on the same preferences and compare their rankings.
+
+    data is either the travel metrics rows of get_data_from_database or a DestinationTable; a table is passed
+    to the *_table entry points of the methods as it is.
+
+    executor selects how the methods run: 'serial' (one after another), 'thread' (thread pool), 'process'
+    (one process per method, the data shared through shared memory) or 'auto' (per method, see
+    METHOD_EXECUTORS). Outside the serial mode, a method that does not finish within timeout seconds from its
+    start is reported as failed and its process is terminated (a thread cannot be stopped, it finishes in the
+    background); max_workers bounds the number of methods running at a time in the threads and in the processes
+    (one per method by default).
+
+    With top_k every method only ranks its top_k best alternatives (partial sort, see methods.top_k) and the
+    consensus is computed over these lists, an ID missing from a list counting as position top_k + 1.
+    """
+    rankings = _run_methods(data, lower, upper, weights, benefits, executor, timeout, max_workers, top_k)
 
     # --- Correlation & Consensus Logic ---
     valid_rankings = {k: v for k, v in rankings.items() if v and len(v) > 1}
@@ -104,6 +301,100 @@ def perform_analysis(data, lower, upper, weights, benefits):
     if len(valid_rankings) < 2:
         return None, None, "Not enough successful methods to perform comparison."
 
+    corr_matrix, sorted_consensus = compare_rankings(valid_rankings, None if top_k is None else top_k + 1)
+
+    return valid_rankings, corr_matrix, sorted_consensus
+
+
+def rank_matrix(rankings, missing_rank=None):
+    """
+    Positions of every ranked ID in every ranking.
+
+    Parameters:
+    rankings (dict): method name -> list of IDs from the best to the worst (IDs unique within a ranking).
+    missing_rank (int): position of an ID that a method did not rank, len(ids) + 1 by default (top_k + 1
+        for top-K lists). It must be greater than every position.
+
+    Returns:
+    tuple: (ids, ranks) - the IDs of all rankings, in the iteration order of their set, and the
+    (IDs x methods) int matrix of their 1-based positions, missing_rank where a method did not rank the ID.
+    """
+    all_ids = set()
+    for r in rankings.values():
+        all_ids.update(r)
+    ids = np.fromiter(all_ids, dtype=np.int64, count=len(all_ids))
+
+    sorter = np.argsort(ids)
+    ranks = np.full((len(ids), len(rankings)), missing_rank or len(ids) + 1, dtype=np.int64)
+    for column, r in enumerate(rankings.values()):
+        rows = sorter[np.searchsorted(ids, np.asarray(r, dtype=np.int64), sorter=sorter)]
+        ranks[rows, column] = np.arange(1, len(r) + 1)
+    return ids, ranks
+
+
+def _pearson(a, b):
+    a = a - a.mean()
+    b = b - b.mean()
+    return float(np.dot(a, b) / np.sqrt(np.dot(a, a) * np.dot(b, b)))
+
+
+def spearman_matrix(ranks, min_common=6, missing_rank=None):
+    """
+    Spearman correlation of every pair of columns of a rank matrix (see rank_matrix), over the IDs ranked by both.
+
+    When every method ranked every ID the positions already are the ranks and the whole matrix is one
+    np.corrcoef; otherwise each pair is re-ranked on its common IDs. Pairs with fewer than min_common common
+    IDs get 0. missing_rank is the position of the IDs a method did not rank, see rank_matrix.
+
+    Returns:
+    np.ndarray: (methods x methods) matrix with ones on the diagonal.
+    """
+    number_of_ids, n = ranks.shape
+    present = ranks != (missing_rank or number_of_ids + 1)
+    if number_of_ids >= min_common and present.all():
+        corr_matrix = np.corrcoef(ranks.T.astype(float))
+        np.fill_diagonal(corr_matrix, 1.0)
+        return corr_matrix
+
+    corr_matrix = np.eye(n)
+    for i in range(n):
+        for j in range(i + 1, n):
+            common = present[:, i] & present[:, j]
+            if np.count_nonzero(common) >= min_common:
+                # Positions are unique, so the ranks among the common IDs come from a double argsort
+                a = np.argsort(np.argsort(ranks[common, i], kind='stable'), kind='stable').astype(float)
+                b = np.argsort(np.argsort(ranks[common, j], kind='stable'), kind='stable').astype(float)
+                corr_matrix[i, j] = corr_matrix[j, i] = _pearson(a, b)
+    return corr_matrix
+
+
+def compare_rankings(valid_rankings, missing_rank=None):
+    """
+    Spearman correlation matrix of the rankings and their consensus.
+
+    Parameters:
+    valid_rankings (dict): method name -> list of IDs from the best to the worst.
+    missing_rank (int): position of an ID that a method did not rank, see rank_matrix.
+
+    Returns:
+    tuple: (corr_matrix, sorted_consensus) - sorted_consensus lists (ID, {'avg_rank', 'ranks'}) by average
+    position, a method that did not rank an ID counting as position missing_rank (len(all IDs) + 1 by default).
+    """
+    ids, ranks = rank_matrix(valid_rankings, missing_rank)
+    corr_matrix = spearman_matrix(ranks, missing_rank=missing_rank)
+
+    # Stable sort keeps the set order of equal averages, as the sort of the consensus dict did
+    avg_rank = ranks.sum(axis=1) / ranks.shape[1]
+    order = np.argsort(avg_rank, kind='stable')
+    sorted_consensus = [(uid, {'avg_rank': avg, 'ranks': r})
+                        for uid, avg, r in zip(ids[order].tolist(), avg_rank[order].tolist(), ranks[order].tolist())]
+    return corr_matrix, sorted_consensus
+
+
+def compare_rankings_reference(valid_rankings):
+    """Pairwise scipy.stats.spearmanr and list.index consensus, kept as the reference for compare_rankings."""
+    from scipy.stats import spearmanr
+
     methods = list(valid_rankings.keys())
     n = len(methods)
     corr_matrix = np.zeros((n, n))
@@ -146,4 +437,4 @@ def perform_analysis(data, lower, upper, weights, benefits):
 
     sorted_consensus = sorted(consensus_scores.items(), key=lambda x: x[1]['avg_rank'])
 
-    return valid_rankings, corr_matrix, sorted_consensus
\ No newline at end of file
+    return corr_matrix, sorted_consensus
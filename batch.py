@@ -0,0 +1,243 @@
+"""
+Headless batch ranking: reads scenarios as JSON Lines and writes one JSON line of results per scenario.
+
+Every scenario is an object with the method and its inputs, for example:
+
+    {"id": "cheap", "method": "topsis", "upper": [600, 300, ...], "weights": [3, 1, ...]}
+
+- method: "topsis", "rsm", "uta", "ahp" or "sp_cs".
+- lower, upper: limits of every criterion (default: minimum and maximum of the data).
+- weights: weight of every criterion (default: equal), normalized like in the GUI.
+- benefits: 1 for criteria to maximize, 0 for criteria to minimize (default: BENEFIT_ATTRIBUTES).
+- is_active (rsm): 0 to skip a criterion (default: all active).
+- compartments (uta): number of compartments of every criterion (default: 5).
+- criteria (ahp, sp_cs): indexes of the selected criteria (ahp default: all, sp_cs: three required).
+- comparisons (ahp): upper triangle of the criteria comparison matrix (default: from the weights).
+- top_k: rank only the top_k best destinations (default: all), see methods.top_k.
+
+The limits are always given per criterion, AHP and SP-CS take the ones of their selected criteria.
+Every per-criterion list must have one value per criterion of the data.
+The output line has the scenario id, the method and the ranking (IDs from the best); with --labels also
+"city, country" of every ID; a scenario that fails gets an "error" instead. Diagnostics printed by the
+methods or the data loading go to stderr, the output stays pure JSON Lines.
+
+Usage:
+
+    python batch.py scenarios.jsonl -o rankings.jsonl --workers 4
+
+Only NumPy/SciPy code is imported, never tkinter, PIL or matplotlib.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+import extract_data
+import analysis
+import methods.topsis as topsis
+import methods.rsm as rsm
+import methods.UTA as UTA
+import methods.AHP as AHP
+import methods.Sp_Cs as Sp_Cs
+from ranking_cache import RankingCache
+
+# Default benefit attributes, as in the GUI
+BENEFIT_ATTRIBUTES = [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+
+# State of the worker processes (or of the single process), set by _init_worker
+_table = None
+_cache = None
+
+
+def _init_worker(data_file, cache_dir):
+    global _table, _cache
+    _table = extract_data.load_destination_table(data_file)
+    _cache = RankingCache(directory=cache_dir) if cache_dir else None
+
+
+def _init_process_worker(data_file, cache_dir, store_path):
+    """
+    Pool initializer: the parent process already compiled or validated the store of the data (see _prepare_store),
+    the worker only maps it. Without a store (not writable) the worker parses the workbook itself.
+    """
+    global _table, _cache
+    # The prints of the methods must not reach the output
+    sys.stdout = sys.stderr
+    if store_path is not None:
+        tables = extract_data.load_store(store_path)
+    else:
+        tables = extract_data.read_workbook(os.path.abspath(data_file))
+    _table = extract_data.DestinationTable.from_tables(tables)
+    _cache = RankingCache(directory=cache_dir) if cache_dir else None
+
+
+def _prepare_store(data_file):
+    """
+    Compile (or validate) the store of the data once, before the workers start: every worker compiling a stale store
+    would write the same files at the same time.
+
+    Returns:
+    str: the directory of the store, None if it could not be written.
+    """
+    file_path = os.path.abspath(data_file)
+    # A missing or outdated store is compiled by the first call (which returns the parsed workbook), the second one
+    # maps it; the arrays are memory maps only when the store is current
+    for _ in range(2):
+        tables = extract_data.load_database(file_path)
+        if isinstance(tables["data"], np.memmap):
+            return extract_data.store_path_for(file_path)
+    return None
+
+
+def _run(method, function, *args, **options):
+    if _cache is not None:
+        return _cache.cached(method, function, _table, *args, **options)
+    return function(_table, *args, **options)
+
+
+def _check_lengths(**lists):
+    """ValueError unless every list has one value per criterion of the data."""
+    for name, values in lists.items():
+        if len(values) != _table.number_of_criteria:
+            raise ValueError(f"{name} has {len(values)} values, the data has {_table.number_of_criteria} criteria")
+
+
+def _scenario_inputs(scenario):
+    """Limits, normalized weights and benefit flags of a scenario, with their defaults."""
+    number_of_criteria = _table.number_of_criteria
+    lower = [float(v) for v in scenario.get("lower", _table.minimum.tolist())]
+    upper = [float(v) for v in scenario.get("upper", _table.maximum.tolist())]
+    weights = [float(v) for v in scenario.get("weights", [1.0] * number_of_criteria)]
+    total = sum(weights)
+    weights = [w / total for w in weights] if total else weights
+    benefits = [int(v) for v in scenario.get("benefits", BENEFIT_ATTRIBUTES[:number_of_criteria])]
+    _check_lengths(lower=lower, upper=upper, weights=weights, benefits=benefits)
+    return lower, upper, weights, benefits
+
+
+def _top_k(scenario):
+    top_k = scenario.get("top_k")
+    return None if top_k is None else int(top_k)
+
+
+def rank_topsis(scenario):
+    lower, upper, weights, benefits = _scenario_inputs(scenario)
+    return _run("topsis", topsis.topsis_table, lower, upper, weights, benefits, top_k=_top_k(scenario)), {}
+
+
+def rank_rsm(scenario):
+    lower, upper, _, benefits = _scenario_inputs(scenario)
+    is_active = [float(v) for v in scenario.get("is_active", [1] * _table.number_of_criteria)]
+    _check_lengths(is_active=is_active)
+    return _run("rsm", rsm.rsm_table, lower, upper, is_active, benefits, top_k=_top_k(scenario)), {}
+
+
+def rank_uta(scenario):
+    lower, upper, weights, benefits = _scenario_inputs(scenario)
+    compartments = [int(v) for v in scenario.get("compartments", [5] * _table.number_of_criteria)]
+    _check_lengths(compartments=compartments)
+    result = _run("uta_star", UTA.UTA_star_table, lower, upper, weights, benefits, compartments,
+                  top_k=_top_k(scenario))
+    if result == 1:
+        raise ValueError("the number of compartments must be positive")
+    return result, {}
+
+
+def rank_ahp(scenario):
+    lower, upper, weights, benefits = _scenario_inputs(scenario)
+    criteria = [int(v) for v in scenario.get("criteria", range(_table.number_of_criteria))]
+    comparisons = scenario.get("comparisons") or analysis.generate_ahp_comparisons([weights[i] for i in criteria])
+    result = _run("ahp", AHP.ahp_result_table, [lower[i] for i in criteria], [upper[i] for i in criteria],
+                  criteria, [float(v) for v in comparisons], benefits, top_k=_top_k(scenario))
+    if result is None:
+        return None, {}
+    return result.ids, {"CR": float(result.CR), "weights": [float(w) for w in result.weights]}
+
+
+def rank_sp_cs(scenario):
+    lower, upper, _, benefits = _scenario_inputs(scenario)
+    criteria = [int(v) for v in scenario["criteria"]]
+    if len(criteria) != 3:
+        raise ValueError("sp_cs needs exactly three criteria")
+    result = _run("sp_cs", Sp_Cs.sp_cs_table, [lower[i] for i in criteria], [upper[i] for i in criteria], criteria,
+                  benefits, top_k=_top_k(scenario))
+    if result is None:
+        raise ValueError("at most 5 alternatives meet the limits")
+    return result, {}
+
+
+METHODS = {
+    "topsis": rank_topsis,
+    "rsm": rank_rsm,
+    "uta": rank_uta,
+    "ahp": rank_ahp,
+    "sp_cs": rank_sp_cs,
+}
+
+
+def run_scenario(item):
+    """Result line (a JSON string) of one (line number, scenario text, with labels) item."""
+    line_number, text, labels = item
+    output = {"line": line_number}
+    try:
+        scenario = json.loads(text)
+        output["id"] = scenario.get("id", line_number)
+        output["method"] = scenario.get("method")
+        if output["method"] not in METHODS:
+            raise ValueError(f"unknown method {output['method']!r}, expected one of {sorted(METHODS)}")
+        ranking, extra = METHODS[output["method"]](scenario)
+        if ranking is None:
+            raise ValueError("incompatible input data length")
+        output["ranking"] = [int(idx) for idx in ranking]
+        output.update(extra)
+        if labels:
+            output["labels"] = ["%s, %s" % _table.label(idx) for idx in output["ranking"]]
+    except Exception as e:
+        output["error"] = f"{type(e).__name__}: {e}"
+    return json.dumps(output, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank destinations for many scenarios without the GUI.")
+    parser.add_argument("scenarios", help="JSON Lines file of scenarios, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines file of results, - for stdout (default)")
+    parser.add_argument("--data", default="example_base.xlsx", help="workbook with the destinations")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (default 1)")
+    parser.add_argument("--labels", action="store_true", help="add the city and country of every ranked ID")
+    parser.add_argument("--cache-dir", help="directory of a persistent ranking cache (see ranking_cache)")
+    args = parser.parse_args(argv)
+    if not os.path.isfile(args.data):
+        print(f"File does not exist: {args.data}", file=sys.stderr)
+        return 1
+
+    source = sys.stdin if args.scenarios == "-" else open(args.scenarios, encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    items = ((number, line, args.labels) for number, line in enumerate(source, 1) if line.strip())
+    try:
+        # Only the result lines are written to the target, any other print goes to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            if args.workers > 1:
+                # Every worker maps the dataset once; results are streamed in input order
+                store_path = _prepare_store(args.data)
+                with Pool(args.workers, initializer=_init_process_worker,
+                          initargs=(args.data, args.cache_dir, store_path)) as pool:
+                    for result in pool.imap(run_scenario, items, chunksize=8):
+                        target.write(result + "\n")
+            else:
+                _init_worker(args.data, args.cache_dir)
+                for item in items:
+                    target.write(run_scenario(item) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,761 @@
+"""
+Benchmarks of the ranking methods on synthetic destination catalogues.
+
+Every benchmark first checks that the optimized code returns the same ranking as the
+reference implementation, then prints the timings. Usage:
+
+    python benchmark.py topsis
+
+The equivalence checks alone run on small inputs, without the timings (all of them, or the named ones):
+
+    python benchmark.py --check
+    python benchmark.py --check topsis
+"""
+import itertools
+import subprocess
+import sys
+import time
+import numpy as np
+
+import analysis
+from extract_data import DestinationTable
+import methods.topsis as topsis
+import methods.Sp_Cs as Sp_Cs
+import methods.rsm as rsm
+import methods.UTA as UTA
+import methods.AHP as AHP
+from methods.top_k import top_k_order
+
+NUMBER_OF_CRITERIA = 13
+BENEFIT_ATTRIBUTES = [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+
+
+def synthetic_matrix(number_of_alternatives, number_of_criteria=NUMBER_OF_CRITERIA, seed=0):
+    """Random integer catalogue shaped like the 'data' sheet: [ID, criterion1, criterion2, ...] per row."""
+    rng = np.random.default_rng(seed)
+    data = np.empty((number_of_alternatives, number_of_criteria + 1), dtype=np.int64)
+    data[:, 0] = np.arange(number_of_alternatives)
+    data[:, 1:] = rng.integers(1, 1000, size=(number_of_alternatives, number_of_criteria))
+    return data
+
+
+def synthetic_table(number_of_alternatives, number_of_criteria=NUMBER_OF_CRITERIA, seed=0):
+    """DestinationTable over synthetic_matrix, with placeholder names."""
+    data = synthetic_matrix(number_of_alternatives, number_of_criteria, seed)
+    names = np.array([f"City {idx}" for idx in data[:, 0]], dtype=object)
+    return DestinationTable(["ID", "Miasto", "Panstwo"], [f"C{j}" for j in range(number_of_criteria)],
+                            data[:, 0], data[:, 1:], names, np.full(len(data), "Country", dtype=object))
+
+
+def check(condition, message):
+    """Raise AssertionError(message) unless condition holds (also under python -O, unlike assert)."""
+    if not condition:
+        raise AssertionError(message)
+
+
+def timeit(function, *args, repeat=3, **kwargs):
+    """Best wall time of `repeat` calls and the result of the last one."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_topsis(sizes=(1_000, 100_000, 1_000_000), reference_limit=100_000):
+    weights = [1 / NUMBER_OF_CRITERIA] * NUMBER_OF_CRITERIA
+    lower = [100] * NUMBER_OF_CRITERIA
+    upper = [950] * NUMBER_OF_CRITERIA
+    for size in sizes:
+        data = synthetic_matrix(size)
+        matrix = np.ascontiguousarray(data[:, 1:], dtype=float)
+        ids = data[:, 0]
+        mask = topsis.limits_mask(matrix, lower, upper)
+        fast, result = timeit(topsis.topsis_array, matrix, ids, weights, BENEFIT_ATTRIBUTES, mask)
+        line = f"TOPSIS n={size:>9}: numpy {fast * 1000:9.2f} ms"
+        if size <= reference_limit:
+            rows = data.tolist()
+            slow, expected = timeit(topsis.topsis_reference, rows, lower, upper, weights, BENEFIT_ATTRIBUTES, repeat=1)
+            check(result.tolist() == expected, "TOPSIS ranking differs from the reference")
+            line += f", python {slow * 1000:9.2f} ms, speedup x{slow / fast:.0f}"
+        print(line)
+
+
+def check_topsis(sizes=(50, 500)):
+    """topsis_array and topsis (limits, weights, both kinds of criteria) against topsis_reference."""
+    rng = np.random.default_rng(7)
+    for size in sizes:
+        data = synthetic_matrix(size, seed=size)
+        rows = data.tolist()
+        matrix = np.ascontiguousarray(data[:, 1:], dtype=float)
+        for _ in range(5):
+            weights = rng.random(NUMBER_OF_CRITERIA)
+            weights = (weights / weights.sum()).tolist()
+            # Limits which keep most alternatives (the reference fails on an empty set)
+            lower = rng.integers(0, 60, NUMBER_OF_CRITERIA).tolist()
+            upper = rng.integers(940, 1000, NUMBER_OF_CRITERIA).tolist()
+            expected = topsis.topsis_reference(rows, lower, upper, weights, BENEFIT_ATTRIBUTES)
+            mask = topsis.limits_mask(matrix, lower, upper)
+            result = topsis.topsis_array(matrix, data[:, 0], weights, BENEFIT_ATTRIBUTES, mask).tolist()
+            check(result == expected, f"topsis_array differs from topsis_reference (n={size})")
+            check(topsis.topsis(rows, lower, upper, weights, BENEFIT_ATTRIBUTES) == expected,
+                  f"topsis differs from topsis_reference (n={size})")
+
+
+def bench_topsis_batch(sizes=(100, 1_000, 10_000), profiles=(10, 100, 1_000)):
+    for number_of_alternatives, number_of_profiles in itertools.product(sizes, profiles):
+        data = synthetic_matrix(number_of_alternatives)
+        matrix = np.ascontiguousarray(data[:, 1:], dtype=float)
+        ids = data[:, 0]
+        rng = np.random.default_rng(1)
+        weights = rng.random((number_of_profiles, NUMBER_OF_CRITERIA))
+        lower = rng.integers(0, 50, size=(number_of_profiles, NUMBER_OF_CRITERIA))
+        upper = rng.integers(950, 1000, size=(number_of_profiles, NUMBER_OF_CRITERIA))
+        batch, result = timeit(topsis.topsis_batch, matrix, ids, weights, lower, upper, BENEFIT_ATTRIBUTES)
+
+        def one_by_one():
+            return [topsis.topsis_array(matrix, ids, weights[p], BENEFIT_ATTRIBUTES,
+                                        topsis.limits_mask(matrix, lower[p], upper[p]))
+                    for p in range(number_of_profiles)]
+
+        single, expected = timeit(one_by_one)
+        check(all(np.array_equal(a, b) for a, b in zip(result, expected)), "batched TOPSIS differs")
+        print(f"TOPSIS batch n={number_of_alternatives:>6} profiles={number_of_profiles:>5}: "
+              f"{number_of_profiles / batch:9.0f} profiles/s batched, {number_of_profiles / single:9.0f} profiles/s one by one "
+              f"(x{single / batch:.1f})")
+
+
+def check_topsis_batch(sizes=(50, 2_000), number_of_profiles=40):
+    """topsis_batch against topsis_array per profile, with wide, narrow and empty limits."""
+    rng = np.random.default_rng(11)
+    for size in sizes:
+        data = synthetic_matrix(size, seed=size)
+        matrix = np.ascontiguousarray(data[:, 1:], dtype=float)
+        weights = rng.random((number_of_profiles, NUMBER_OF_CRITERIA))
+        lower = rng.integers(0, 50, size=(number_of_profiles, NUMBER_OF_CRITERIA))
+        upper = rng.integers(950, 1000, size=(number_of_profiles, NUMBER_OF_CRITERIA))
+        # Narrow ranges on two criteria (few compatible alternatives) and one profile without any
+        narrow = rng.integers(0, NUMBER_OF_CRITERIA, size=(number_of_profiles // 2, 2))
+        lower[np.arange(number_of_profiles // 2)[:, None], narrow] = 400
+        upper[np.arange(number_of_profiles // 2)[:, None], narrow] = 600
+        lower[-1], upper[-1] = 600, 400
+        result = topsis.topsis_batch(matrix, data[:, 0], weights, lower, upper, BENEFIT_ATTRIBUTES)
+        for p in range(number_of_profiles):
+            # A single compatible alternative scores 0 / 0 in topsis_array
+            with np.errstate(invalid='ignore'):
+                expected = topsis.topsis_array(matrix, data[:, 0], weights[p], BENEFIT_ATTRIBUTES,
+                                               topsis.limits_mask(matrix, lower[p], upper[p]))
+            check(np.array_equal(result[p], expected), f"topsis_batch differs from topsis_array (n={size}, profile {p})")
+
+
+def legacy_edge_sums(points, voronoi):
+    """The original per-point, per-ridge SP-CS scan, kept as the reference for the vectorized kernels."""
+    sums = []
+    for point in points:
+        min_distance = float('inf')
+        nearest_edge_params_sum = 0
+        for ridge in voronoi.ridge_vertices:
+            if np.all(ridge != -1):
+                edge_start = voronoi.vertices[ridge[0]]
+                edge_end = voronoi.vertices[ridge[1]]
+                dist = Sp_Cs.point_line_distance(point, edge_start, edge_end)
+                if dist < min_distance:
+                    min_distance = dist
+                    nearest_edge_params_sum = np.linalg.norm(edge_end - edge_start)
+        sums.append(nearest_edge_params_sum + min_distance)
+    return sums
+
+
+def spcs_segments(size, dimension=3, seed=0):
+    """Synthetic SP-CS points and the ridges of their jittered Voronoi diagram (as sp_cs_points builds it)."""
+    from scipy.spatial import Voronoi
+
+    points = synthetic_matrix(size, number_of_criteria=dimension, seed=seed)[:, 1:].astype(float)
+    voronoi = Voronoi(Sp_Cs.jitter_points(points, rng=np.random.default_rng(Sp_Cs.JITTER_SEED)))
+    return points, voronoi, Sp_Cs.ridge_segments(voronoi)
+
+
+def spcs_ranking(sums):
+    return np.argsort(sums, kind='stable').tolist()
+
+
+def bench_spcs(sizes=(100, 1_000, 10_000, 50_000), scan_limit=10_000, legacy_limit=200):
+    for size in sizes:
+        points, voronoi, (starts, ends) = spcs_segments(size)
+        fast, result = timeit(Sp_Cs.nearest_edge_sums, points, starts, ends, repeat=1 if size > scan_limit else 3)
+        line = f"SP-CS n={size:>6} ridges={len(starts):>7}: line tree {fast * 1000:9.2f} ms"
+
+        if size <= scan_limit:
+            scan, expected = timeit(Sp_Cs.nearest_edge_sums, points, starts, ends, False, repeat=1)
+            check(np.array_equal(result, expected), "line tree differs from the line scan")
+            line += f", line scan {scan * 1000:9.2f} ms (x{scan / fast:.0f})"
+
+            if size <= legacy_limit:
+                legacy, expected = timeit(legacy_edge_sums, points, voronoi, repeat=1)
+                check(spcs_ranking(result) == spcs_ranking(expected), "line tree ranking differs from the legacy scan")
+                line += f", legacy scan {legacy * 1000:9.2f} ms"
+        print(line)
+
+        if size <= scan_limit // 10:
+            fast, result = timeit(Sp_Cs.nearest_edge_sums, points, starts, ends, True, True)
+            scan, expected = timeit(Sp_Cs.nearest_edge_sums, points, starts, ends, False, True, repeat=1)
+            check(np.array_equal(result, expected), "segment KD-tree differs from the segment scan")
+            print(f"SP-CS n={size:>6} segments:        kd-tree {fast * 1000:9.2f} ms, segment scan {scan * 1000:9.2f} ms")
+
+
+def check_spcs(sizes=(8, 30, 300), legacy_limit=30):
+    """Edge sums of the spatial indexes against the scans (2D and 3D), and the scans against the legacy loop."""
+    for size, dimension, seed in itertools.product(sizes, (2, 3), range(3)):
+        points, voronoi, (starts, ends) = spcs_segments(size, dimension, seed)
+        expected = Sp_Cs.nearest_edge_sums(points, starts, ends, False)
+        check(np.array_equal(Sp_Cs.nearest_edge_sums(points, starts, ends), expected),
+              f"nearest_ridges_tree differs from the line scan (n={size}, {dimension}D)")
+        check(np.array_equal(Sp_Cs.nearest_edge_sums(points, starts, ends, True, True),
+                             Sp_Cs.nearest_edge_sums(points, starts, ends, False, True)),
+              f"nearest_ridges_kdtree differs from the segment scan (n={size}, {dimension}D)")
+        if size <= legacy_limit:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                legacy = legacy_edge_sums(points, voronoi)
+            check(spcs_ranking(expected) == spcs_ranking(legacy),
+                  f"line scan ranking differs from the legacy scan (n={size}, {dimension}D)")
+
+
+def bench_rsm_filtration(sizes=(1_000, 2_000, 5_000, 20_000), number_of_criteria=4, reference_limit=5_000):
+    benefit_attributes = BENEFIT_ATTRIBUTES[-number_of_criteria:]
+    for size in sizes:
+        points = synthetic_matrix(size, number_of_criteria).astype(float)
+        fast, (P, Q) = timeit(rsm.filtration_of_dominated, points, benefit_attributes)
+        line = f"RSM filtration n={size:>6}: skyline {fast * 1000:9.2f} ms (|P|={len(P)}, |Q|={len(Q)})"
+        if size <= reference_limit:
+            slow, (P_ref, Q_ref) = timeit(rsm.filtration_of_dominated_reference, points, benefit_attributes, repeat=1)
+            assert np.array_equal(P, np.atleast_2d(P_ref)), "skyline P differs from the reference"
+            assert np.array_equal(Q, np.reshape(Q_ref, (-1, points.shape[1]))), "skyline Q differs from the reference"
+            line += f", pairwise {slow * 1000:9.2f} ms"
+        print(line)
+
+
+def bench_rsm_scores(sizes=(1_000, 10_000, 100_000), reference_sizes=(5, 20), reference_limit=1_000):
+    for size, number_of_references in itertools.product(sizes, reference_sizes):
+        data = synthetic_matrix(size).astype(float)
+        rng = np.random.default_rng(2)
+        A0 = np.column_stack([-np.ones(number_of_references),
+                              rng.integers(0, 200, size=(number_of_references, NUMBER_OF_CRITERIA))])
+        A1 = np.column_stack([-np.ones(number_of_references),
+                              rng.integers(800, 1000, size=(number_of_references, NUMBER_OF_CRITERIA))])
+        fast, scores = timeit(rsm.rsm_scores, data, A0, A1)
+        line = f"RSM scores n={size:>6} |A0|=|A1|={number_of_references:>3}: broadcast {fast * 1000:9.2f} ms"
+        if size <= reference_limit:
+            slow, expected = timeit(rsm.rsm_scores_reference, data, A0, A1, repeat=1)
+            assert np.array_equal(np.argsort(scores), np.argsort(expected)), "RSM ordering differs from the reference"
+            line += f", loops {slow * 1000:9.2f} ms"
+        print(line)
+
+
+def check_uta_boundaries():
+    """Values on a limit or a breakpoint get the utility of the linear UTA* function, the upper limit included."""
+    lower = [0, 10, 5]
+    upper = [100, 40, 5.5]
+    weights = [0.5, 0.3, 0.2]
+    benefit_attributes = [1, 0, 1]
+    compartments = [4, 3, 2]
+    matrix = np.array([[0, 10, 5], [100, 40, 5.5], [25, 20, 5.25], [50, 30, 5.1], [100, 10, 5.5]], dtype=float)
+    lower_, upper_, weights_ = (np.array(v, dtype=float) for v in (lower, upper, weights))
+    linear = (matrix - lower_) / (upper_ - lower_)
+    expected = (np.where(np.array(benefit_attributes) == 1, linear, 1 - linear) * weights_).sum(axis=1)
+    scores = UTA.uta_scores(matrix, lower, upper, weights, benefit_attributes, compartments)
+    check(np.allclose(scores, expected), "UTA* utility is wrong on a boundary value")
+
+    # Values outside the limits add nothing
+    outside = UTA.uta_scores(np.array([[-1, 41, 6]], dtype=float), lower, upper, weights, benefit_attributes,
+                             compartments)
+    check(np.array_equal(outside, [0.0]), "UTA* utility of out-of-range values is not zero")
+
+
+def uta_data(size, seed=3):
+    """synthetic_matrix with fractional values, so that equal utilities (whose sums may round differently in the
+    reference) are unlikely."""
+    return synthetic_matrix(size) + np.random.default_rng(seed).random((size, NUMBER_OF_CRITERIA + 1))
+
+
+def check_uta(sizes=(50, 500)):
+    """uta_scores on limits and breakpoints, and UTA_star against UTA_star_reference."""
+    check_uta_boundaries()
+    rng = np.random.default_rng(8)
+    for size in sizes:
+        rows = uta_data(size, seed=size).tolist()
+        for _ in range(3):
+            weights = rng.random(NUMBER_OF_CRITERIA).tolist()
+            compartments = rng.integers(1, 5, NUMBER_OF_CRITERIA).tolist()
+            lower = rng.integers(0, 100, NUMBER_OF_CRITERIA).tolist()
+            upper = rng.integers(900, 1001, NUMBER_OF_CRITERIA).tolist()
+            expected = UTA.UTA_star_reference(rows, lower, upper, weights, BENEFIT_ATTRIBUTES, compartments)
+            check(UTA.UTA_star(rows, lower, upper, weights, BENEFIT_ATTRIBUTES, compartments) == expected,
+                  f"UTA_star differs from UTA_star_reference (n={size})")
+
+
+def bench_uta(sizes=(1_000, 10_000, 100_000), reference_limit=10_000):
+    weights = [1 / NUMBER_OF_CRITERIA] * NUMBER_OF_CRITERIA
+    compartments = [3, 2, 2, 4, 1, 1, 3, 2, 1, 1, 1, 2, 1]
+    # Limits strictly around the data, so that the reference does not skip upper-limit values
+    lower = [0] * NUMBER_OF_CRITERIA
+    upper = [1000] * NUMBER_OF_CRITERIA
+    for size in sizes:
+        data = uta_data(size)
+        rows = data.tolist()
+        scoring, _ = timeit(UTA.uta_scores, data[:, 1:], lower, upper, weights, BENEFIT_ATTRIBUTES, compartments)
+        fast, result = timeit(UTA.UTA_star, rows, lower, upper, weights, BENEFIT_ATTRIBUTES, compartments)
+        line = f"UTA* n={size:>6}: uta_scores {scoring * 1000:9.2f} ms, UTA_star on lists {fast * 1000:9.2f} ms"
+        if size <= reference_limit:
+            slow, expected = timeit(UTA.UTA_star_reference, rows, lower, upper, weights, BENEFIT_ATTRIBUTES,
+                                    compartments, repeat=1)
+            check(result == expected, "UTA* ranking differs from the reference")
+            line += f", python {slow * 1000:9.2f} ms"
+        print(line)
+
+
+def ahp_priorities_full_matrix(col_values, is_benefit):
+    """The original AHP alternative priorities, materializing the n x n comparison matrix."""
+    col_values = np.array(col_values, dtype=float)
+    col_values[col_values == 0] = 1e-9
+    comp_mat = col_values[:, None] / col_values if is_benefit else col_values / col_values[:, None]
+    norm_mat = comp_mat / comp_mat.sum(axis=0)
+    return norm_mat.sum(axis=1) / len(col_values)
+
+
+def bench_ahp(sizes=(1_000, 5_000, 50_000, 1_000_000), full_matrix_limit=5_000, exact_limit=5_000):
+    rng = np.random.default_rng(4)
+    for size, is_benefit in itertools.product(sizes, (True, False)):
+        values = rng.integers(0, 1000, size=size).astype(float)
+        fast, priorities = timeit(AHP.criterion_priorities, values, is_benefit)
+        line = f"AHP priorities n={size:>7} benefit={is_benefit!s:>5}: closed form {fast * 1000:9.2f} ms"
+        if size <= exact_limit:
+            streamed, exact = timeit(AHP.criterion_priorities, values, is_benefit, "exact", repeat=1)
+            check(np.allclose(priorities, exact, rtol=1e-9, atol=0), "closed form differs from the streamed matrix")
+            line += f", streamed matrix {streamed * 1000:9.2f} ms"
+        if size <= full_matrix_limit:
+            full, expected = timeit(ahp_priorities_full_matrix, values, is_benefit, repeat=1)
+            check(np.allclose(priorities, expected, rtol=1e-9, atol=0), "closed form differs from the full matrix")
+            check(np.allclose(exact, expected, rtol=1e-12, atol=0), "streamed matrix differs from the full matrix")
+            line += f", full matrix {full * 1000:9.2f} ms"
+        print(line)
+
+
+def check_ahp(sizes=(10, 300), dimensions=(2, 3, 5, 9)):
+    """criterion_priorities (both modes) against the full comparison matrix, and principal_eigenvector and the
+    "eigen" criteria weights against numpy.linalg.eig."""
+    rng = np.random.default_rng(9)
+    for size, is_benefit in itertools.product(sizes, (True, False)):
+        values = rng.integers(0, 1000, size=size).astype(float)
+        values[0] = 0
+        expected = ahp_priorities_full_matrix(values, is_benefit)
+        check(np.allclose(AHP.criterion_priorities(values, is_benefit), expected, rtol=1e-9, atol=0),
+              f"closed form AHP priorities differ from the full matrix (n={size})")
+        check(np.allclose(AHP.criterion_priorities(values, is_benefit, "exact", chunk_size=64), expected,
+                          rtol=1e-12, atol=0), f"streamed AHP priorities differ from the full matrix (n={size})")
+
+    for dim in dimensions:
+        # Saaty scale judgements, and their reciprocals below the diagonal
+        comparison = tuple(rng.choice([1 / 9, 1 / 5, 1 / 3, 1, 3, 5, 9], size=dim * (dim - 1) // 2).tolist())
+        A = AHP.comparison_matrix(comparison, dim)
+        eigenvalues, eigenvectors = np.linalg.eig(A)
+        largest = np.argmax(eigenvalues.real)
+        expected = eigenvectors[:, largest].real / eigenvectors[:, largest].real.sum()
+        check(np.allclose(AHP.principal_eigenvector(A), expected, rtol=1e-9, atol=1e-12),
+              f"principal_eigenvector differs from numpy.linalg.eig ({dim} criteria)")
+        weights, lambda_max, _, _ = AHP.criteria_weights(comparison, dim, "eigen")
+        check(np.allclose(weights, expected, rtol=1e-9, atol=1e-12)
+              and np.isclose(lambda_max, eigenvalues.real[largest], rtol=1e-9),
+              f"eigen criteria weights differ from numpy.linalg.eig ({dim} criteria)")
+
+
+def bench_analysis(sizes=(1_000, 5_000), executors=("serial", "thread", "process", "auto")):
+    weights = list(np.linspace(1, 2, NUMBER_OF_CRITERIA) / np.linspace(1, 2, NUMBER_OF_CRITERIA).sum())
+    lower = [100] * NUMBER_OF_CRITERIA
+    upper = [950] * NUMBER_OF_CRITERIA
+    for size in sizes:
+        table = synthetic_table(size)
+        line = f"perform_analysis n={size:>6}:"
+        expected = None
+        for executor in executors:
+            elapsed, result = timeit(analysis.perform_analysis, table, lower, upper, weights, BENEFIT_ATTRIBUTES,
+                                     executor, repeat=1)
+            if expected is None:
+                expected = result
+            assert result[0] == expected[0] and result[2] == expected[2], f"{executor} rankings differ from serial"
+            line += f" {executor} {elapsed * 1000:9.2f} ms"
+        print(line)
+
+
+def bench_sessions(sizes=(10_000, 100_000), updates=50, seed=5):
+    """Live re-ranking: one limit, weight or comparison changes per update, as while editing a window."""
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        table = synthetic_table(size)
+        lower, upper = table.minimum.copy(), table.maximum.copy()
+        weights = np.ones(NUMBER_OF_CRITERIA)
+        compartments = [5] * NUMBER_OF_CRITERIA
+        criteria, comparisons = [0, 3, 5], [1.0, 3.0, 0.5]
+        sessions = (topsis.TopsisSession(table), UTA.UtaSession(table), AHP.AhpSession(table))
+        timings = []
+        for update in range(updates + 1):
+            j = rng.integers(NUMBER_OF_CRITERIA)
+            kind = rng.integers(4)
+            if kind == 0:
+                lower[j] = table.minimum[j] + rng.uniform(0, 0.3) * (table.maximum[j] - table.minimum[j])
+            elif kind == 1:
+                upper[j] = table.maximum[j] - rng.uniform(0, 0.3) * (table.maximum[j] - table.minimum[j])
+            elif kind == 2:
+                weights[j] = rng.uniform(0.5, 2)
+            else:
+                compartments[j] = int(rng.integers(1, 8))
+                comparisons[j % 3] = float(rng.choice([0.2, 1, 3, 5]))
+            args = (lower.tolist(), upper.tolist(), (weights / weights.sum()).tolist(), BENEFIT_ATTRIBUTES)
+            ahp_args = ([lower[i] for i in criteria], [upper[i] for i in criteria], criteria, comparisons,
+                        BENEFIT_ATTRIBUTES)
+
+            calls = ((sessions[0].rank, args, topsis.topsis_table),
+                     (sessions[1].rank, args + (compartments,), UTA.UTA_star_table),
+                     (sessions[2].result, ahp_args, AHP.ahp_result_table))
+            elapsed = []
+            for rank, arguments, reference in calls:
+                start = time.perf_counter()
+                result = rank(*arguments)
+                elapsed.append(time.perf_counter() - start)
+                expected = reference(table, *arguments)
+                if isinstance(result, AHP.AhpResult):
+                    result, expected = result.ids, expected.ids
+                assert result == expected, f"{reference.__name__} session ranking differs"
+            # The first update builds the sessions
+            if update:
+                timings.append(elapsed)
+        median, worst = np.median(timings, axis=0) * 1000, np.max(timings, axis=0) * 1000
+        print(f"Live sessions n={size:>6}: " + ", ".join(
+            f"{name} median {m:6.2f} ms max {w:6.2f} ms" for name, m, w in zip(("TOPSIS", "UTA*", "AHP"), median, worst)))
+
+
+def bench_top_k(sizes=(100_000, 1_000_000), top_ks=(10, 50, 1_000), seed=6):
+    """Top-K partial ranking: the first K of a stable argsort, with ties, against the full sort."""
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        # Rounded scores, so that many of them tie
+        scores = np.round(rng.random(size), 3)
+        full_time, full = timeit(np.argsort, -scores, kind='stable')
+        for top_k in top_ks:
+            partial_time, partial = timeit(top_k_order, scores, top_k, descending=True)
+            assert np.array_equal(partial, full[:top_k]), f"top_k_order differs (n={size}, K={top_k})"
+            print(f"Top-K n={size:>7} K={top_k:>5}: argpartition {partial_time * 1000:7.2f} ms, "
+                  f"full sort {full_time * 1000:7.2f} ms ({full_time / partial_time:5.1f}x)")
+    check_top_k_prefixes()
+
+
+def check_top_k_prefixes(size=5_000, top_k=20, seed=6):
+    """Every method with top_k returns the prefix of its full ranking, also when many scores are equal."""
+    rng = np.random.default_rng(seed)
+    data = np.column_stack([np.arange(size), rng.integers(0, 3, size=(size, NUMBER_OF_CRITERIA))])
+    table = DestinationTable([], [f"c{j}" for j in range(NUMBER_OF_CRITERIA)], data[:, 0], data[:, 1:],
+                             np.full(size, "", dtype=object), np.full(size, "", dtype=object))
+    lower, upper = table.minimum.tolist(), table.maximum.tolist()
+    weights = [1 / NUMBER_OF_CRITERIA] * NUMBER_OF_CRITERIA
+    criteria = [0, 3, 5]
+    calls = {
+        "TOPSIS": lambda k: topsis.topsis_table(table, lower, upper, weights, BENEFIT_ATTRIBUTES, k),
+        "RSM": lambda k: rsm.rsm_table(table, lower, upper, [1] * NUMBER_OF_CRITERIA, BENEFIT_ATTRIBUTES, k),
+        "UTA*": lambda k: UTA.UTA_star_table(table, lower, upper, weights, BENEFIT_ATTRIBUTES,
+                                             [3] * NUMBER_OF_CRITERIA, k),
+        "AHP": lambda k: AHP.ahp_result_table(table, [lower[i] for i in criteria], [upper[i] for i in criteria],
+                                              criteria, [2.0, 0.5, 3.0], BENEFIT_ATTRIBUTES, top_k=k).ids,
+        "SP-CS": lambda k: Sp_Cs.sp_cs_table(table, [lower[i] for i in criteria], [upper[i] for i in criteria],
+                                             criteria, BENEFIT_ATTRIBUTES, top_k=k),
+    }
+    for name, rank in calls.items():
+        assert rank(top_k) == rank(None)[:top_k], f"{name} top-K ranking is not the prefix of the full one"
+    print(f"Top-K prefixes n={size} K={top_k} with tied scores: " + ", ".join(calls) + " equal")
+
+
+def bench_table_changes(sizes=(10_000, 100_000, 1_000_000), changes=10, seed=7):
+    """
+    Incremental DestinationTable.apply_changes against building the table again from the changed data. The changes
+    of a call are only marked, the next read of the table (here snapshot) applies them: a stream of single-row
+    changes costs the changed rows, then one compaction of the table for all of them. The first insert into a
+    loaded table grows its buffers (a copy of the table, amortized over the next inserts), it is timed apart.
+    """
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        table = synthetic_table(size)
+        start = time.perf_counter()
+        table.insert(-1, [0] * NUMBER_OF_CRITERIA)
+        timings = [f"first insert {(time.perf_counter() - start) * 1000:7.2f} ms"]
+        table.snapshot()
+        rows = rng.choice(size, 2 * changes, replace=False)
+        updates = {int(table.ids[row]): rng.integers(0, 200, NUMBER_OF_CRITERIA).tolist() for row in rows[:changes]}
+        inserts = [{"id": size + k, "values": rng.integers(0, 200, NUMBER_OF_CRITERIA).tolist()}
+                   for k in range(changes)]
+        scenarios = (("updates+inserts", {"inserts": inserts, "updates": updates}),
+                     ("deletes", {"deletes": table.ids[rows[changes:]].tolist()}),
+                     (f"{changes} single updates", [{"updates": {idx: {3: value + 1}}}
+                                                     for idx, value in zip(updates, range(changes))]))
+
+        for name, change in scenarios:
+            start = time.perf_counter()
+            for call in change if isinstance(change, list) else [change]:
+                table.apply_changes(**call)
+            applied = time.perf_counter()
+            data = table.snapshot()
+            read = time.perf_counter()
+            timings.append(f"{name} {(applied - start) * 1000:7.2f} ms + read {(read - applied) * 1000:6.2f} ms")
+            rebuild_time, rebuilt = timeit(DestinationTable, table.info_headers, table.criteria_headers, data.ids,
+                                           data.matrix, data.cities, data.countries)
+            check(np.array_equal(rebuilt.minimum, data.minimum) and np.array_equal(rebuilt.maximum, data.maximum),
+                  "apply_changes limits differ")
+            # The TOPSIS rankings of the changed table must stay bit-identical to topsis_array
+            check(np.array_equal(rebuilt.column_norms, data.column_norms), "apply_changes norms differ")
+        print(f"Table changes n={size:>7}: " + ", ".join(timings) + f", rebuild {rebuild_time * 1000:7.2f} ms")
+
+
+def check_table_changes(size=300, steps=400, number_of_criteria=5, seed=11):
+    """
+    Random streams of DestinationTable.apply_changes (inserts, full and partial updates, deletes, IDs deleted and
+    inserted again, the table emptied), read at random moments, against a table built from the same rows: same
+    rows and names, same extremes, column norms equal to the bit to methods.topsis.column_norms. The snapshots and the
+    arrays read on the way must not change, nor must a pickled copy differ.
+    """
+    import pickle
+    rng = np.random.default_rng(seed)
+    data = synthetic_matrix(size, number_of_criteria, seed)
+    # Some values 0 (a delete keeps the sums of their criteria) and some fractions (sums depend on the order)
+    values = np.where(rng.random((size, number_of_criteria)) < 0.2, 0, data[:, 1:] / 7)
+    table = DestinationTable([], [f"c{j}" for j in range(number_of_criteria)], data[:, 0], values,
+                             np.array([f"City {idx}" for idx in data[:, 0]], dtype=object),
+                             np.full(size, "", dtype=object))
+    # The expected content: rows of every ID in table order
+    expected = {int(idx): (row.copy(), f"City {idx}") for idx, row in zip(data[:, 0], values)}
+    # Snapshots, and arrays read from the table itself, with copies of their content when taken
+    snapshots, arrays = [], []
+    next_id = size
+    # IDs deleted so far, which inserts may take back
+    gone = []
+
+    def random_values():
+        return np.where(rng.random(number_of_criteria) < 0.2, 0, rng.integers(0, 1000, number_of_criteria) / 7)
+
+    for step in range(steps):
+        ids = list(expected)
+        deletes = rng.choice(ids, min(len(ids), rng.integers(0, 4)), replace=False).tolist() if ids else []
+        if step == steps // 2:
+            deletes = ids
+        remaining = [idx for idx in ids if idx not in deletes]
+        updates = {}
+        for idx in rng.choice(remaining, min(len(remaining), rng.integers(0, 4)), replace=False).tolist():
+            if rng.random() < 0.5:
+                criterion = int(rng.integers(number_of_criteria))
+                updates[idx] = {criterion: float(rng.integers(0, 1000) / 7)}
+            else:
+                updates[idx] = random_values().tolist()
+        gone.extend(deletes)
+        inserts = []
+        for _ in range(rng.integers(0, 4)):
+            # Some inserts take back the ID of a destination deleted before, or in the same call
+            if gone and rng.random() < 0.5:
+                idx = gone.pop(rng.integers(len(gone)))
+            else:
+                idx, next_id = next_id, next_id + 1
+            inserts.append({"id": idx, "values": random_values().tolist(), "city": f"New {idx}"})
+
+        changed = table.apply_changes(inserts, updates, deletes)
+        for idx in deletes:
+            del expected[idx]
+        for idx, new in updates.items():
+            row = expected[idx][0].copy()
+            if isinstance(new, dict):
+                for criterion, value in new.items():
+                    row[criterion] = value
+            else:
+                row[:] = new
+            expected[idx] = (row, expected[idx][1])
+        for insert in inserts:
+            expected[insert["id"]] = (np.asarray(insert["values"], dtype=float), insert["city"])
+        check(changed == bool(inserts or updates or deletes), f"apply_changes reported no change (step {step})")
+
+        if rng.random() < 0.3:
+            matrix = np.array([row for row, _ in expected.values()]).reshape(-1, number_of_criteria)
+            rebuilt = DestinationTable([], table.criteria_headers, list(expected), matrix,
+                                       np.array([city for _, city in expected.values()], dtype=object),
+                                       np.full(len(expected), "", dtype=object))
+            data = table.snapshot() if rng.random() < 0.5 else table
+            check(len(data) == len(rebuilt) and np.array_equal(data.ids, rebuilt.ids)
+                  and np.array_equal(data.matrix, rebuilt.matrix) and np.array_equal(data.cities, rebuilt.cities),
+                  f"apply_changes content differs from the rebuilt table (step {step})")
+            # row_of, label and in before row_index, which numbers the rows of the table again
+            check(all(idx in data and data.row_of(idx) == row and data.label(idx)[0] == expected[idx][1]
+                      for row, idx in enumerate(expected)) and next_id not in data,
+                  f"apply_changes rows of the IDs differ (step {step})")
+            check(data.row_index == rebuilt.row_index, f"apply_changes row_index differs (step {step})")
+            check(np.array_equal(data.minimum, rebuilt.minimum, equal_nan=True)
+                  and np.array_equal(data.maximum, rebuilt.maximum, equal_nan=True),
+                  f"apply_changes extremes differ (step {step})")
+            check(np.array_equal(data.column_norms, topsis.column_norms(rebuilt.matrix))
+                  and np.array_equal(data.column_norms, rebuilt.column_norms),
+                  f"apply_changes norms differ from topsis.column_norms (step {step})")
+            if data is not table:
+                snapshots.append((data, data.ids.copy(), data.matrix.copy(), data.fingerprint))
+                check(data.fingerprint == rebuilt.fingerprint, f"snapshot fingerprint differs (step {step})")
+                copy = pickle.loads(pickle.dumps(table))
+                check(np.array_equal(copy.matrix, rebuilt.matrix) and copy.row_index == rebuilt.row_index,
+                      f"pickled table differs (step {step})")
+            else:
+                arrays.append((data.matrix, data.matrix.copy()))
+
+    for data, ids, matrix, fingerprint in snapshots:
+        check(np.array_equal(data.ids, ids) and np.array_equal(data.matrix, matrix) and data.fingerprint == fingerprint,
+              "a snapshot changed with the table")
+    for matrix, copy in arrays:
+        check(np.array_equal(matrix, copy), "a matrix read from the table changed with it")
+    # Invalid changes leave the table as it is
+    version, fingerprint = table.version, table.fingerprint
+    for change in ({"updates": {next_id: [0] * number_of_criteria}},
+                   {"inserts": [{"id": next_id, "values": [0] * number_of_criteria}], "deletes": [next_id]},
+                   {"inserts": [{"id": next_id, "values": [0] * (number_of_criteria + 1)}]}):
+        try:
+            table.apply_changes(**change)
+        except (KeyError, ValueError):
+            pass
+        else:
+            raise AssertionError(f"apply_changes accepted {change}")
+    check(table.version == version and table.fingerprint == fingerprint, "a rejected change changed the table")
+
+
+def synthetic_rankings(number_of_ids, number_of_methods=5, seed=0):
+    """Random rankings of number_of_ids IDs; every other method ranks only 70% of them."""
+    rng = np.random.default_rng(seed)
+    rankings = {}
+    for k in range(number_of_methods):
+        ids = rng.permutation(number_of_ids)
+        if k % 2:
+            ids = ids[:int(number_of_ids * 0.7)]
+        rankings[f"M{k}"] = ids.tolist()
+    return rankings
+
+
+def bench_compare_rankings(sizes=(1_000, 10_000, 100_000), reference_limit=10_000):
+    import scipy.stats  # the reference imports it lazily, keep the import out of its timing
+    for size in sizes:
+        for partial in (False, True):
+            rankings = synthetic_rankings(size, number_of_methods=5 if partial else 4)
+            if not partial:
+                rankings = {name: ids for name, ids in rankings.items() if len(ids) == size}
+            fast, (corr_matrix, consensus) = timeit(analysis.compare_rankings, rankings)
+            line = f"compare_rankings ids={size:>7} partial={partial!s:>5}: numpy {fast * 1000:9.2f} ms"
+            if size <= reference_limit:
+                slow, (expected_corr, expected_consensus) = timeit(analysis.compare_rankings_reference, rankings,
+                                                                   repeat=1)
+                check(np.allclose(corr_matrix, expected_corr, rtol=0, atol=1e-12), "correlations differ")
+                check(consensus == expected_consensus, "consensus differs from the reference")
+                line += f", python {slow * 1000:9.2f} ms, speedup x{slow / fast:.0f}"
+            print(line)
+
+
+def check_compare_rankings(sizes=(5, 8, 300), seed=10):
+    """rank_matrix, spearman_matrix and compare_rankings against compare_rankings_reference, with full, partial and
+    barely overlapping rankings of scattered IDs."""
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        scattered = rng.choice(10 * size, size=size, replace=False)
+        cases = {
+            "full": {name: ids for name, ids in synthetic_rankings(size, 4, seed=size).items() if len(ids) == size},
+            "partial": synthetic_rankings(size, 5, seed=size),
+            "disjoint": {"A": list(range(size)), "B": list(range(size - 3, 2 * size)), "C": list(range(size // 2))},
+        }
+        for case, rankings in cases.items():
+            rankings = {name: scattered[ids].tolist() if case != "disjoint" else ids
+                        for name, ids in rankings.items()}
+            corr_matrix, consensus = analysis.compare_rankings(rankings)
+            expected_corr, expected_consensus = analysis.compare_rankings_reference(rankings)
+            check(np.allclose(corr_matrix, expected_corr, rtol=0, atol=1e-12),
+                  f"spearman_matrix differs from the reference ({case}, n={size})")
+            check(consensus == expected_consensus, f"consensus differs from the reference ({case}, n={size})")
+
+            ids, ranks = analysis.rank_matrix(rankings)
+            positions = [{uid: k + 1 for k, uid in enumerate(r)} for r in rankings.values()]
+            expected_ranks = [[p.get(uid, len(ids) + 1) for p in positions] for uid in ids.tolist()]
+            check(ranks.tolist() == expected_ranks, f"rank_matrix positions are wrong ({case}, n={size})")
+
+
+# Modules timed by bench_imports, and the heavy dependencies whose loading it reports
+IMPORT_MODULES = ("extract_data", "methods.topsis", "methods.rsm", "methods.UTA", "methods.AHP", "methods.Sp_Cs",
+                  "analysis", "ranking_cache", "batch", "main")
+HEAVY_MODULES = ("scipy", "pandas", "matplotlib", "tkinter", "PIL", "multiprocessing")
+
+COLD_IMPORT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def cold_import(module, repeat=3):
+    """Best import time of a module in a fresh interpreter, and the heavy modules it loaded."""
+    best = float('inf')
+    loaded = ""
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", COLD_IMPORT.format(module=module, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        best = min(best, float(output[0]))
+        loaded = output[1] if len(output) > 1 else ""
+    return best, loaded
+
+
+def bench_imports(modules=IMPORT_MODULES):
+    baseline, _ = cold_import("numpy")
+    print(f"cold import {'numpy':>15}: {baseline * 1000:8.1f} ms")
+    for module in modules:
+        elapsed, loaded = cold_import(module)
+        print(f"cold import {module:>15}: {elapsed * 1000:8.1f} ms, heavy modules: {loaded or '-'}")
+
+
+# Equivalence checks of the optimized code against the reference implementations, on small inputs
+CHECKS = {
+    "topsis": check_topsis,
+    "topsis_batch": check_topsis_batch,
+    "spcs": check_spcs,
+    "uta": check_uta,
+    "ahp": check_ahp,
+    "compare_rankings": check_compare_rankings,
+    "table_changes": check_table_changes,
+}
+
+BENCHMARKS = {
+    "topsis": bench_topsis,
+    "topsis_batch": bench_topsis_batch,
+    "spcs": bench_spcs,
+    "rsm_filtration": bench_rsm_filtration,
+    "rsm_scores": bench_rsm_scores,
+    "uta": bench_uta,
+    "ahp": bench_ahp,
+    "analysis": bench_analysis,
+    "compare_rankings": bench_compare_rankings,
+    "imports": bench_imports,
+    "sessions": bench_sessions,
+    "top_k": bench_top_k,
+    "table_changes": bench_table_changes,
+}
+
+
+def run_checks(names=None):
+    """Run the equivalence checks (all of them by default); returns 0, an AssertionError stops at the first failure."""
+    for name in names or list(CHECKS):
+        start = time.perf_counter()
+        CHECKS[name]()
+        print(f"check {name:>16}: ok ({time.perf_counter() - start:.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--check"]:
+        sys.exit(run_checks(sys.argv[2:]))
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -1,16 +1,185 @@
-import pandas as pd
 from typing import List
+import bisect
+import hashlib
+import json
 import os
+import sys
+import threading
+import numpy as np
+
+# Version of the layout of the compiled store, bump it when the files change
+STORE_VERSION = 1
+
+
+def store_path_for(file_path):
+    """Directory of the compiled store of a workbook: example_base.xlsx -> example_base.store"""
+    return os.path.splitext(file_path)[0] + ".store"
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_workbook(file_path, show_files_head=False):
+    """
+    Parse the workbook with pandas.
+
+    Returns:
+        dict: data_info_headers, data_headers (lists of str), info_ids (int array), info_text (str array with the
+        remaining data_info columns) and data (numeric matrix, ID in column 0).
+    """
+    import pandas as pd
+
+    # Load the Excel file into a pandas DataFrame for the "data" sheet
+    df_data = pd.read_excel(file_path, sheet_name="data")
+
+    # Load the Excel file into a pandas DataFrame for the "data_info" sheet
+    # an easy way to check whether data is well-structured
+    df_data_info = pd.read_excel(file_path, sheet_name="data_info")
+
+    # Optionally, print the first few rows of both DataFrames to check the data
+    if show_files_head:
+        print("Data sheet:")
+        print(df_data.head())
+
+        print("Data_info sheet:")
+        print(df_data_info.head())
+
+    return {
+        "data_info_headers": [str(header) for header in df_data_info.columns],
+        "data_headers": [str(header) for header in df_data.columns],
+        "info_ids": df_data_info.iloc[:, 0].to_numpy(dtype=np.int64),
+        "info_text": df_data_info.iloc[:, 1:].astype(str).to_numpy(dtype=str),
+        "data": np.ascontiguousarray(df_data.to_numpy()),
+    }
+
+
+def compile_database(file_path, store_path=None, sha256=None):
+    """
+    Compile the workbook into a columnar store of .npy files plus a manifest.json, which load_database
+    memory-maps instead of parsing the workbook again.
+
+    Parameters:
+        file_path (str): the workbook.
+        store_path (str): target directory, store_path_for(file_path) by default.
+        sha256 (str): hash of the workbook, when already known.
+
+    Returns:
+        dict: the parsed workbook, see read_workbook.
+    """
+    store_path = store_path or store_path_for(file_path)
+    stat = os.stat(file_path)
+    tables = read_workbook(file_path)
+    os.makedirs(store_path, exist_ok=True)
+
+    # Write every array under a temporary name first, the manifest last: a store is valid only once it exists
+    manifest_path = os.path.join(store_path, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    for name in ("data", "info_ids", "info_text"):
+        temporary_path = os.path.join(store_path, name + ".tmp.npy")
+        np.save(temporary_path, tables[name])
+        os.replace(temporary_path, os.path.join(store_path, name + ".npy"))
+
+    manifest = {
+        "version": STORE_VERSION,
+        "source": os.path.basename(file_path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": sha256 or file_sha256(file_path),
+        "data_info_headers": tables["data_info_headers"],
+        "data_headers": tables["data_headers"],
+    }
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=1)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return tables
+
+
+def load_database(file_path, store_path=None):
+    """
+    Columnar tables of the workbook, memory-mapped from its compiled store.
+
+    The workbook is only parsed again when the store is missing or outdated: the manifest records its mtime
+    and size, and on a mismatch its SHA-256 decides whether the content really changed.
+
+    Returns:
+        dict: see read_workbook; the arrays are read-only memory maps.
+    """
+    store_path = store_path or store_path_for(file_path)
+    manifest_path = os.path.join(store_path, "manifest.json")
+    stat = os.stat(file_path)
+
+    manifest = None
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("version") != STORE_VERSION:
+            manifest = None
+
+    if manifest is not None and (manifest["mtime_ns"], manifest["size"]) != (stat.st_mtime_ns, stat.st_size):
+        sha256 = file_sha256(file_path)
+        if sha256 != manifest["sha256"]:
+            manifest = None
+        else:
+            # Same content, only touched: remember the new mtime
+            manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            try:
+                with open(manifest_path + ".tmp", "w", encoding="utf-8") as file:
+                    json.dump(manifest, file, ensure_ascii=False, indent=1)
+                os.replace(manifest_path + ".tmp", manifest_path)
+            except OSError:
+                pass
+
+    if manifest is None:
+        try:
+            return compile_database(file_path, store_path)
+        except OSError as error:
+            # Read-only location: work from the parsed workbook
+            print(f"Cannot write the data store {store_path}: {error}")
+            return read_workbook(file_path)
+    return load_store(store_path, manifest)
+
+
+def load_store(store_path, manifest=None):
+    """
+    Columnar tables of a compiled store, memory-mapped without checking it against its workbook (load_database
+    does). Several processes can map the same store, only its compilation must happen once.
+
+    Parameters:
+        store_path (str): directory written by compile_database.
+        manifest (dict): its manifest.json, read from the directory when None.
+
+    Returns:
+        dict: see read_workbook; the arrays are read-only memory maps.
+    """
+    if manifest is None:
+        with open(os.path.join(store_path, "manifest.json"), encoding="utf-8") as file:
+            manifest = json.load(file)
+    tables = {
+        "data_info_headers": manifest["data_info_headers"],
+        "data_headers": manifest["data_headers"],
+    }
+    for name in ("data", "info_ids", "info_text"):
+        tables[name] = np.load(os.path.join(store_path, name + ".npy"), mmap_mode="r")
+    return tables
+
 
 def get_data_from_database(show_files_head=False):
     """
     Retrieves travel-related data from an Excel file and organizes it into separate lists for easier analysis.
 
+    The workbook is compiled once into a memory-mapped store (see load_database) and only parsed again when it changes.
+
     Returns:
         List[str]: data_info_headers - List of column headers as strings, representing city information [ID_header, header1, header2, etc].
-        List[List[int]]: data_info - Nested list of values, each sublist contains details for a specific city [ID, data_country, data_city, etc]. 
+        List[List[int]]: data_info - Nested list of values, each sublist contains details for a specific city [ID, data_country, data_city, etc].
         List[str]: data_headers - List of column headers as strings, representing various travel metrics [ID_header, header1, header2, header3, etc].
-        List[List[int]]: travel_metrics - Nested list of values, each sublist contains the metrics for a specific city [ID, data_safety, data_comfort, data, etc]. 
+        np.ndarray: travel_metrics - Read-only matrix, each row contains the metrics for a specific city [ID, data_safety, data_comfort, data, etc].
     """
 
     # Get the current working directory to construct the file path
@@ -24,35 +193,532 @@ def get_data_from_database(show_files_head=False):
 
     # Check if the file exists before attempting to read it
     if os.path.isfile(file_path):
-        # Load the Excel file into a pandas DataFrame for the "data" sheet
-        df_data = pd.read_excel(file_path, sheet_name="data")
-
-        # Load the Excel file into a pandas DataFrame for the "data_info" sheet
-        # an easy way to check whether data is well-structured
-        df_data_info = pd.read_excel(file_path, sheet_name="data_info")
-
-        # Optionally, print the first few rows of both DataFrames to check the data
         if show_files_head:
-            print("Data sheet:")
-            print(df_data.head())
-
-            print("Data_info sheet:")
-            print(df_data_info.head())
+            read_workbook(file_path, show_files_head=True)
+        tables = load_database(file_path)
     else:
         # If the file is not found, print an error message
         print(f"File does not exist: {file_path}")
         return
 
-    # Extract column headers from the DataFrames and data
-    data_info_headers = df_data_info.columns.tolist()
-    data_info: List[List[any]] = df_data_info.iloc[:,:].values.tolist()
+    # Extract column headers and data
+    data_info_headers = tables["data_info_headers"]
+    data_info: List[List[any]] = [[int(idx)] + list(text) for idx, text in
+                                  zip(tables["info_ids"], tables["info_text"].tolist())]
 
-    data_headers = df_data.columns.tolist()
-    data: List[List[int]] = df_data.iloc[:, :].values.tolist()
+    data_headers = tables["data_headers"]
+    data = tables["data"]
 
     # Return the organized data
     return data_info_headers, data_info, data_headers, data
 
+
+def _sums_of_squares(matrix, sums, stale):
+    """
+    The column sums of squares of matrix, np.einsum('ij,ij->j', matrix, matrix) to the bit, from sums which are up to
+    date but for the stale criteria. einsum adds the rows one after another, as cumsum does on a single column; a
+    strided column costs about as much to read as the whole matrix, so two stale criteria or more (or a single
+    criterion, whose einsum sums in another order) take one einsum.
+    """
+    columns = np.flatnonzero(stale)
+    if len(columns) > 1 or matrix.shape[1] == 1 or not matrix.shape[0]:
+        return np.einsum('ij,ij->j', matrix, matrix)
+    sums = sums.copy()
+    for j in columns:
+        column = matrix[:, j]
+        sums[j] = np.cumsum(column * column)[-1]
+    return sums
+
+
+class DestinationTable:
+    """
+    The destinations database as columns, built once at load and shared by every method (see the *_table
+    entry points of the methods modules). Tables compare by identity.
+
+    Attributes:
+        info_headers (List[str]): headers of the data_info sheet [ID_header, city_header, country_header].
+        criteria_headers (List[str]): headers of the criteria, without the ID column.
+        ids (np.ndarray): int64 database ID of every row.
+        matrix (np.ndarray): C-contiguous float64 criteria matrix (rows x criteria), without the ID column.
+        cities, countries (np.ndarray): interned city and country names of every row (object arrays).
+        minimum, maximum (np.ndarray): float64 minimum and maximum of every criterion.
+        row_index (Dict[int, int]): row of every ID.
+        version (int): number of apply_changes calls which changed the table.
+
+    The table changes only through apply_changes (and insert, update, delete), at a cost which grows with the
+    changed rows only: the rows live in buffers with room for inserts, deleted rows are only marked and updated
+    values kept aside. The next read of the content (the attributes above, column_norms, snapshot) applies all the
+    changes made since the previous read at once, see _compact. An array read from the table never changes, a change
+    after the read writes into a copy. Code running in another thread reads the table through snapshot(), whose
+    content never changes: the *_table entry points, the sessions of the methods, perform_analysis and
+    RankingCache.cached all take one snapshot per call.
+    """
+
+    def __init__(self, info_headers, criteria_headers, ids, matrix, cities, countries):
+        self.info_headers = info_headers
+        self.criteria_headers = criteria_headers
+        self.version = 0
+        # Buffers of the rows: the first _length rows are in use, the deleted ones too until _compact. _deleted
+        # keeps their slots (see _row_index) and _updated the new values of the updated rows, by buffer row
+        self._ids = np.ascontiguousarray(ids, dtype=np.int64)
+        self._matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        self._cities = np.asarray(cities, dtype=object)
+        self._countries = np.asarray(countries, dtype=object)
+        self._length = self._ids.shape[0]
+        self._deleted = {}
+        self._updated = {}
+        # Slot of every ID (None in a snapshot until its row_index is read): its buffer row plus the number of removed
+        # slots before it (see _row). Compacting the buffers only records the slots of the deleted rows, the dict is
+        # numbered again once they are many (or when row_index is read)
+        self._row_index = {idx: row for row, idx in enumerate(self._ids.tolist())}
+        self._removed = []
+        if self._length:
+            self._minimum = self._matrix.min(axis=0)
+            self._maximum = self._matrix.max(axis=0)
+        else:
+            self._minimum = np.full(self.number_of_criteria, np.nan)
+            self._maximum = np.full(self.number_of_criteria, np.nan)
+        self._sum_of_squares = np.einsum('ij,ij->j', self._matrix, self._matrix)
+        # Criteria whose extremes or sum of squares _compact computes again from their column
+        self._stale_extremes = np.zeros(self.number_of_criteria, dtype=bool)
+        self._stale_sums = np.zeros(self.number_of_criteria, dtype=bool)
+        # True while apply_changes left work for _compact
+        self._pending = False
+        # The rows in use of the matrix buffer may be read elsewhere (the given arrays, an attribute, a snapshot): an
+        # update copies the buffer before writing into it
+        self._shared = True
+        # Fingerprint of this content, shared by its snapshots (see fingerprint)
+        self._digest = {}
+        self._read_only = False
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"{type(self).__name__}({len(self)} destinations, {self.number_of_criteria} criteria, "
+                f"version {self.version})")
+
+    def __getstate__(self):
+        # The content of a snapshot: the rows in use, without the pending changes
+        state = self.snapshot().__dict__.copy()
+        del state["_lock"]
+        state["_read_only"] = self._read_only
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _lock=threading.Lock())
+        if self._row_index is None and not self._read_only:
+            self._renumber()
+
+    def snapshot(self):
+        """
+        The current content of the table as a table which never changes (no array is copied). A snapshot can be
+        ranked while apply_changes changes the table on another thread; a snapshot is its own snapshot.
+        """
+        if self._read_only:
+            return self
+        with self._lock:
+            self._compact()
+            self._shared = True
+            state = self.__dict__.copy()
+        length = state["_length"]
+        snapshot = object.__new__(type(self))
+        snapshot.__dict__.update(state, _ids=state["_ids"][:length], _matrix=state["_matrix"][:length],
+                                 _cities=state["_cities"][:length], _countries=state["_countries"][:length],
+                                 _deleted={}, _updated={}, _pending=False, _row_index=None, _removed=[],
+                                 _read_only=True, _lock=threading.Lock())
+        return snapshot
+
+    @classmethod
+    def from_tables(cls, tables):
+        """Build the table from the columns of load_database (or read_workbook)."""
+        data = tables["data"]
+        ids = np.asarray(data[:, 0], dtype=np.int64)
+
+        # Names of every data row, matched by ID (rows without data_info get empty names)
+        info_row = {idx: row for row, idx in enumerate(np.asarray(tables["info_ids"]).tolist())}
+        info_text = np.asarray(tables["info_text"]).tolist()
+        names = [info_text[info_row[idx]] if idx in info_row else [] for idx in ids.tolist()]
+        cities = np.array([sys.intern(str(row[0])) if len(row) > 0 else "" for row in names], dtype=object)
+        countries = np.array([sys.intern(str(row[1])) if len(row) > 1 else "" for row in names], dtype=object)
+
+        return cls(list(tables["data_info_headers"]), list(tables["data_headers"][1:]), ids, data[:, 1:],
+                   cities, countries)
+
+    def __len__(self):
+        with self._lock:
+            return self._length - len(self._deleted)
+
+    def __contains__(self, idx):
+        """Whether the table has a destination with the given ID."""
+        if self._read_only:
+            return int(idx) in self.row_index
+        with self._lock:
+            return int(idx) in self._row_index
+
+    def _rows(self, name):
+        """The rows in use of a buffer once the changes are applied, a view which never changes (see _shared)."""
+        if self._read_only:
+            return getattr(self, name)[:self._length]
+        with self._lock:
+            self._compact()
+            self._shared = True
+            return getattr(self, name)[:self._length]
+
+    def _current(self, name):
+        """An attribute once the changes are applied."""
+        if self._read_only:
+            return getattr(self, name)
+        with self._lock:
+            self._compact()
+            return getattr(self, name)
+
+    @property
+    def ids(self):
+        return self._rows("_ids")
+
+    @property
+    def matrix(self):
+        return self._rows("_matrix")
+
+    @property
+    def cities(self):
+        return self._rows("_cities")
+
+    @property
+    def countries(self):
+        return self._rows("_countries")
+
+    @property
+    def minimum(self):
+        return self._current("_minimum")
+
+    @property
+    def maximum(self):
+        return self._current("_maximum")
+
+    @property
+    def row_index(self):
+        """Row of every ID; the dict of the table changes with it, the one of a snapshot is built on first use."""
+        if self._read_only:
+            if self._row_index is None:
+                self._renumber()
+            return self._row_index
+        with self._lock:
+            self._compact()
+            if self._removed:
+                self._renumber()
+            return self._row_index
+
+    @property
+    def fingerprint(self):
+        """SHA-256 of the IDs and the criteria matrix, computed once per content: identifies the content."""
+        data = self.snapshot()
+        if "sha256" not in data._digest:
+            digest = hashlib.sha256()
+            digest.update(np.asarray(data.matrix.shape, dtype=np.int64).tobytes())
+            digest.update(data.ids.tobytes())
+            digest.update(data.matrix.tobytes())
+            data._digest["sha256"] = digest.hexdigest()
+        return data._digest["sha256"]
+
+    @property
+    def number_of_criteria(self):
+        return self._matrix.shape[1]
+
+    @property
+    def column_norms(self):
+        """
+        Euclidean norm of every criterion over all the rows, the TOPSIS normalization factors; always equal (to the
+        bit) to methods.topsis.column_norms of the matrix.
+        """
+        return np.sqrt(self._current("_sum_of_squares"))
+
+    def criterion_index(self, criterion):
+        """Index of a criterion given by its index or its header."""
+        if isinstance(criterion, str) and not criterion.lstrip("-").isdigit():
+            return self.criteria_headers.index(criterion)
+        index = int(criterion)
+        if not 0 <= index < self.number_of_criteria:
+            raise IndexError(f"No criterion {criterion}")
+        return index
+
+    def _values(self, rows):
+        """Current criteria values of buffer rows, the pending updates included."""
+        values = self._matrix[rows]
+        for position, row in enumerate(rows):
+            if row in self._updated:
+                values[position] = self._updated[row]
+        return values
+
+    def _criteria_row(self, values, row=None):
+        """Full criteria row of a list of values, or of a {criterion: value} dict applied to a buffer row."""
+        if isinstance(values, dict):
+            if row is None:
+                raise ValueError("A new destination needs the values of all the criteria")
+            new_row = self._values([row])[0]
+            for criterion, value in values.items():
+                new_row[self.criterion_index(criterion)] = float(value)
+            return new_row
+        new_row = np.asarray(values, dtype=np.float64).ravel()
+        if new_row.shape[0] != self.number_of_criteria:
+            raise ValueError(f"Expected {self.number_of_criteria} criteria values, got {new_row.shape[0]}")
+        return new_row
+
+    def _row(self, slot):
+        """Buffer row of a slot of _row_index."""
+        return slot - bisect.bisect_left(self._removed, slot)
+
+    def _renumber(self):
+        """Number the slots of _row_index as the rows again, once the buffers are compacted."""
+        self._row_index = dict(zip(self._ids[:self._length].tolist(), range(self._length)))
+        self._removed = []
+
+    def _reserve(self, count):
+        """Room for count more rows at the end of the buffers, which at least double when they grow."""
+        capacity = self._matrix.shape[0]
+        if self._length + count <= capacity:
+            return
+        capacity = max(self._length + count, 2 * capacity, 16)
+        for name in ("_ids", "_matrix", "_cities", "_countries"):
+            buffer = getattr(self, name)
+            grown = np.empty((capacity,) + buffer.shape[1:], dtype=buffer.dtype)
+            grown[:self._length] = buffer[:self._length]
+            setattr(self, name, grown)
+        self._shared = False
+
+    def _compact(self):
+        """
+        Apply the pending changes, under the lock: the rows after the first deleted one move up, the updated values
+        are written into the matrix buffer, and the stale extremes and sums of squares are computed again from their
+        columns. Buffers read since they were last copied are copied first, the views read before keep their content.
+        Nothing to do when nothing changed since the previous read.
+        """
+        if not self._pending:
+            return
+        updated = self._updated
+        if self._deleted:
+            deleted = np.array(sorted(self._deleted), dtype=np.int64)
+            first = int(deleted[0])
+            kept = np.ones(self._length - first, dtype=bool)
+            kept[deleted - first] = False
+            length = self._length - len(deleted)
+            # The rows after the first deleted one move up, in place unless the buffers were read
+            for name in ("_ids", "_matrix", "_cities", "_countries"):
+                buffer = getattr(self, name)
+                compacted = buffer
+                if self._shared:
+                    compacted = np.empty(buffer.shape, dtype=buffer.dtype)
+                    compacted[:first] = buffer[:first]
+                compacted[first:length] = buffer[first:self._length][kept]
+                setattr(self, name, compacted)
+            updated = {row - int(np.searchsorted(deleted, row)): values for row, values in updated.items()}
+            self._length = length
+            self._removed = sorted(self._removed + list(self._deleted.values()))
+            self._deleted = {}
+            self._shared = False
+            if len(self._removed) > self._length // 8:
+                self._renumber()
+        if updated:
+            if self._shared:
+                matrix = np.empty(self._matrix.shape)
+                matrix[:self._length] = self._matrix[:self._length]
+                self._matrix = matrix
+                self._shared = False
+            self._matrix[list(updated)] = list(updated.values())
+        self._updated = {}
+
+        matrix = self._matrix[:self._length]
+        if not self._length:
+            self._minimum = np.full(self.number_of_criteria, np.nan)
+            self._maximum = np.full(self.number_of_criteria, np.nan)
+        elif self._stale_extremes.any():
+            minimum, maximum = self._minimum.copy(), self._maximum.copy()
+            for j in np.flatnonzero(self._stale_extremes):
+                minimum[j] = matrix[:, j].min()
+                maximum[j] = matrix[:, j].max()
+            self._minimum, self._maximum = minimum, maximum
+        if self._stale_sums.any():
+            self._sum_of_squares = _sums_of_squares(matrix, self._sum_of_squares, self._stale_sums)
+        self._stale_extremes = np.zeros(self.number_of_criteria, dtype=bool)
+        self._stale_sums = np.zeros(self.number_of_criteria, dtype=bool)
+        self._pending = False
+
+    def apply_changes(self, inserts=None, updates=None, deletes=None):
+        """
+        Insert, update and delete destinations by ID, without reloading the database.
+
+        The deletes are applied first, then the updates, then the inserts (at the end of the table). The changes are
+        checked before any of them is applied: on an error the table is left unchanged. A change costs the changed
+        rows only: the inserted rows are written at the end of the buffers, the deleted rows are marked and the
+        updated values kept aside until the next read of the table, which applies them all at once (see _compact).
+
+        The minimum and maximum of a criterion are only computed again from its column when a removed value was one
+        of them. The squares of the inserted rows are added to the column sums of squares in row order, which gives
+        the same sums as a new einsum over the matrix; the criteria where a delete removes a value other than 0 or an
+        update changes a value are summed again from their column, so that the sums stay exact (a subtraction
+        would drift from them).
+
+        Parameters:
+        inserts (List[dict]): new destinations {"id": ID, "values": criteria values, "city": ..., "country": ...}.
+        updates (Dict[int, list | dict]): new criteria values of an ID, all of them or {criterion: value}
+            (criteria by index or header).
+        deletes (List[int]): IDs to delete.
+
+        Returns:
+        bool: True if the table changed (its version grew).
+
+        Raises:
+        KeyError: an updated or deleted ID is unknown.
+        ValueError: an inserted ID already exists, or the values do not match the criteria.
+        TypeError: the table is a snapshot.
+        """
+        if self._read_only:
+            raise TypeError("A snapshot of a DestinationTable does not change")
+        with self._lock:
+            row_index = self._row_index
+            # Slots of the deleted rows, by buffer row
+            deleted = {}
+            for idx in deletes or []:
+                slot = row_index[int(idx)]
+                deleted[self._row(slot)] = slot
+            deleted_rows = sorted(deleted)
+
+            updated_rows, updated_values = [], []
+            for idx, values in (updates or {}).items():
+                row = self._row(row_index[int(idx)])
+                if row in deleted or row in updated_rows:
+                    raise ValueError(f"ID {idx} is changed twice")
+                updated_rows.append(row)
+                updated_values.append(self._criteria_row(values, row))
+
+            inserted_ids, inserted_values, inserted_cities, inserted_countries = [], [], [], []
+            for insert in inserts or []:
+                idx = int(insert["id"])
+                if (idx in row_index and self._row(row_index[idx]) not in deleted) or idx in inserted_ids:
+                    raise ValueError(f"ID {idx} already exists")
+                inserted_ids.append(idx)
+                inserted_values.append(self._criteria_row(insert["values"]))
+                inserted_cities.append(sys.intern(str(insert.get("city", ""))))
+                inserted_countries.append(sys.intern(str(insert.get("country", ""))))
+
+            if not (deleted_rows or updated_rows or inserted_ids):
+                return False
+
+            number_of_criteria = self.number_of_criteria
+            removed = self._values(deleted_rows + updated_rows)
+            added = np.array(updated_values + inserted_values, dtype=np.float64).reshape(-1, number_of_criteria)
+            inserted = added[len(updated_rows):]
+
+            # Criteria whose minimum or maximum is removed are rescanned by _compact, the added values are compared
+            minimum, maximum, stale_extremes = self._minimum, self._maximum, self._stale_extremes
+            if removed.shape[0]:
+                stale_extremes = stale_extremes | (removed.min(axis=0) <= minimum) | (removed.max(axis=0) >= maximum)
+            if added.shape[0]:
+                minimum = np.fmin(minimum, added.min(axis=0))
+                maximum = np.fmax(maximum, added.max(axis=0))
+
+            # einsum adds the rows one after another: the squares of appended rows can be added in the same order,
+            # removing a 0 leaves the sum as it is (a single criterion is summed in another order, see
+            # _sums_of_squares)
+            stale_sums = (self._stale_sums | (removed[:len(deleted_rows)] != 0).any(axis=0)
+                          | (removed[len(deleted_rows):] != added[:len(updated_rows)]).any(axis=0))
+            sum_of_squares = self._sum_of_squares
+            if len(inserted) and number_of_criteria == 1:
+                stale_sums = np.ones(1, dtype=bool)
+            elif len(inserted):
+                sum_of_squares = np.add.reduce(np.vstack([sum_of_squares, inserted * inserted]), axis=0)
+
+            for row in deleted_rows:
+                self._deleted[row] = deleted[row]
+                self._updated.pop(row, None)
+                del row_index[int(self._ids[row])]
+            self._updated.update(zip(updated_rows, updated_values))
+            if inserted_ids:
+                self._reserve(len(inserted_ids))
+                start, end = self._length, self._length + len(inserted_ids)
+                self._ids[start:end] = inserted_ids
+                self._matrix[start:end] = inserted
+                self._cities[start:end] = inserted_cities
+                self._countries[start:end] = inserted_countries
+                # After every removed slot
+                row_index.update(zip(inserted_ids, range(start + len(self._removed), end + len(self._removed))))
+                self._length = end
+
+            self._minimum, self._maximum, self._stale_extremes = minimum, maximum, stale_extremes
+            self._sum_of_squares, self._stale_sums = sum_of_squares, stale_sums
+            self._digest = {}
+            self._pending = True
+            self.version += 1
+            return True
+
+    def insert(self, idx, values, city="", country=""):
+        """Add a destination, see apply_changes."""
+        return self.apply_changes(inserts=[{"id": idx, "values": values, "city": city, "country": country}])
+
+    def update(self, idx, values):
+        """New criteria values of a destination (all of them or {criterion: value}), see apply_changes."""
+        return self.apply_changes(updates={idx: values})
+
+    def delete(self, idx):
+        """Remove a destination, see apply_changes."""
+        return self.apply_changes(deletes=[idx])
+
+    def row_of(self, idx):
+        """Row of the destination with the given ID (KeyError if it is unknown)."""
+        if self._read_only:
+            return self.row_index[int(idx)]
+        with self._lock:
+            self._compact()
+            return self._row(self._row_index[int(idx)])
+
+    def label(self, idx):
+        """(city, country) of the destination with the given ID."""
+        if self._read_only:
+            row = self.row_index[int(idx)]
+            return self._cities[row], self._countries[row]
+        with self._lock:
+            self._compact()
+            row = self._row(self._row_index[int(idx)])
+            return self._cities[row], self._countries[row]
+
+    def rows(self):
+        """Float matrix [ID, criterion1, criterion2, ...], the travel metrics layout of get_data_from_database."""
+        data = self.snapshot()
+        return np.column_stack([data.ids, data.matrix])
+
+
+def read_changes(file_path):
+    """
+    Changes of the destinations from a JSON file, the arguments of DestinationTable.apply_changes:
+
+        {"insert": [{"id": 501, "city": "Porto", "country": "Portugalia", "values": [...]}],
+         "update": {"12": {"3": 120.0}, "15": [...]},
+         "delete": [7, 9]}
+
+    Returns:
+        dict: inserts, updates (with int IDs) and deletes, every key optional in the file.
+    """
+    with open(file_path, encoding="utf-8") as file:
+        changes = json.load(file)
+    return {
+        "inserts": changes.get("insert", []),
+        "updates": {int(idx): values for idx, values in changes.get("update", {}).items()},
+        "deletes": [int(idx) for idx in changes.get("delete", [])],
+    }
+
+
+def load_destination_table(file_name="example_base.xlsx"):
+    """
+    DestinationTable of the workbook in the current working directory, see load_database.
+
+    Returns:
+        DestinationTable: or None if the file does not exist.
+    """
+    file_path = os.path.join(os.getcwd(), file_name)
+    if not os.path.isfile(file_path):
+        print(f"File does not exist: {file_path}")
+        return None
+    return DestinationTable.from_tables(load_database(file_path))
+
 # Main function execution
 if __name__ == "__main__":
     retu = get_data_from_database()
@@ -0,0 +1,211 @@
+"""
+Background jobs for the Tk windows.
+
+The rankings are computed in a thread pool; the Tk event loop polls the jobs with `after` and runs the callbacks
+on its own thread, so the windows keep responding. Jobs are identified by a key (one per window): clicking again
+while a job with the same inputs runs does nothing, and new inputs replace the job waiting behind the running one.
+The live ranking of the method windows debounces the edits (JobPanel.schedule) before submitting them.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+import tkinter as tk
+from tkinter import ttk
+
+# Polling period of the running jobs (ms)
+POLL_MS = 50
+
+# Delay of the live ranking after the last edit (ms)
+DEBOUNCE_MS = 200
+
+
+class _Job:
+    def __init__(self, function, args, kwargs, on_done, on_error, on_cancel):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.future = None
+        self.cancelled = False
+
+    def same_as(self, function, args, kwargs):
+        return self.function == function and len(self.args) == len(args) and all(
+            a is b or (type(a) is type(b) and a == b) for a, b in zip(self.args, args)) and self.kwargs == kwargs
+
+
+class JobRunner:
+    """
+    Thread pool whose results come back on the Tk thread.
+
+    Parameters:
+    widget (tk.Misc): widget whose `after` drives the polling (normally the root window).
+    max_workers (int): number of worker threads.
+    poll_ms (int): polling period of the running jobs.
+    """
+
+    def __init__(self, widget, max_workers=2, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ranking")
+        self._running = {}
+        self._pending = {}
+        self._polling = False
+
+    def submit(self, key, function, *args, on_done=None, on_error=None, on_cancel=None, **kwargs):
+        """
+        Run function(*args, **kwargs) in the background; on_done(result), on_error(exception) or on_cancel() are called
+        on the Tk thread.
+
+        Returns:
+        bool: False when the call was coalesced with the job of the key running with the same arguments.
+        """
+        running = self._running.get(key)
+        if running is not None and not running.cancelled and running.same_as(function, args, kwargs):
+            self._pending.pop(key, None)
+            return False
+
+        job = _Job(function, args, kwargs, on_done, on_error, on_cancel)
+        if running is not None:
+            # Only the latest inputs wait behind the running job
+            replaced = self._pending.pop(key, None)
+            if replaced is not None and replaced.on_cancel is not None:
+                replaced.on_cancel()
+            self._pending[key] = job
+        else:
+            self._start(key, job)
+        return True
+
+    def cancel(self, key):
+        """Cancel the jobs of a key: the waiting one is dropped and the result of the running one ignored."""
+        pending = self._pending.pop(key, None)
+        running = self._running.get(key)
+        if running is not None and not running.cancelled:
+            running.cancelled = True
+            running.future.cancel()
+            if running.on_cancel is not None:
+                running.on_cancel()
+        elif pending is not None and pending.on_cancel is not None:
+            pending.on_cancel()
+
+    def is_busy(self, key):
+        running = self._running.get(key)
+        return running is not None and not running.cancelled
+
+    def shutdown(self):
+        for key in list(self._running):
+            self.cancel(key)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, key, job):
+        job.future = self._executor.submit(job.function, *job.args, **job.kwargs)
+        self._running[key] = job
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        for key, job in list(self._running.items()):
+            if not job.future.done():
+                continue
+            del self._running[key]
+
+            # A result superseded by newer inputs is not shown, the job of the newer inputs starts instead
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                self._start(key, pending)
+            elif not job.cancelled:
+                try:
+                    error = job.future.exception()
+                    if error is not None:
+                        if job.on_error is not None:
+                            job.on_error(error)
+                        else:
+                            print(f"Background job error: {error}")
+                    elif job.on_done is not None:
+                        job.on_done(job.future.result())
+                except tk.TclError:
+                    # The window of the job was closed meanwhile
+                    pass
+
+        if self._running:
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+
+class JobPanel(tk.Frame):
+    """
+    Progress bar, status and cancel button of the background job of one window.
+
+    Parameters:
+    master (tk.Misc): parent widget.
+    runner (JobRunner): runner of the jobs.
+    """
+
+    def __init__(self, master, runner, **kwargs):
+        super().__init__(master, **kwargs)
+        self.runner = runner
+        self.progress = ttk.Progressbar(self, mode="indeterminate", length=160)
+        self.progress.grid(row=0, column=0, padx=5)
+        self.cancel_button = tk.Button(self, text="Anuluj", command=self.cancel, state=tk.DISABLED)
+        self.cancel_button.grid(row=0, column=1, padx=5)
+        self.status = tk.Label(self, text="")
+        self.status.grid(row=0, column=2, padx=5, sticky="w")
+        self._scheduled = None
+        # Closing the window cancels its job
+        self.bind("<Destroy>", lambda event: self._destroyed() if event.widget is self else None)
+
+    def run(self, on_done, function, *args, **kwargs):
+        """Compute function(*args, **kwargs) in the background and pass the result to on_done on the Tk thread."""
+        clicked = time.perf_counter()
+
+        def done(result):
+            self._idle(f"Gotowe ({time.perf_counter() - clicked:.2f} s)")
+            on_done(result)
+
+        def failed(error):
+            self._idle(f"Błąd: {error}")
+
+        started = self.runner.submit(self, function, *args, on_done=done, on_error=failed,
+                                     on_cancel=lambda: self._idle("Anulowano"), **kwargs)
+        if started or self.runner.is_busy(self):
+            self.progress.start(10)
+            self.cancel_button.config(state=tk.NORMAL)
+            self.status.config(text="Obliczanie..." if started else "Obliczanie trwa...")
+
+    def schedule(self, callback, delay_ms=DEBOUNCE_MS):
+        """Call callback once no other call came for delay_ms: every call postpones the previous one."""
+        self._unschedule()
+        self._scheduled = self.after(delay_ms, self._fire, callback)
+
+    def cancel(self):
+        self._unschedule()
+        self.runner.cancel(self)
+
+    def _fire(self, callback):
+        self._scheduled = None
+        callback()
+
+    def _unschedule(self):
+        if self._scheduled is not None:
+            self.after_cancel(self._scheduled)
+            self._scheduled = None
+
+    def _destroyed(self):
+        try:
+            self._unschedule()
+        except tk.TclError:
+            pass
+        self.runner.cancel(self)
+
+    def _idle(self, text):
+        if self.runner.is_busy(self):
+            return
+        try:
+            self.progress.stop()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status.config(text=text)
+        except tk.TclError:
+            # Called while the window is being destroyed
+            pass
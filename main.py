@@ -5,16 +5,13 @@ import methods.UTA as UTA
 import methods.Sp_Cs as Sp_Cs
 import methods.AHP as AHP
 import analysis
+from ranking_cache import RankingCache
+from jobs import JobPanel, JobRunner
+from ranking_view import RankingView, TreePager
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
 from itertools import cycle
 import numpy as np
-import matplotlib
-
-matplotlib.use("TkAgg")
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 
 # window size
 global_window_width = 1500
@@ -28,25 +25,53 @@ def try_conv(vector):
     except ValueError:
         return False
 
-def open_analysis_window(r):
+def criteria_range(table):
+    """Minimum and maximum of every criterion, kept by the table (integral ones shown without a fraction)."""
+    return ([int(value) if value.is_integer() else value for value in table.minimum.tolist()],
+            [int(value) if value.is_integer() else value for value in table.maximum.tolist()])
+
+
+def matplotlib_tk():
+    """
+    Figure and FigureCanvasTkAgg classes, imported on first use: matplotlib is only needed by the analysis
+    dashboard, so the start of the application (and its worker processes) does not pay for it.
+    """
+    import matplotlib
+
+    matplotlib.use("TkAgg")
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.figure import Figure
+    return Figure, FigureCanvasTkAgg
+
+
+def open_analysis_window(table):
     """
     Advanced Analysis Dashboard with Heatmap and Consensus Table.
+
+    The analysis runs in the background (progress and cancellation on the main window), the dashboard opens
+    when it is done.
     """
 
     # 1. Run Calculations
-    num_crit = len(r[3][0]) - 1
+    num_crit = table.number_of_criteria
     lower = [0] * num_crit
     upper = [100000] * num_crit
     weights = [1.0 / num_crit] * num_crit
     benefits = [1] * num_crit  # Assume Maximize for analysis
 
-    rankings, corr_matrix, consensus = analysis.perform_analysis(r[3], lower, upper, weights, benefits)
+    # Methods run concurrently (threads or processes per method); a method stuck for 2 minutes is skipped
+    analysis_panel.run(lambda result: show_analysis_dashboard(table, *result), analysis.perform_analysis, table,
+                       lower, upper, weights, benefits, 'auto', 120)
 
+
+def show_analysis_dashboard(table, rankings, corr_matrix, consensus):
+    """Dashboard of the results of perform_analysis."""
     if not rankings:
         messagebox.showerror("Analysis Failed", "Could not generate rankings for comparison.")
         return
 
     methods = list(rankings.keys())
+    Figure, FigureCanvasTkAgg = matplotlib_tk()
 
     # --- GUI SETUP ---
     def end_fullscreen(event=None):
@@ -110,17 +135,12 @@ def open_analysis_window(r):
     top_ids = [x[0] for x in top_5]
     top_scores = [x[1]['avg_rank'] for x in top_5]
 
-    # Map IDs to City Names
-    # r[1] contains data_info. Assumes ID matches index in r[1] or ID column logic.
-    # Let's verify structure: r[3] has ID in col 0. r[1] has ID, City, Country.
+    # Map IDs to City Names (ID index of the table)
     city_names = []
     for uid in top_ids:
         name = f"ID {uid}"
-        # Search in r[1]
-        for row in r[1]:
-            if int(row[0]) == int(uid):
-                name = row[1]  # City name
-                break
+        if int(uid) in table:
+            name = table.label(uid)[0]  # City name
         city_names.append(name)
 
     fig2 = Figure(figsize=(5, 5), dpi=100)
@@ -150,36 +170,39 @@ def open_analysis_window(r):
         tree.column(col, width=100, anchor='center')
     tree.column("Miasto", width=150, anchor='w')
 
+    # Page buttons below the table
+    page_frame = tk.Frame(tab2)
+    page_frame.pack(side=tk.BOTTOM, pady=5)
+
     # Scrollbar
     scrollbar = ttk.Scrollbar(tab2, orient=tk.VERTICAL, command=tree.yview)
     tree.configure(yscroll=scrollbar.set)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-    # Insert Data
-    for idx, (uid, stats) in enumerate(consensus):
+    # Values of one row, computed only for the rows of the shown page
+    def row_values(idx):
+        uid, stats = consensus[idx]
         # Find City Name
         city_name = "Unknown"
         country_name = ""
-        for row in r[1]:
-            if int(row[0]) == int(uid):
-                city_name = row[1]
-                country_name = row[2]
-                break
+        if int(uid) in table:
+            city_name, country_name = table.label(uid)
 
         full_name = f"{city_name}, {country_name}"
 
-        values = [idx + 1, full_name, f"{stats['avg_rank']:.2f}"] + stats['ranks']
-        tree.insert("", "end", values=values)
+        return [idx + 1, full_name, f"{stats['avg_rank']:.2f}"] + stats['ranks']
+
+    # Insert Data, one page at a time
+    TreePager(tree, page_frame, len(consensus), row_values)
 
     # Footer Button
     btn_frame = tk.Frame(win)
     btn_frame.pack(pady=10)
     tk.Button(btn_frame, text="Zamknij", command=win.destroy, bg="#d9534f", fg="white", width=15).pack()
 
-def open_topsis_window(r, minimum, benefit_attributes_):
-    def fun_method():
-        ranking_area.delete('1.0', tk.END)  # Clear the ranking area
+def open_topsis_window(table, minimum, benefit_attributes_):
+    def fun_method(live=False):
         lower_limits_ = []
         upper_limits_ = []
         weight_vector_ = []
@@ -199,16 +222,31 @@ def open_topsis_window(r, minimum, benefit_attributes_):
             sum_weight_vector = sum(weight_vector_)
             weight_vector_normalized = [el / sum_weight_vector for el in weight_vector_]
 
-            result_ = topsis.topsis(r[3], lower_limits_, upper_limits_, weight_vector_normalized,
-                                    benefit_attributes_)
-            text = ""
-            for i in range(len(result_)):
-                text += f"{i + 1}. {r[1][result_[i]][1]}, {r[1][result_[i]][2]}\n"
+            def show_ranking(result_):
+                ranking_view.show(result_)
 
-            ranking_area.insert(tk.END, text)
-        else:
+            # Computed in the background, the window keeps responding
+            if live:
+                job_panel.run(show_ranking, session.rank, lower_limits_, upper_limits_, weight_vector_normalized,
+                              benefit_attributes_, top_k=ranking_view.top_k)
+            else:
+                job_panel.run(show_ranking, ranking_cache.cached, "topsis", topsis.topsis_table, table,
+                              lower_limits_, upper_limits_, weight_vector_normalized, benefit_attributes_,
+                              top_k=ranking_view.top_k)
+        elif not live:
             messagebox.showwarning("Warning", "Wrong value entered!")
 
+    def live_update(event=None):
+        # Ranking na żywo: przeliczany po chwili od ostatniej zmiany, wygrywa najnowsza
+        if live_var.get():
+            job_panel.schedule(live_rank)
+
+    def live_rank():
+        try:
+            fun_method(live=True)
+        except (ValueError, ZeroDivisionError):
+            pass  # Wartość w trakcie wpisywania
+
     new_window = tk.Toplevel(root)
     new_window.title("Topsis")
 
@@ -228,7 +266,7 @@ def open_topsis_window(r, minimum, benefit_attributes_):
     criteria_frame.grid(row=0, column=0, sticky="news", padx=10, pady=5)
 
     # Define the criteria here
-    criteria_labels = r[2][1:]  # Add more criteria as needed
+    criteria_labels = table.criteria_headers  # Add more criteria as needed
     criteria_entries = []
 
     # Add labels for Min, Max, Weight above the columns
@@ -249,17 +287,16 @@ def open_topsis_window(r, minimum, benefit_attributes_):
                 entry.insert(tk.END, str(maximum[i]))
             elif j % 3 - 2 == 0:
                 entry.insert(tk.END, str(1 / len(minimum) * 100))
+            entry.bind("<KeyRelease>", live_update)
             criteria_entries.append(entry)
 
     # Ranking frame with scrolling text
     ranking_frame = tk.LabelFrame(new_window, text="Ranking", padx=5, pady=5)
     ranking_frame.grid(row=0, column=1, rowspan=2, sticky="nsew", padx=10, pady=5)
-    ranking_area = tk.Text(ranking_frame, wrap=tk.WORD)
-    ranking_area.grid(row=0, column=0, sticky="nsew")
-
-    scrollbar_ranking = tk.Scrollbar(ranking_frame, orient="vertical", command=ranking_area.yview)
-    ranking_area['yscrollcommand'] = scrollbar_ranking.set
-    scrollbar_ranking.grid(row=0, column=1, sticky='nsew')
+    # Only the visible lines of the ranking are rendered
+    ranking_view = RankingView(ranking_frame, table)
+    ranking_view.grid(row=0, column=0, sticky="nsew")
+    ranking_view.top_k_entry.bind("<KeyRelease>", live_update)
 
     button_frame = tk.Frame(new_window)
     button_frame.grid(row=1, column=0, padx=5, pady=5)
@@ -270,15 +307,24 @@ def open_topsis_window(r, minimum, benefit_attributes_):
     return_button = tk.Button(button_frame, text="Powrót do okna głównego", command=new_window.destroy)
     return_button.grid(row=0, column=1, pady=5)
 
+    # Progress and cancellation of the ranking computed in the background
+    job_panel = JobPanel(button_frame, job_runner)
+    job_panel.grid(row=1, column=0, columnspan=2, pady=5)
+
+    # Live ranking, reusing the normalizations of the previous inputs
+    session = topsis.TopsisSession(table)
+    live_var = tk.BooleanVar(value=False)
+    live_button = tk.Checkbutton(button_frame, text="Ranking na żywo", variable=live_var, command=live_update)
+    live_button.grid(row=2, column=0, columnspan=2, pady=5)
+
     new_window.grid_columnconfigure(1, weight=1)
     new_window.grid_rowconfigure(0, weight=1)
     ranking_frame.grid_columnconfigure(0, weight=1)
     ranking_frame.grid_rowconfigure(0, weight=1)
 
 
-def open_RSM_window(r, minimum, benefit_attributes_):
+def open_RSM_window(table, minimum, benefit_attributes_):
     def fun_method():
-        ranking_area.delete('1.0', tk.END)  # Clear the ranking area
         lower_limits_ = []
         upper_limits_ = []
         is_active_ = []
@@ -295,12 +341,11 @@ def open_RSM_window(r, minimum, benefit_attributes_):
             lower_limits_ = list(map(float, lower_limits_))
             upper_limits_ = list(map(float, upper_limits_))
             is_active_ = list(map(float, is_active_))
-            result_ = rsm.rsm(r[3], lower_limits_, upper_limits_, is_active_, benefit_attributes_)
-            text = ""
-            for i in range(len(result_)):
-                text += f"{i + 1}. {r[1][result_[i]][1]}, {r[1][result_[i]][2]}\n"
+            def show_ranking(result_):
+                ranking_view.show(result_)
 
-            ranking_area.insert(tk.END, text)
+            job_panel.run(show_ranking, ranking_cache.cached, "rsm", rsm.rsm_table, table, lower_limits_,
+                          upper_limits_, is_active_, benefit_attributes_, top_k=ranking_view.top_k)
         else:
             messagebox.showwarning("Warning", "Wrong value entered!")
 
@@ -319,7 +364,7 @@ def open_RSM_window(r, minimum, benefit_attributes_):
     criteria_frame.grid(row=0, column=0, sticky="news", padx=10, pady=5)
 
     # Define the criteria here
-    criteria_labels = r[2][1:]  # Add more criteria as needed
+    criteria_labels = table.criteria_headers  # Add more criteria as needed
     criteria_entries = []
 
     # Add labels for Min, Max, Weight above the columns
@@ -349,12 +394,9 @@ def open_RSM_window(r, minimum, benefit_attributes_):
     # Ranking frame with scrolling text
     ranking_frame = tk.LabelFrame(new_window, text="Ranking", padx=5, pady=5)
     ranking_frame.grid(row=0, column=1, rowspan=2, sticky="nsew", padx=10, pady=5)
-    ranking_area = tk.Text(ranking_frame, wrap=tk.WORD)
-    ranking_area.grid(row=0, column=0, sticky="nsew")
-
-    scrollbar_ranking = tk.Scrollbar(ranking_frame, orient="vertical", command=ranking_area.yview)
-    ranking_area['yscrollcommand'] = scrollbar_ranking.set
-    scrollbar_ranking.grid(row=0, column=1, sticky='nsew')
+    # Only the visible lines of the ranking are rendered
+    ranking_view = RankingView(ranking_frame, table)
+    ranking_view.grid(row=0, column=0, sticky="nsew")
 
     button_frame = tk.Frame(new_window)
     button_frame.grid(row=1, column=0, padx=5, pady=5)
@@ -365,15 +407,18 @@ def open_RSM_window(r, minimum, benefit_attributes_):
     return_button = tk.Button(button_frame, text="Powrót do okna głównego", command=new_window.destroy)
     return_button.grid(row=0, column=1, pady=5)
 
+    # Progress and cancellation of the ranking computed in the background
+    job_panel = JobPanel(button_frame, job_runner)
+    job_panel.grid(row=1, column=0, columnspan=2, pady=5)
+
     new_window.grid_columnconfigure(1, weight=1)
     new_window.grid_rowconfigure(0, weight=1)
     ranking_frame.grid_columnconfigure(0, weight=1)
     ranking_frame.grid_rowconfigure(0, weight=1)
 
 
-def open_UTA_star_window(r, minimum, benefit_attributes_):
-    def fun_method():
-        ranking_area.delete('1.0', tk.END)  # Clear the ranking area
+def open_UTA_star_window(table, minimum, benefit_attributes_):
+    def fun_method(live=False):
         lower_limits_ = []
         upper_limits_ = []
         weight_vector_ = []
@@ -397,20 +442,35 @@ def open_UTA_star_window(r, minimum, benefit_attributes_):
             sum_weight_vector = sum(weight_vector_)
             weight_vector_normalized = [el / sum_weight_vector for el in weight_vector_]
 
-            result_ = UTA.UTA_star(r[3], lower_limits_, upper_limits_, weight_vector_normalized,
-                                   benefit_attributes_, compartments_)
-            if result_ == None:
-                ranking_area.insert(tk.END, "Niestety twoje kryteria są zbyt wąskie.")
-            if result_ == 1:
-                ranking_area.insert(tk.END, "Liczba przedziałów musi być dodatnia!")
+            def show_ranking(result_):
+                if result_ == None:
+                    ranking_view.show_message("Niestety twoje kryteria są zbyt wąskie.")
+                elif result_ == 1:
+                    ranking_view.show_message("Liczba przedziałów musi być dodatnia!")
+                else:
+                    ranking_view.show(result_)
+
+            if live:
+                job_panel.run(show_ranking, session.rank, lower_limits_, upper_limits_, weight_vector_normalized,
+                              benefit_attributes_, compartments_, top_k=ranking_view.top_k)
             else:
-                text = ""
-                for i in range(len(result_)):
-                    text += f"{i + 1}. {r[1][result_[i]][1]}, {r[1][result_[i]][2]}\n"
-                ranking_area.insert(tk.END, text)
-        else:
+                job_panel.run(show_ranking, ranking_cache.cached, "uta_star", UTA.UTA_star_table, table,
+                              lower_limits_, upper_limits_, weight_vector_normalized, benefit_attributes_,
+                              compartments_, top_k=ranking_view.top_k)
+        elif not live:
             messagebox.showwarning("Warning", "Wrong value entered!")
 
+    def live_update(event=None):
+        # Ranking na żywo: przeliczany po chwili od ostatniej zmiany, wygrywa najnowsza
+        if live_var.get():
+            job_panel.schedule(live_rank)
+
+    def live_rank():
+        try:
+            fun_method(live=True)
+        except (ValueError, ZeroDivisionError):
+            pass  # Wartość w trakcie wpisywania
+
     def end_fullscreen(event=None):
         root.attributes('-fullscreen', False)
         return "break"
@@ -426,7 +486,7 @@ def open_UTA_star_window(r, minimum, benefit_attributes_):
     criteria_frame.grid(row=0, column=0, sticky="news", padx=10, pady=5)
 
     # Define the criteria here
-    criteria_labels = r[2][1:]  # Add more criteria as needed
+    criteria_labels = table.criteria_headers  # Add more criteria as needed
     criteria_entries = []
 
     # Add labels for Min, Max, Weight above the columns
@@ -449,16 +509,15 @@ def open_UTA_star_window(r, minimum, benefit_attributes_):
                 entry.insert(tk.END, str(1 / len(minimum) * 100))
             elif j % 4 - 3 == 0:
                 entry.insert(tk.END, str(1))
+            entry.bind("<KeyRelease>", live_update)
             criteria_entries.append(entry)
     # Ranking frame with scrolling text
     ranking_frame = tk.LabelFrame(new_window, text="Ranking", padx=5, pady=5)
     ranking_frame.grid(row=0, column=1, rowspan=2, sticky="nsew", padx=20, pady=5)
-    ranking_area = tk.Text(ranking_frame, wrap=tk.WORD)
-    ranking_area.grid(row=0, column=0, sticky="nsew")
-
-    scrollbar_ranking = tk.Scrollbar(ranking_frame, orient="vertical", command=ranking_area.yview)
-    ranking_area['yscrollcommand'] = scrollbar_ranking.set
-    scrollbar_ranking.grid(row=0, column=1, sticky='nsew')
+    # Only the visible lines of the ranking are rendered
+    ranking_view = RankingView(ranking_frame, table)
+    ranking_view.grid(row=0, column=0, sticky="nsew")
+    ranking_view.top_k_entry.bind("<KeyRelease>", live_update)
 
     button_frame = tk.Frame(new_window)
     button_frame.grid(row=1, column=0, padx=5, pady=5)
@@ -469,6 +528,16 @@ def open_UTA_star_window(r, minimum, benefit_attributes_):
     return_button = tk.Button(button_frame, text="Powrót do okna głównego", command=new_window.destroy)
     return_button.grid(row=0, column=1, pady=5)
 
+    # Progress and cancellation of the ranking computed in the background
+    job_panel = JobPanel(button_frame, job_runner)
+    job_panel.grid(row=1, column=0, columnspan=2, pady=5)
+
+    # Live ranking, reusing the normalizations of the previous inputs
+    session = UTA.UtaSession(table)
+    live_var = tk.BooleanVar(value=False)
+    live_button = tk.Checkbutton(button_frame, text="Ranking na żywo", variable=live_var, command=live_update)
+    live_button.grid(row=2, column=0, columnspan=2, pady=5)
+
     new_window.grid_columnconfigure(1, weight=1)
     new_window.grid_rowconfigure(0, weight=1)
 
@@ -476,7 +545,7 @@ def open_UTA_star_window(r, minimum, benefit_attributes_):
     ranking_frame.grid_rowconfigure(0, weight=1)
 
 
-def open_SPCS_window(r, minimum, benefit_attributes_):
+def open_SPCS_window(table, minimum, benefit_attributes_):
     # Sample minimum values for each category
     min_ranges = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
     # Sample maximum values for each category
@@ -501,7 +570,6 @@ def open_SPCS_window(r, minimum, benefit_attributes_):
 
     def fun_method():
         # This function is called when the "Generuj Ranking" button is clicked.
-        ranking_area.delete('1.0', tk.END)
         criteria_idxs_ = []
         lower_limits_ = []
         upper_limits_ = []
@@ -518,14 +586,14 @@ def open_SPCS_window(r, minimum, benefit_attributes_):
 
         if try_conv(lower_limits_) and try_conv(upper_limits_):
             # Assuming that weight_vector_ and benefit_attributes_ are properly defined
-            result_ = Sp_Cs.sp_cs(r[3], lower_limits_, upper_limits_, criteria_idxs_, benefit_attributes_)
-            if result_ is None:
-                ranking_area.insert(tk.END, "Niestety twoje kryteria są zbyt wąskie")
-            else:
-                text = ""
-                for i in range(len(result_)):
-                    text += f"{i + 1}. {r[1][result_[i]][1]}, {r[1][result_[i]][2]}\n"
-                ranking_area.insert(tk.END, text)
+            def show_ranking(result_):
+                if result_ is None:
+                    ranking_view.show_message("Niestety twoje kryteria są zbyt wąskie")
+                else:
+                    ranking_view.show(result_)
+
+            job_panel.run(show_ranking, ranking_cache.cached, "sp_cs", Sp_Cs.sp_cs_table, table, lower_limits_,
+                          upper_limits_, criteria_idxs_, benefit_attributes_, top_k=ranking_view.top_k)
         else:
             messagebox.showwarning("Warning", "Wrong value entered!")
 
@@ -548,7 +616,7 @@ def open_SPCS_window(r, minimum, benefit_attributes_):
     criteria_frame.grid(row=0, column=0, sticky="news", padx=10, pady=5)
 
     # Get criteria labels from input data
-    criteria_labels = r[2][1:]
+    criteria_labels = table.criteria_headers
     comboboxes = []
     min_entries = []
     max_entries = []
@@ -588,13 +656,9 @@ def open_SPCS_window(r, minimum, benefit_attributes_):
     # Create a label frame for displaying the ranking
     ranking_frame = tk.LabelFrame(new_window, text="Ranking", padx=5, pady=5)
     ranking_frame.grid(row=0, column=1, rowspan=2, sticky="nsew", padx=10, pady=5)
-    ranking_area = tk.Text(ranking_frame, wrap=tk.WORD)
-    ranking_area.grid(row=0, column=0, sticky="nsew")
-
-    # Create a scrollbar for the ranking area
-    scrollbar_ranking = tk.Scrollbar(ranking_frame, command=ranking_area.yview)
-    ranking_area['yscrollcommand'] = scrollbar_ranking.set
-    scrollbar_ranking.grid(row=0, column=1, sticky='nsew')
+    # Only the visible lines of the ranking are rendered
+    ranking_view = RankingView(ranking_frame, table)
+    ranking_view.grid(row=0, column=0, sticky="nsew")
 
     # Create buttons for generating ranking and returning to the main window
     button_frame = tk.Frame(new_window)
@@ -606,6 +670,10 @@ def open_SPCS_window(r, minimum, benefit_attributes_):
     return_button = tk.Button(button_frame, text="Powrót do okna głównego", command=new_window.destroy)
     return_button.grid(row=0, column=1, pady=5)
 
+    # Progress and cancellation of the ranking computed in the background
+    job_panel = JobPanel(button_frame, job_runner)
+    job_panel.grid(row=1, column=0, columnspan=2, pady=5)
+
     # Configure grid column and row weights for resizing
     new_window.grid_columnconfigure(1, weight=1)
     new_window.grid_rowconfigure(0, weight=1)
@@ -615,7 +683,7 @@ def open_SPCS_window(r, minimum, benefit_attributes_):
     update_comboboxes()  # Update comboboxes initially
 
 
-def open_AHP_window(r, minimum, benefit_attributes_):
+def open_AHP_window(table, minimum, benefit_attributes_):
     # Sample minimum/maximum values (used as defaults)
     # Wartości te są przekazywane z maina (obliczone na podstawie danych)
 
@@ -643,8 +711,7 @@ def open_AHP_window(r, minimum, benefit_attributes_):
                 min_labels[i].config(text="Min: " + str(minimum[idx]))
                 max_labels[i].config(text="Max: " + str(maximum[idx]))
 
-    def fun_method():
-        ranking_area.delete('1.0', tk.END)
+    def fun_method(live=False):
         criteria_idxs_ = []
         lower_limits_ = []
         upper_limits_ = []
@@ -675,23 +742,45 @@ def open_AHP_window(r, minimum, benefit_attributes_):
                 upper_limits_.append(upper_limit)
 
         if try_conv(lower_limits_) and try_conv(upper_limits_):
-            result_ = AHP.ahp(r[3], lower_limits_, upper_limits_, criteria_idxs_, criteria_comparison_,
-                              benefit_attributes_)
-            if result_ is None:
-                ranking_area.insert(tk.END, "Niestety twoje kryteria są niespójne (CR > 10%) lub zbyt restrykcyjne.")
-            elif not result_:
-                ranking_area.insert(tk.END, "Brak alternatyw spełniających kryteria (zbyt wąskie limity).")
+            def show_ranking(ahp_result_):
+                if ahp_result_ is None:
+                    ranking_view.show_message("Niestety twoje kryteria są zbyt restrykcyjne.")
+                    return
+
+                # Diagnostyka spójności porównań kryteriów
+                text = f"Współczynnik spójności CR = {ahp_result_.CR:.1%}"
+                if not ahp_result_.is_consistent:
+                    text += " - porównania kryteriów są niespójne (CR > 10%), ranking może być mało wiarygodny"
+                text += "\nWagi kryteriów: " + ", ".join(
+                    f"{criteria_labels[idx]}: {weight:.1%}" for idx, weight in zip(criteria_idxs_, ahp_result_.weights))
+
+                result_ = ahp_result_.ids
+                if not result_:
+                    ranking_view.show_message(text + "\n\nBrak alternatyw spełniających kryteria (zbyt wąskie limity).")
+                else:
+                    ranking_view.show(result_, text + "\n\n")
+
+            if live:
+                job_panel.run(show_ranking, session.result, lower_limits_, upper_limits_, criteria_idxs_,
+                              criteria_comparison_, benefit_attributes_, top_k=ranking_view.top_k)
             else:
-                text = ""
-                for i in range(len(result_)):
-                    # Zabezpieczenie indeksu
-                    row_idx = result_[i]
-                    if row_idx < len(r[1]):
-                        text += f"{i + 1}. {r[1][row_idx][1]}, {r[1][row_idx][2]}\n"
-                ranking_area.insert(tk.END, text)
-        else:
+                job_panel.run(show_ranking, ranking_cache.cached, "ahp", AHP.ahp_result_table, table,
+                              lower_limits_, upper_limits_, criteria_idxs_, criteria_comparison_,
+                              benefit_attributes_, top_k=ranking_view.top_k)
+        elif not live:
             messagebox.showwarning("Warning", "Wrong value entered!")
 
+    def live_update(event=None):
+        # Ranking na żywo: przeliczany po chwili od ostatniej zmiany, wygrywa najnowsza
+        if live_var.get():
+            job_panel.schedule(live_rank)
+
+    def live_rank():
+        try:
+            fun_method(live=True)
+        except (ValueError, ZeroDivisionError):
+            pass  # Wartość w trakcie wpisywania
+
     def end_fullscreen(event=None):
         root.attributes('-fullscreen', False)
         return "break"
@@ -711,7 +800,7 @@ def open_AHP_window(r, minimum, benefit_attributes_):
                                               padx=5, pady=5)
     criteria_comparison_frame.grid(row=1, column=0, sticky="news", padx=10, pady=5)
 
-    criteria_labels = r[2][1:]  # Pomiń ID
+    criteria_labels = table.criteria_headers  # Pomiń ID
     comboboxes_criteria = []
     min_entries = []
     max_entries = []
@@ -745,6 +834,7 @@ def open_AHP_window(r, minimum, benefit_attributes_):
             cb.current(i)
 
         cb.bind('<<ComboboxSelected>>', update_comboboxes_criteria)
+        cb.bind('<<ComboboxSelected>>', live_update, add="+")
         comboboxes_criteria.append(cb)
 
         # Entry Min
@@ -752,6 +842,7 @@ def open_AHP_window(r, minimum, benefit_attributes_):
         min_entry.grid(row=3 * i + 1, column=2, padx=5, pady=2)
         # PRE-FILL MIN
         if i < len(minimum): min_entry.insert(0, str(minimum[i]))
+        min_entry.bind("<KeyRelease>", live_update)
         min_entries.append(min_entry)
 
         # Entry Max
@@ -759,6 +850,7 @@ def open_AHP_window(r, minimum, benefit_attributes_):
         max_entry.grid(row=3 * i + 1, column=3, padx=5, pady=2)
         # PRE-FILL MAX
         if i < len(maximum): max_entry.insert(0, str(maximum[i]))
+        max_entry.bind("<KeyRelease>", live_update)
         max_entries.append(max_entry)
 
         # Etykiety nagłówków w sekcji porównań
@@ -779,16 +871,15 @@ def open_AHP_window(r, minimum, benefit_attributes_):
             # PRE-SELECTION: Ustaw "1" (równoważne) jako domyślne
             cb.set("1")
 
+            cb.bind('<<ComboboxSelected>>', live_update)
             comboboxes_comparison.append(cb)
 
     ranking_frame = tk.LabelFrame(new_window, text="Ranking", padx=5, pady=5)
     ranking_frame.grid(row=0, column=1, rowspan=3, sticky="nsew", padx=10, pady=5)
-    ranking_area = tk.Text(ranking_frame, wrap=tk.WORD)
-    ranking_area.grid(row=0, column=0, sticky="nsew")
-
-    scrollbar_ranking = tk.Scrollbar(ranking_frame, command=ranking_area.yview)
-    ranking_area['yscrollcommand'] = scrollbar_ranking.set
-    scrollbar_ranking.grid(row=0, column=1, sticky='nsew')
+    # Only the visible lines of the ranking are rendered
+    ranking_view = RankingView(ranking_frame, table)
+    ranking_view.grid(row=0, column=0, sticky="nsew")
+    ranking_view.top_k_entry.bind("<KeyRelease>", live_update)
 
     button_frame = tk.Frame(new_window)
     button_frame.grid(row=2, column=0, padx=5, pady=5)
@@ -799,6 +890,16 @@ def open_AHP_window(r, minimum, benefit_attributes_):
     return_button = tk.Button(button_frame, text="Powrót do okna głównego", command=new_window.destroy)
     return_button.grid(row=0, column=1, pady=5)
 
+    # Progress and cancellation of the ranking computed in the background
+    job_panel = JobPanel(button_frame, job_runner)
+    job_panel.grid(row=1, column=0, columnspan=2, pady=5)
+
+    # Live ranking, reusing the normalizations of the previous inputs
+    session = AHP.AhpSession(table)
+    live_var = tk.BooleanVar(value=False)
+    live_button = tk.Checkbutton(button_frame, text="Ranking na żywo", variable=live_var, command=live_update)
+    live_button.grid(row=2, column=0, columnspan=2, pady=5)
+
     new_window.grid_columnconfigure(1, weight=1)
     new_window.grid_rowconfigure(1, weight=1)
     ranking_frame.grid_columnconfigure(0, weight=1)
@@ -820,18 +921,40 @@ if __name__ == "__main__":
         event.widget.config(cursor="hand2")
 
 
-    # Extract data from a database (assuming this function exists)
-    r = extract_data.get_data_from_database()
+    # Load the database once, with the ID index used by every window
+    table = extract_data.load_destination_table()
+
+    # Rankings already computed (also in earlier sessions) for the same data and inputs
+    ranking_cache = RankingCache(directory=".ranking_cache")
 
     # List representing benefit attributes
     benefit_attributes_ = [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
 
-    # Transpose a list of data and find minimum and maximum values
-    transposed_list = list(zip(*r[3]))[1:]
-    minimum = [min(column) for column in transposed_list]
-    maximum = [max(column) for column in transposed_list]
+    # Minimum and maximum values, precomputed by the table; the lists are updated in place when the data changes
+    minimum, maximum = criteria_range(table)
     print(maximum)
 
+
+    def load_changes():
+        """Apply a JSON file of changes (see extract_data.read_changes) to the table, without reloading the database."""
+        from tkinter import filedialog
+
+        file_path = filedialog.askopenfilename(title="Zmiany danych", filetypes=[("JSON", "*.json")])
+        if not file_path:
+            return
+        old_fingerprint = table.fingerprint
+        try:
+            changed = table.apply_changes(**extract_data.read_changes(file_path))
+        except (OSError, ValueError, KeyError, IndexError) as error:
+            messagebox.showerror("Błąd", f"Nie można zastosować zmian: {error}")
+            return
+        if changed:
+            # Running rankings finish on their snapshot of the old data, whose cached rankings are dropped;
+            # the windows read the new limits
+            ranking_cache.invalidate(old_fingerprint)
+            minimum[:], maximum[:] = criteria_range(table)
+        messagebox.showinfo("Dane", f"Liczba destynacji: {len(table)}")
+
     # Create the main Tkinter window
     root = tk.Tk()
     # Set the size of the tkinter window
@@ -839,8 +962,13 @@ if __name__ == "__main__":
     root.state("zoomed")
     root.title("Decision Support Systems")
 
-    # Load a background image
+    # Rankings are computed off the Tk thread, the results come back through root.after
+    job_runner = JobRunner(root)
+
+    # Load a background image (PIL only needed here)
     try:
+        from PIL import Image, ImageTk
+
         my_size = 180
         width_background_image = 5 * my_size
         height_background_image = 3 * my_size
@@ -859,11 +987,11 @@ if __name__ == "__main__":
 
     # Define methods as a dictionary with method names as keys and associated functions as values
     methods = {
-        "Topsis": lambda: open_topsis_window(r, minimum, benefit_attributes_),
-        "RSM": lambda: open_RSM_window(r, minimum, benefit_attributes_),
-        "UTA Star": lambda: open_UTA_star_window(r, minimum, benefit_attributes_),
-        "SP_CS": lambda: open_SPCS_window(r, minimum, benefit_attributes_),
-        "AHP": lambda: open_AHP_window(r, minimum, benefit_attributes_)
+        "Topsis": lambda: open_topsis_window(table, minimum, benefit_attributes_),
+        "RSM": lambda: open_RSM_window(table, minimum, benefit_attributes_),
+        "UTA Star": lambda: open_UTA_star_window(table, minimum, benefit_attributes_),
+        "SP_CS": lambda: open_SPCS_window(table, minimum, benefit_attributes_),
+        "AHP": lambda: open_AHP_window(table, minimum, benefit_attributes_)
     }
 
     # Create a label as a reminder for method selection
@@ -874,6 +1002,10 @@ if __name__ == "__main__":
     button_frame = tk.Frame(root, background='white')
     button_frame.pack(side=tk.BOTTOM, pady=40)
 
+    # Progress of the analysis, above the buttons
+    analysis_panel = JobPanel(root, job_runner)
+    analysis_panel.pack(side=tk.BOTTOM)
+
     # List of rainbow colors
     rainbow_colors = ["gray", "gray", "blue", "gray", "gray", "gray"]
     color_cycle = cycle(rainbow_colors)
@@ -893,12 +1025,19 @@ if __name__ == "__main__":
 
 
     # Add Analysis button first in the line
-    btn_anal = tk.Button(button_frame, text="Analiza", command=lambda: open_analysis_window(r), height=2, width=20,
+    btn_anal = tk.Button(button_frame, text="Analiza", command=lambda: open_analysis_window(table), height=2, width=20,
                          bg='black', fg='white', font=("Helvetica", 12, 'bold'))
     btn_anal.pack(side=tk.LEFT, padx=15, pady=0)
     btn_anal.bind("<Enter>", on_enter)
     btn_anal.bind("<Leave>", on_leave)
 
+    # Changes of the data (inserts, updates, deletes) applied without restarting
+    btn_changes = tk.Button(button_frame, text="Aktualizuj dane", command=load_changes, height=2, width=20,
+                            bg='black', fg='white', font=("Helvetica", 12, 'bold'))
+    btn_changes.pack(side=tk.LEFT, padx=15, pady=0)
+    btn_changes.bind("<Enter>", on_enter)
+    btn_changes.bind("<Leave>", on_leave)
+
     # Create buttons for each method and bind mouse events
     for method, action in methods.items():
         button = tk.Button(button_frame, text=method, command=action, height=2, width=20, bg='black', fg='white',
@@ -908,4 +1047,5 @@ if __name__ == "__main__":
         button.bind("<Leave>", on_leave)
 
     # Start the Tkinter main loop
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    job_runner.shutdown()
\ No newline at end of file
@@ -1,50 +1,89 @@
+from dataclasses import dataclass
+from functools import lru_cache
 import numpy as np
-from typing import List
-import copy
+from typing import List, Tuple
+from methods.topsis import LimitsMask
+from methods.top_k import top_k_order
 
 
-def ahp(input_data: List[List[float]], lower_limits: List, upper_limits: List, criteria_idxs: List,
-        criteria_comparison: List, benefit_attributes: List) -> List:
-    # --- 1. Validation and Filtering ---
-    number_of_criteria = len(lower_limits)
+def criterion_priorities(col_values: np.ndarray, is_benefit: bool, mode: str = "closed_form",
+                         chunk_size: int = 2048) -> np.ndarray:
+    """
+    Priority vector of the alternatives for one criterion.
 
-    if not all(len(lst) == number_of_criteria for lst in [lower_limits, upper_limits, criteria_idxs]):
-        print("Incompatible input data length")
-        return []
+    The pairwise comparison matrix is built from ratios: v1/v2 for a benefit criterion, v2/v1 for a cost one.
+    Its columns are normalized and the rows averaged. For such a matrix column j sums to S / r_j, with r the
+    ratios (values, or their inverses for a cost criterion) and S their sum, so every normalized column equals
+    r / S, which is the priority vector itself.
 
-    data_matrix = []
-    ids = []
+    Parameters:
+    col_values (np.ndarray): values of the criterion for every alternative.
+    is_benefit (bool): True if the criterion is maximized.
+    mode (str): "closed_form" for the O(n) formula, "exact" for the normalized n x n matrix, streamed in
+        blocks of chunk_size rows so that it is never materialized.
+    chunk_size (int): rows per block in "exact" mode.
 
-    # Extract Data and Filter by Limits
-    for row in input_data:
-        idx = row[0]
-        values = row[1:]  # Skip ID
+    Returns:
+    np.ndarray: priorities of the alternatives, summing to 1.
+    """
+    # Replace 0 with a tiny number (epsilon) to allow division
+    col_values = np.array(col_values, dtype=float)
+    col_values[col_values == 0] = 1e-9
+    num_alternatives = len(col_values)
 
-        keep = True
-        filtered_values = []
+    if mode == "closed_form":
+        ratios = col_values if is_benefit else 1.0 / col_values
+        return ratios / ratios.sum()
 
-        for i, crit_idx in enumerate(criteria_idxs):
-            val = values[crit_idx]
+    if mode != "exact":
+        raise ValueError(f"Unknown AHP mode: {mode}")
 
-            # Check Limits (benefit or cost)
-            if val < lower_limits[i] or val > upper_limits[i]:
-                keep = False
-                break
+    def comparison_block(rows):
+        if is_benefit:
+            # v1/v2
+            return col_values[rows, None] / col_values
+        # v2/v1 (for minimization/cost)
+        return col_values / col_values[rows, None]
 
-            filtered_values.append(val)
+    blocks = [slice(start, start + chunk_size) for start in range(0, num_alternatives, chunk_size)]
 
-        if keep:
-            ids.append(int(idx))
-            data_matrix.append(filtered_values)
+    # Column sums of the comparison matrix, accumulated block by block
+    col_sums_mat = np.zeros(num_alternatives)
+    for rows in blocks:
+        col_sums_mat += comparison_block(rows).sum(axis=0)
 
-    if not data_matrix:
-        return []
+    # Average row of the normalized matrix
+    priorities = np.empty(num_alternatives)
+    for rows in blocks:
+        priorities[rows] = (comparison_block(rows) / col_sums_mat).sum(axis=1) / num_alternatives
+    return priorities
 
-    data_np = np.array(data_matrix, dtype=float)
-    num_alternatives = len(data_np)
-    dim = len(criteria_idxs)
 
-    # --- 2. Criteria Weights (Matrix A) ---
+@dataclass
+class AhpResult:
+    """
+    AHP ranking together with the criteria weights and consistency diagnostics behind it.
+
+    ids: IDs of the alternatives, from the best to the worst (only the top_k best ones when top_k is given).
+    scores: final score of each alternative, in the order of ids.
+    weights: weight of each selected criterion.
+    lambda_max, CI, CR: principal eigenvalue estimate, consistency index and consistency ratio of the
+        criteria comparison matrix (CR above 0.1 means inconsistent judgements).
+    """
+    ids: List[int]
+    scores: np.ndarray
+    weights: Tuple[float, ...]
+    lambda_max: float
+    CI: float
+    CR: float
+
+    @property
+    def is_consistent(self) -> bool:
+        return self.CR <= 0.1
+
+
+def comparison_matrix(criteria_comparison, dim: int) -> np.ndarray:
+    """Reciprocal criteria matrix A from its upper triangle, given row by row: (0,1), (0,2), ..., (1,2), ..."""
     A = np.eye(dim)
     idx = 0
     for i in range(dim):
@@ -56,55 +95,239 @@ def ahp(input_data: List[List[float]], lower_limits: List, upper_limits: List, c
                 A[i][j] = val
                 A[j][i] = 1.0 / val
                 idx += 1
+    return A
+
+
+def principal_eigenvector(A: np.ndarray, tolerance: float = 1e-12, max_iterations: int = 1000) -> np.ndarray:
+    """Principal eigenvector of a positive matrix by power iteration, normalized to sum 1."""
+    w = np.full(A.shape[0], 1.0 / A.shape[0])
+    for _ in range(max_iterations):
+        next_w = A @ w
+        next_w /= next_w.sum()
+        if np.max(np.abs(next_w - w)) < tolerance:
+            return next_w
+        w = next_w
+    return w
+
+
+@lru_cache(maxsize=256)
+def criteria_weights(criteria_comparison: tuple, dim: int, method: str = "mean") -> tuple:
+    """
+    Criteria weights and consistency of a comparison vector, cached because the same judgements are
+    resubmitted many times while only the limits change.
 
-    # Normalize Matrix A -> B
-    col_sums = A.sum(axis=0)
-    B = A / col_sums
+    Parameters:
+    criteria_comparison (tuple): upper triangle of the comparison matrix, see comparison_matrix.
+    dim (int): number of criteria.
+    method (str): "mean" for the average of the normalized columns, "eigen" for the principal eigenvector.
 
-    # Criteria Weights vector w
-    w = B.sum(axis=1) / dim
+    Returns:
+    tuple: (weights, lambda_max, CI, CR), weights as a tuple.
+    """
+    A = comparison_matrix(criteria_comparison, dim)
 
-    # Consistency Check (Optional / Warning only)
+    if method == "mean":
+        # Normalize Matrix A -> B, criteria weights vector w
+        B = A / A.sum(axis=0)
+        w = B.sum(axis=1) / dim
+    elif method == "eigen":
+        w = principal_eigenvector(A)
+    else:
+        raise ValueError(f"Unknown AHP weight method: {method}")
+
+    # Consistency Check
     Aw = np.dot(A, w)
     lambda_max = np.mean(Aw / w)
     CI = (lambda_max - dim) / (dim - 1) if dim > 1 else 0
     r = [0, 0, 0.58, 0.9, 1.12, 1.24, 1.32, 1.41, 1.45, 1.49]
     RI = r[dim - 1] if dim <= 10 else 1.49
     CR = CI / RI if RI != 0 else 0
+    return tuple(float(x) for x in w), float(lambda_max), float(CI), float(CR)
+
+
+def ahp(input_data: List[List[float]], lower_limits: List, upper_limits: List, criteria_idxs: List,
+        criteria_comparison: List, benefit_attributes: List, mode: str = "closed_form",
+        weight_method: str = "mean", top_k: int = None) -> List:
+    """AHP ranking: IDs of the alternatives from the best to the worst, see ahp_result."""
+    result = ahp_result(input_data, lower_limits, upper_limits, criteria_idxs, criteria_comparison,
+                        benefit_attributes, mode, weight_method, top_k)
+    return result.ids if result is not None else []
+
+
+def ahp_result(input_data: List[List[float]], lower_limits: List, upper_limits: List, criteria_idxs: List,
+               criteria_comparison: List, benefit_attributes: List, mode: str = "closed_form",
+               weight_method: str = "mean", top_k: int = None) -> AhpResult:
+    """
+    AHP ranking with its diagnostics.
+
+    Parameters:
+    input_data: rows [ID, criterion1, criterion2, ...].
+    lower_limits, upper_limits: limits of the selected criteria.
+    criteria_idxs: indexes (without the ID column) of the selected criteria.
+    criteria_comparison: upper triangle of the criteria comparison matrix, see comparison_matrix.
+    benefit_attributes: 1 for criteria to maximize, 0 for criteria to minimize (all criteria).
+    mode: "closed_form" or "exact" alternative priorities, see criterion_priorities.
+    weight_method: "mean" or "eigen" criteria weights, see criteria_weights.
+    top_k: keep only the top_k best alternatives (see top_k_order), None for all of them.
+
+    Returns:
+    AhpResult: with empty ids when no alternative meets the limits; None for inconsistent input lengths.
+    """
+    # --- 1. Validation ---
+    number_of_criteria = len(lower_limits)
+
+    if not all(len(lst) == number_of_criteria for lst in [lower_limits, upper_limits, criteria_idxs]):
+        print("Incompatible input data length")
+        return None
+
+    if len(input_data) == 0:
+        input_array = np.zeros((0, max(criteria_idxs, default=-1) + 2))
+    else:
+        input_array = np.asarray(input_data, dtype=float)
+    return ahp_result_array(input_array[:, 1:], input_array[:, 0].astype(int), lower_limits, upper_limits,
+                            criteria_idxs, criteria_comparison, benefit_attributes, mode, weight_method, top_k)
+
+
+def ahp_result_array(matrix: np.ndarray, ids: np.ndarray, lower_limits: List, upper_limits: List,
+                     criteria_idxs: List, criteria_comparison: List, benefit_attributes: List,
+                     mode: str = "closed_form", weight_method: str = "mean", top_k: int = None) -> AhpResult:
+    """
+    AHP engine on a criteria matrix (alternatives x criteria, without the ID column) and the IDs of its rows,
+    see ahp_result for the other parameters.
+    """
+    # --- 1. Filter by Limits (on the selected criteria) ---
+    criteria_idxs = list(criteria_idxs)
+    selected = matrix[:, criteria_idxs]
+    outside = (selected < np.asarray(lower_limits, dtype=float)) | (selected > np.asarray(upper_limits, dtype=float))
+    keep = ~outside.any(axis=1)
+    data_np = np.asarray(selected[keep], dtype=float)
+    ids = [int(idx) for idx in ids[keep]]
+
+    # --- 2. Criteria Weights (Matrix A), cached per comparison vector ---
+    dim = len(criteria_idxs)
+    w, lambda_max, CI, CR = criteria_weights(tuple(criteria_comparison), dim, weight_method)
+
+    if not ids:
+        return AhpResult([], np.zeros(0), w, lambda_max, CI, CR)
+
+    num_alternatives = len(data_np)
 
     # --- 3. Alternatives Scoring (Matrix V) ---
     v = np.zeros((dim, num_alternatives))
 
     for k in range(dim):
-        col_values = data_np[:, k].copy()
+        is_benefit = (benefit_attributes[criteria_idxs[k]] == 1)
+        v[k, :] = criterion_priorities(data_np[:, k], is_benefit, mode)
 
-        # --- FIX: PROTECT AGAINST DIVISION BY ZERO ---
-        # Replace 0 with a tiny number (epsilon) to allow division
-        col_values[col_values == 0] = 1e-9
+    # --- 4. Final Scoring ---
+    # Dot product: Weights * Alternative Scores
+    final_scores = np.dot(np.array(w), v)
 
-        is_benefit = (benefit_attributes[criteria_idxs[k]] == 1)
+    # Sort results (stable, best first)
+    order = top_k_order(final_scores, top_k, descending=True)
+    return AhpResult([ids[i] for i in order], final_scores[order], w, lambda_max, CI, CR)
 
-        # Vectorized comparison: col_values / col_values (matrix expansion)
-        if is_benefit:
-            # v1/v2
-            comp_mat = col_values[:, None] / col_values
-        else:
-            # v2/v1 (for minimization/cost)
-            comp_mat = col_values / col_values[:, None]
 
-            # Normalize columns
-        col_sums_mat = comp_mat.sum(axis=0)
-        norm_mat = comp_mat / col_sums_mat
+def ahp_result_table(table, lower_limits: List, upper_limits: List, criteria_idxs: List,
+                     criteria_comparison: List, benefit_attributes: List, mode: str = "closed_form",
+                     weight_method: str = "mean", top_k: int = None) -> AhpResult:
+    """ahp_result on a DestinationTable (see extract_data)."""
+    number_of_criteria = len(lower_limits)
 
-        # Average row to get priority vector for this criterion
-        v[k, :] = norm_mat.sum(axis=1) / num_alternatives
+    if not all(len(lst) == number_of_criteria for lst in [lower_limits, upper_limits, criteria_idxs]):
+        print("Incompatible input data length")
+        return None
 
-    # --- 4. Final Scoring ---
-    # Dot product: Weights * Alternative Scores
-    final_scores = np.dot(w, v)
+    table = table.snapshot()
+    return ahp_result_array(table.matrix, table.ids, lower_limits, upper_limits, criteria_idxs,
+                            criteria_comparison, benefit_attributes, mode, weight_method, top_k)
+
+
+def ahp_table(table, lower_limits: List, upper_limits: List, criteria_idxs: List, criteria_comparison: List,
+              benefit_attributes: List, mode: str = "closed_form", weight_method: str = "mean",
+              top_k: int = None) -> List:
+    """ahp on a DestinationTable (see extract_data): IDs of the alternatives from the best to the worst."""
+    result = ahp_result_table(table, lower_limits, upper_limits, criteria_idxs, criteria_comparison,
+                              benefit_attributes, mode, weight_method, top_k)
+    return result.ids if result is not None else []
+
+
+class AhpSession:
+    """
+    AHP (closed form priorities) on a DestinationTable for inputs that change a little at a time (live ranking).
+
+    The compatible alternatives (see LimitsMask), the ratios of every criterion over the whole table and the
+    priorities of the compatible alternatives are kept between the calls, the criteria weights are cached by
+    criteria_weights: new comparisons only redo the final scoring, and new limits only recompute the priorities
+    when they change which alternatives are compatible. Every call ranks a snapshot of the table: a change of the
+    table (see DestinationTable.apply_changes) starts the session again. The results equal the ones of
+    ahp_result_table. A session is not thread safe, use one per window.
+
+    Parameters:
+    table (DestinationTable): the destinations, see extract_data.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._reset(table.snapshot())
+
+    def _reset(self, data):
+        self._data = data
+        self.limits = LimitsMask(data.matrix)
+        self._ratios = {}
+        self._priorities = {}
+        self._version = None
+        self._ids = None
+
+    def _criterion_ratios(self, criterion: int, is_benefit: bool) -> np.ndarray:
+        """Values of a criterion (0 replaced with epsilon) or their inverses for a cost criterion."""
+        key = (criterion, is_benefit)
+        if key not in self._ratios:
+            col_values = np.array(self._data.matrix[:, criterion], dtype=float)
+            col_values[col_values == 0] = 1e-9
+            self._ratios[key] = col_values if is_benefit else 1.0 / col_values
+        return self._ratios[key]
+
+    def result(self, lower_limits: List, upper_limits: List, criteria_idxs: List, criteria_comparison: List,
+               benefit_attributes: List, weight_method: str = "mean", top_k: int = None) -> AhpResult:
+        """AHP ranking with its diagnostics, see ahp_result_table."""
+        number_of_criteria = len(lower_limits)
+
+        if not all(len(lst) == number_of_criteria for lst in [lower_limits, upper_limits, criteria_idxs]):
+            print("Incompatible input data length")
+            return None
+
+        data = self.table.snapshot()
+        if data.version != self._data.version:
+            self._reset(data)
+
+        # Limits of every criterion, the criteria which are not selected are not limited
+        criteria_idxs = [int(idx) for idx in criteria_idxs]
+        lower = np.full(data.number_of_criteria, -np.inf)
+        upper = np.full(data.number_of_criteria, np.inf)
+        np.maximum.at(lower, criteria_idxs, np.asarray(lower_limits, dtype=float))
+        np.minimum.at(upper, criteria_idxs, np.asarray(upper_limits, dtype=float))
+        self.limits.update(lower, upper)
+        if self._version != self.limits.version:
+            self._ids = self._data.ids[self.limits.mask]
+            self._priorities.clear()
+            self._version = self.limits.version
+
+        dim = len(criteria_idxs)
+        w, lambda_max, CI, CR = criteria_weights(tuple(criteria_comparison), dim, weight_method)
+        ids = self._ids
+        if not len(ids):
+            return AhpResult([], np.zeros(0), w, lambda_max, CI, CR)
 
-    # Sort results
-    results = list(zip(ids, final_scores))
-    results.sort(key=lambda x: x[1], reverse=True)
+        # Priorities of the compatible alternatives, per criterion (see criterion_priorities)
+        v = np.zeros((dim, len(ids)))
+        for k, criterion in enumerate(criteria_idxs):
+            key = (criterion, benefit_attributes[criterion] == 1)
+            if key not in self._priorities:
+                ratios = self._criterion_ratios(*key)[self.limits.mask]
+                self._priorities[key] = ratios / ratios.sum()
+            v[k, :] = self._priorities[key]
 
-    return [r[0] for r in results]
\ No newline at end of file
+        final_scores = np.dot(np.array(w), v)
+        order = top_k_order(final_scores, top_k, descending=True)
+        return AhpResult(ids[order].tolist(), final_scores[order], w, lambda_max, CI, CR)
@@ -1,56 +1,47 @@
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
-from scipy.spatial import Voronoi, distance, voronoi_plot_2d
-import matplotlib.pyplot as plt
 from extract_data import get_data_from_database
+from methods.top_k import top_k_order
 
+# scipy.spatial is imported inside the functions that build Voronoi diagrams or KD-trees, so that importing
+# this module (e.g. by analysis or a batch worker) only costs NumPy
 
-def spcs_without_idxs_from_db(points):
+# Seed of the jitter added before the tessellation; a fixed seed makes the ranking reproducible
+JITTER_SEED = 0
+
+# Number of tessellations kept by tessellation()
+TESSELLATION_CACHE_SIZE = 32
+_tessellation_cache = OrderedDict()
+_tessellation_lock = threading.Lock()
+
+
+def spcs_without_idxs_from_db(points, spatial_index=True, segment=False):
     """
     Calculate a ranking of points based on their proximity to the nearest edge in a Voronoi diagram and the length of that edge.
 
     Parameters:
     points (array-like): A list or array of points (e.g., [[x1, y1], [x2, y2], ...]) for which the Voronoi diagram is constructed and analyzed.
+    spatial_index (bool): Find the nearest edges with nearest_ridges_tree (nearest_ridges_kdtree for segment distances) instead of scanning every edge; the ranking is the same.
+    segment (bool): Measure the distance to the finite edge instead of the line through it.
 
     Returns:
     list: A list of indices representing the ranking of the input points. 
     The ranking is determined based on the sum of each point's distance to its nearest Voronoi edge and the length of that edge. A lower sum results in a higher ranking.
     """
-    # Initialize a list to store the sum of parameters and distances for each point
-    total_params_and_distances_sum = []
-
-    # Create a Voronoi diagram for the given points
-    voronoi = Voronoi(points)
-
-    # Iterate over each point to calculate its nearest edge in the Voronoi diagram
-    for point in points:
-        # Set the initial minimum distance to infinity
-        min_distance = float('inf')
-
-        # Initialize the sum of edge parameters (length in this case) for the nearest edge
-        nearest_edge_params_sum = 0
+    from scipy.spatial import Voronoi
 
-        # Iterate over the edges (ridges) of the Voronoi diagram
-        for ridge in voronoi.ridge_vertices:
-            # Check if the ridge is not a point at infinity
-            if np.all(ridge != -1):
-                # Get the start and end vertices of the edge
-                edge_start = voronoi.vertices[ridge[0]]
-                edge_end = voronoi.vertices[ridge[1]]
+    points = np.asarray(points, dtype=float)
 
-                # Calculate the distance from the point to this edge
-                dist = point_line_distance(point, edge_start, edge_end)
-
-                # Update the minimum distance and nearest edge parameters if this edge is closer
-                if dist < min_distance:
-                    min_distance = dist
-                    nearest_edge_params_sum = np.linalg.norm(edge_end - edge_start)
+    # Create a Voronoi diagram for the given points
+    starts, ends = ridge_segments(Voronoi(points))
 
-        # Add the sum of nearest edge parameters and its distance to the list
-        total_params_and_distances_sum.append(nearest_edge_params_sum + min_distance)
+    # Sum of the length of the nearest edge and the distance to it, for each point
+    total_params_and_distances_sum = nearest_edge_sums(points, starts, ends, spatial_index, segment)
 
     # Rank the points based on the sum of parameters and distances
-    indices = list(range(len(total_params_and_distances_sum)))
-    ranking = sorted(indices, key=lambda i: total_params_and_distances_sum[i])
+    ranking = np.argsort(total_params_and_distances_sum, kind='stable').tolist()
 
     return ranking
 
@@ -62,6 +53,10 @@ def plot_voronoi(points):
     Parametry:
     points -- lista punktów w formacie [(x1, y1), (x2, y2), ...]
     """
+    # matplotlib i scipy importowane dopiero tutaj, żeby import modułu ich nie wymagał
+    import matplotlib.pyplot as plt
+    from scipy.spatial import Voronoi, voronoi_plot_2d
+
     # Konwertuj punkty na tablicę NumPy.
     points_array = np.array(points)
 
@@ -86,11 +81,63 @@ def plot_voronoi(points):
     plt.show()
 
 
-def jitter_points(points, jitter_amount=0.01):
-    jitter = np.random.normal(scale=jitter_amount, size=points.shape)
+def jitter_points(points, jitter_amount=0.01, rng=None):
+    """
+    Add a small normal noise to every coordinate, so that the Voronoi diagram of points with equal coordinates exists.
+
+    Parameters:
+    points (np.ndarray): points to move.
+    jitter_amount (float): standard deviation of the noise.
+    rng (np.random.Generator): source of the noise; a fresh unseeded generator when None.
+
+    Returns:
+    np.ndarray: jittered copy of the points.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    jitter = rng.normal(scale=jitter_amount, size=points.shape)
     return points + jitter
 
 
+def tessellation(points, seed=JITTER_SEED, jitter_amount=0.01):
+    """
+    Ridge geometry of the Voronoi diagram of the jittered points.
+
+    With a seed the jitter is deterministic, so the result only depends on the point set and is cached (LRU,
+    TESSELLATION_CACHE_SIZE entries): queries whose limits select the same cities reuse the diagram.
+
+    Parameters:
+    points (np.ndarray): float points, shape (n, dimension).
+    seed (int): seed of the jitter generator; None for a random jitter, which is never cached.
+    jitter_amount (float): standard deviation of the jitter.
+
+    Returns:
+    tuple: read-only (starts, ends) arrays of the ridges, see ridge_segments.
+    """
+    from scipy.spatial import Voronoi
+
+    if seed is None:
+        return ridge_segments(Voronoi(jitter_points(points, jitter_amount)))
+
+    points = np.ascontiguousarray(points, dtype=float)
+    key = (hashlib.sha1(points.tobytes()).hexdigest(), points.shape, seed, jitter_amount)
+    with _tessellation_lock:
+        if key in _tessellation_cache:
+            _tessellation_cache.move_to_end(key)
+            return _tessellation_cache[key]
+
+    rng = np.random.default_rng(seed)
+    starts, ends = ridge_segments(Voronoi(jitter_points(points, jitter_amount, rng)))
+    starts.setflags(write=False)
+    ends.setflags(write=False)
+
+    with _tessellation_lock:
+        _tessellation_cache[key] = (starts, ends)
+        while len(_tessellation_cache) > TESSELLATION_CACHE_SIZE:
+            _tessellation_cache.popitem(last=False)
+    return starts, ends
+
+
 def point_line_distance(point, line_start, line_end):
     # Oblicz wektor kierunkowy odcinka
     line_direction = line_end - line_start
@@ -113,12 +160,273 @@ def point_line_distance(point, line_start, line_end):
     return distance
 
 
-def sp_cs_algorithm(new_test_table):
+def ridge_segments(voronoi):
+    """
+    Start and end vertex of every Voronoi ridge, as seen by the edge scan.
+
+    The scan takes the first two vertices of each ridge. Its `np.all(ridge != -1)` test compares a Python list
+    with -1 and is therefore always true, so ridges reaching infinity are kept with the -1 vertex resolved to the
+    last Voronoi vertex. The same segments are returned here so that every search path ranks identically.
+
+    Parameters:
+    voronoi (scipy.spatial.Voronoi): Voronoi diagram of the points.
+
+    Returns:
+    tuple: (starts, ends) arrays of shape (number_of_ridges, dimension).
+    """
+    ridges = voronoi.ridge_vertices
+    starts = voronoi.vertices[[ridge[0] for ridge in ridges]]
+    ends = voronoi.vertices[[ridge[1] for ridge in ridges]]
+    return starts, ends
+
+
+def point_segment_distances(points, starts, ends):
+    """
+    Distance from each point to the finite segment in the same row (arrays broadcast against each other).
+
+    Parameters:
+    points, starts, ends (np.ndarray): arrays of shape (..., dimension).
+
+    Returns:
+    np.ndarray: distances, of the broadcast shape without the last axis.
+    """
+    direction = ends - starts
+    to_point = points - starts
+    length_squared = (direction * direction).sum(axis=-1)
+    projection = (to_point * direction).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(length_squared > 0, projection / length_squared, 0.0)
+    to_point = to_point - np.clip(t, 0.0, 1.0)[..., None] * direction
+    return np.sqrt((to_point * to_point).sum(axis=-1))
+
+
+def nearest_ridges_kdtree(points, starts, ends, piece_factor=2.0):
+    """
+    Exact nearest segment of every point, using a KD-tree over short pieces of the segments.
+
+    The distance to the segment starting at the nearest segment start vertex bounds the nearest distance of each
+    point, and the largest bound delimits a box around the points outside of which no segment can be nearest.
+    Segments are clipped to that box and cut into pieces of at most `piece_factor` median lengths. A segment
+    whose distance to a point is at most d has a piece midpoint within d + half a piece, so the pieces found in
+    that radius are the only candidates, and they are refined with exact distances to their whole segment.
+
+    Parameters:
+    points (np.ndarray): points, shape (n, dimension).
+    starts, ends (np.ndarray): segments, shape (number_of_segments, dimension).
+    piece_factor (float): maximal piece length, in median segment lengths.
+
+    Returns:
+    tuple: (distances, indices) of the nearest segment of every point; ties go to the lowest segment index, as in the scan.
+    """
+    from scipy.spatial import cKDTree
+
+    number_of_points = len(points)
+    direction = ends - starts
+    lengths = np.linalg.norm(direction, axis=1)
+    nonzero_lengths = lengths[lengths > 0]
+    piece_length = piece_factor * np.median(nonzero_lengths) if nonzero_lengths.size else 1.0
+
+    # Upper bound on the nearest distance of every point
+    _, nearest_start = cKDTree(starts).query(points)
+    bound = point_segment_distances(points, starts[nearest_start], ends[nearest_start])
+    margin = bound.max() * (1 + 1e-9) + 1e-9
+    box_low = points.min(axis=0) - margin
+    box_high = points.max(axis=0) + margin
+
+    # Clip every segment to the box (Liang-Barsky)
+    t_low = np.zeros(len(starts))
+    t_high = np.ones(len(starts))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for axis in range(points.shape[1]):
+            step = direction[:, axis]
+            t_a = (box_low[axis] - starts[:, axis]) / step
+            t_b = (box_high[axis] - starts[:, axis]) / step
+            parallel = step == 0
+            outside = parallel & ((starts[:, axis] < box_low[axis]) | (starts[:, axis] > box_high[axis]))
+            t_low = np.where(parallel, t_low, np.maximum(t_low, np.minimum(t_a, t_b)))
+            t_high = np.where(parallel, t_high, np.minimum(t_high, np.maximum(t_a, t_b)))
+            t_high[outside] = -1.0
+    kept = np.flatnonzero(t_low <= t_high)
+
+    # Cut the clipped segments into pieces no longer than piece_length
+    clipped_lengths = (t_high[kept] - t_low[kept]) * lengths[kept]
+    pieces = np.maximum(1, np.ceil(clipped_lengths / piece_length)).astype(int)
+    piece_segments = np.repeat(kept, pieces)
+    piece_numbers = np.arange(piece_segments.size) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    piece_t = t_low[piece_segments] + (t_high[piece_segments] - t_low[piece_segments]) * \
+        (piece_numbers + 0.5) / np.repeat(pieces, pieces)
+    midpoints = starts[piece_segments] + piece_t[:, None] * direction[piece_segments]
+    half_piece = (clipped_lengths / pieces).max() / 2 if kept.size else 0.0
+
+    # Candidate segments, refined with the exact distance to the whole segment
+    tree = cKDTree(midpoints)
+    in_radius = tree.query_ball_point(points, bound * (1 + 1e-9) + half_piece + 1e-9)
+    counts = [len(found) for found in in_radius]
+    owners = np.repeat(np.arange(number_of_points), counts)
+    candidates = piece_segments[np.concatenate(in_radius).astype(int)]
+    distances = point_segment_distances(points[owners], starts[candidates], ends[candidates])
+
+    # Smallest distance per point, then lowest segment index
+    order = np.lexsort((candidates, distances, owners))
+    _, first = np.unique(owners[order], return_index=True)
+    best = order[first]
+    return distances[best], candidates[best]
+
+
+def point_ridge_distances(points, starts, ends, segment=False):
+    """
+    Distances from every point to every ridge, by broadcasting.
+
+    Parameters:
+    points (np.ndarray): points, shape (n, dimension).
+    starts, ends (np.ndarray): ridges, shape (number_of_ridges, dimension).
+    segment (bool): Distance to the finite segment instead of the line through it (as in point_line_distance).
+
+    Returns:
+    np.ndarray: (n, number_of_ridges) distance matrix; degenerate ridges of a line distance are at infinity.
+    """
+    if segment:
+        return point_segment_distances(points[:, None, :], starts[None, :, :], ends[None, :, :])
+
+    direction = ends - starts
+    to_point = points[:, None, :] - starts[None, :, :]
+    length_squared = np.einsum('rd,rd->r', direction, direction)
+
+    if points.shape[1] == 3:
+        perpendicular = np.cross(direction[None, :, :], to_point)
+        perpendicular_squared = np.einsum('prd,prd->pr', perpendicular, perpendicular)
+    elif points.shape[1] == 2:
+        perpendicular_squared = (direction[None, :, 0] * to_point[:, :, 1] - direction[None, :, 1] * to_point[:, :, 0]) ** 2
+    else:
+        projection = np.einsum('prd,rd->pr', to_point, direction)
+        perpendicular_squared = np.einsum('prd,prd->pr', to_point, to_point) * length_squared - projection ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        distances = np.sqrt(perpendicular_squared) / np.sqrt(length_squared)
+    distances[np.isnan(distances)] = np.inf
+    return distances
+
+
+def nearest_ridges(points, starts, ends, segment=False, max_elements=1 << 22):
+    """
+    Nearest ridge of every point, scanning all ridges in chunks of points.
+
+    Parameters:
+    points (np.ndarray): points, shape (n, dimension).
+    starts, ends (np.ndarray): ridges, shape (number_of_ridges, dimension).
+    segment (bool): Distance to the finite segment instead of the line through it.
+    max_elements (int): upper bound on the (points x ridges x dimension) temporaries of a chunk.
+
+    Returns:
+    tuple: (distances, indices) of the nearest ridge of every point; ties go to the lowest ridge index.
+    """
+    number_of_points, dimension = points.shape
+    chunk = max(1, max_elements // max(1, len(starts) * dimension))
+    distances = np.empty(number_of_points)
+    indices = np.empty(number_of_points, dtype=int)
+    for start in range(0, number_of_points, chunk):
+        stop = min(start + chunk, number_of_points)
+        chunk_distances = point_ridge_distances(points[start:stop], starts, ends, segment)
+        indices[start:stop] = np.argmin(chunk_distances, axis=1)
+        distances[start:stop] = chunk_distances[np.arange(stop - start), indices[start:stop]]
+    return distances, indices
+
+
+def nearest_ridges_tree(points, starts, ends, leaf_size=16):
+    """
+    Exact nearest ridge line of every point (the distance of nearest_ridges with segment=False), without
+    scanning every ridge for every point.
+
+    Every point first gets an upper bound on its nearest distance: the distance to the segment starting at its
+    nearest ridge start vertex. The distance to a line changes by at most the displacement of the point, so a
+    group of points within `radius` of its center can only be nearest to the lines at most radius plus the
+    largest bound of the group away from the center. Groups are halved along their widest axis, each half keeping
+    only its candidate lines, down to `leaf_size` points. The leaves are scanned by nearest_ridges over their
+    candidates in ridge order, so that the distances and the ties are those of the full scan.
+
+    Parameters:
+    points (np.ndarray): points, shape (n, dimension).
+    starts, ends (np.ndarray): ridges, shape (number_of_ridges, dimension).
+    leaf_size (int): groups of at most this many points are scanned.
+
+    Returns:
+    tuple: (distances, indices) of the nearest ridge of every point; ties go to the lowest ridge index.
+    """
+    from scipy.spatial import cKDTree
+
+    direction = ends - starts
+    lengths = np.sqrt(np.einsum('rd,rd->r', direction, direction))
+    lines = np.flatnonzero(lengths > 0)
+    if lines.size == 0:
+        # Only degenerate ridges, all at infinity
+        return nearest_ridges(points, starts, ends)
+    # Rounding allowance of the distances from the group centers, which only select the candidates
+    tolerance = 1e-9 * (np.abs(points).max() + np.abs(starts[lines]).max() + 1)
+
+    _, nearest_start = cKDTree(starts[lines]).query(points)
+    nearest_start = lines[nearest_start]
+    bound = point_segment_distances(points, starts[nearest_start], ends[nearest_start])
+
+    distances = np.empty(len(points))
+    indices = np.empty(len(points), dtype=int)
+    # Candidate lines of a group: ridge indices, start vertices and unit directions
+    groups = [(np.arange(len(points)), lines, starts[lines], direction[lines] / lengths[lines, None])]
+    while groups:
+        members, candidates, line_starts, line_units = groups.pop()
+        group = points[members]
+        low, high = group.min(axis=0), group.max(axis=0)
+        center = (low + high) / 2
+        radius = np.sqrt(((group - center) ** 2).sum(axis=1).max())
+        limit = (bound[members].max() + radius) * (1 + 1e-9) + tolerance
+        to_center = center - line_starts
+        to_center -= np.einsum('rd,rd->r', to_center, line_units)[:, None] * line_units
+        near = np.einsum('rd,rd->r', to_center, to_center) <= limit * limit
+        candidates, line_starts, line_units = candidates[near], line_starts[near], line_units[near]
+
+        if len(members) <= leaf_size or not (high > low).any():
+            distances[members], nearest = nearest_ridges(group, starts[candidates], ends[candidates])
+            indices[members] = candidates[nearest]
+            continue
+        axis = np.argmax(high - low)
+        half = len(members) // 2
+        split = np.argpartition(group[:, axis], half)
+        groups.append((members[split[:half]], candidates, line_starts, line_units))
+        groups.append((members[split[half:]], candidates, line_starts, line_units))
+    return distances, indices
+
+
+def nearest_edge_sums(points, starts, ends, spatial_index=True, segment=False):
+    """
+    Length of the nearest Voronoi edge plus the distance to it, for every point.
+
+    Parameters:
+    points (np.ndarray): points to score.
+    starts, ends (np.ndarray): Voronoi edges, see ridge_segments.
+    spatial_index (bool): Use nearest_ridges_tree (nearest_ridges_kdtree for segment distances) instead of
+        scanning every edge with nearest_ridges; both return the distances and edges of the scan.
+    segment (bool): Measure the distance to the finite edge instead of the line through it.
+
+    Returns:
+    np.ndarray: one sum per point.
+    """
+    if spatial_index and segment:
+        distances, nearest = nearest_ridges_kdtree(points, starts, ends)
+    elif spatial_index:
+        distances, nearest = nearest_ridges_tree(points, starts, ends)
+    else:
+        distances, nearest = nearest_ridges(points, starts, ends, segment)
+    return np.linalg.norm(ends[nearest] - starts[nearest], axis=1) + distances
+
+
+def sp_cs_algorithm(new_test_table, spatial_index=True, segment=False, seed=JITTER_SEED, top_k=None):
     """
     Calculate a ranking of points based on their proximity to the nearest edge in a Voronoi diagram and the length of that edge.
 
     Parameters:
     points (array-like): A list or array of points (e.g., [[idx1, x1, y1, z1], [idx2, x2, y2, z2], ...]) for which the Voronoi diagram is constructed and analyzed.
+    spatial_index (bool): Find the nearest edges with nearest_ridges_tree (nearest_ridges_kdtree for segment distances) instead of scanning every edge; the ranking is the same.
+    segment (bool): Measure the distance to the finite edge instead of the line through it.
+    seed (int): Seed of the jitter; None for a random jitter (and no tessellation cache).
+    top_k (int): Return only the top_k best points (see top_k_order); None for all of them.
 
     Returns:
     list: A list of indices from database representing the ranking of the input points. 
@@ -127,49 +435,34 @@ def sp_cs_algorithm(new_test_table):
     # Extract the coordinates and database indices
     new_test_table = np.array(new_test_table)
     db_indices = new_test_table[:, 0]
-    points = new_test_table[:, 1:]
-
-    # Initialize a list to store the sum of parameters and distances for each point
-    total_params_and_distances_sum = []
-
-    # Dodanie niewielkiego szumu do każdego punktu
-    jittered_points = jitter_points(points)
-
-    # Create a Voronoi diagram for the given points
-    #
-    # voronoi = Voronoi(points)
-    voronoi = Voronoi(jittered_points)
-
-
-    # Iterate over each point to calculate its nearest edge in the Voronoi diagram
-    for point in points:
-        min_distance = float('inf')
-        nearest_edge_params_sum = 0
+    points = new_test_table[:, 1:].astype(float)
+    return sp_cs_points(points, db_indices, spatial_index, segment, seed, top_k)
 
-        for ridge in voronoi.ridge_vertices:
-            if np.all(ridge != -1):
-                edge_start = voronoi.vertices[ridge[0]]
-                edge_end = voronoi.vertices[ridge[1]]
 
-                dist = point_line_distance(point, edge_start, edge_end)
+def sp_cs_points(points, db_indices, spatial_index=True, segment=False, seed=JITTER_SEED, top_k=None):
+    """
+    sp_cs_algorithm on the coordinates (float array, one point per row) and the database indices of the points.
 
-                if dist < min_distance:
-                    min_distance = dist
-                    nearest_edge_params_sum = np.linalg.norm(edge_end - edge_start)
+    Returns:
+    list: the database indices, ranked.
+    """
+    # Voronoi diagram of the points with a small noise (Dodanie niewielkiego szumu do każdego punktu)
+    starts, ends = tessellation(points, seed)
 
-        total_params_and_distances_sum.append(nearest_edge_params_sum + min_distance)
+    total_params_and_distances_sum = nearest_edge_sums(points, starts, ends, spatial_index, segment)
 
-    # Rank the points based on the sum of parameters and distances
-    ranking = sorted(range(len(total_params_and_distances_sum)), key=lambda i: total_params_and_distances_sum[i])
+    # Rank the points based on the sum of parameters and distances (only the top_k best ones are sorted)
+    ranking = top_k_order(total_params_and_distances_sum, top_k)
     #print(ranking)
 
     # Return the database indices based on the ranking
-    ranked_db_indices = [db_indices[i] for i in ranking]
+    ranked_db_indices = db_indices[ranking].tolist()
 
     return ranked_db_indices
 
 
-def sp_cs(input_data, lower_limits, upper_limits, criteria_idxs, benefit_attributes):
+def sp_cs(input_data, lower_limits, upper_limits, criteria_idxs, benefit_attributes, spatial_index=True,
+          segment=False, seed=JITTER_SEED, top_k=None):
     # Establishing a list of compatible alternatives
     # determining the number of criteria
     input_data = np.array(input_data)
@@ -197,10 +490,34 @@ def sp_cs(input_data, lower_limits, upper_limits, criteria_idxs, benefit_attribu
     if len(data_after_limits) <= 5:
         return None
     
-    ranking = sp_cs_algorithm(data_after_limits)
+    ranking = sp_cs_algorithm(data_after_limits, spatial_index, segment, seed, top_k)
     return ranking     
 
 
+def sp_cs_table(table, lower_limits, upper_limits, criteria_idxs, benefit_attributes, spatial_index=True,
+                segment=False, seed=JITTER_SEED, top_k=None):
+    """
+    sp_cs on a DestinationTable (see extract_data), for three criteria: the alternatives within the limits of all
+    of them become points (cost criteria mirrored as maximum - value) and are ranked by sp_cs_points.
+    As in sp_cs, lower_limits[i] and upper_limits[i] are the limits of criteria_idxs[i].
+
+    Returns:
+    list: IDs of the alternatives, ranked; None if at most 5 alternatives meet the limits.
+    """
+    table = table.snapshot()
+    criteria_idxs = list(criteria_idxs)
+    values = table.matrix[:, criteria_idxs]
+    lower = np.asarray(lower_limits[:len(criteria_idxs)], dtype=float)
+    upper = np.asarray(upper_limits[:len(criteria_idxs)], dtype=float)
+    mask = np.all((values >= lower) & (values <= upper), axis=1)
+    if np.count_nonzero(mask) <= 5:
+        return None
+
+    benefit = np.asarray(benefit_attributes)[criteria_idxs] == 1
+    points = np.where(benefit, values[mask], table.maximum[criteria_idxs] - values[mask])
+    return sp_cs_points(points, table.ids[mask], spatial_index, segment, seed, top_k)
+
+
 def test_spcs_2d():
     # Przykładowe punkty w przestrzeni 2D.
     sample_points = [(2, 3), (5, 5), (8, 4), (9, 7), (12, 5)]
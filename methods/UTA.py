@@ -1,8 +1,244 @@
-from typing import List
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Tuple
 import extract_data
 import numpy as np
+from methods.top_k import top_k_order
 
-def UTA_star(data: List[List[int]], lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List, num_of_compartments: List)-> List:
+def utility_breakpoints(lower_limit, upper_limit, weight, benefit, compartments):
+    """
+    Piecewise linear marginal utility of one criterion.
+
+    Parameters:
+    lower_limit, upper_limit (float): range of the criterion.
+    weight (float): utility of the best value.
+    benefit (int): 1 if the criterion is maximized, 0 if minimized.
+    compartments (int): number of linear pieces.
+
+    Returns:
+    tuple: (breakpoints, slopes, intercepts) with compartments + 1 ascending breakpoints and one slope and
+    intercept per piece.
+    """
+    step_compartments = (upper_limit - lower_limit) / compartments
+    breakpoints = lower_limit + np.arange(compartments + 1) * step_compartments
+    utilities = np.arange(compartments + 1) * (weight / compartments)
+    if benefit != 1:  # min to max
+        utilities = weight - utilities
+    rise = np.diff(utilities)
+    run = np.diff(breakpoints)
+    slopes = np.divide(rise, run, out=np.zeros_like(rise), where=run != 0)
+    intercepts = utilities[:-1] - slopes * breakpoints[:-1]
+    return breakpoints, slopes, intercepts
+
+
+def utility_pieces(values: np.ndarray, lower_limit, upper_limit, breakpoints) -> tuple:
+    """
+    Piece of every value of one criterion, found with np.searchsorted, and whether it lies within the limits
+    (both included). They do not depend on the weight of the criterion.
+    """
+    piece = np.clip(np.searchsorted(breakpoints, values, side='right') - 1, 0, len(breakpoints) - 2)
+    inside = (values >= lower_limit) & (values <= upper_limit)
+    return piece, inside
+
+
+def marginal_utility(values: np.ndarray, lower_limit, upper_limit, breakpoints, slopes, intercepts,
+                     pieces: tuple = None) -> np.ndarray:
+    """
+    Marginal utility of the values of one criterion (see utility_breakpoints for the pieces).
+
+    Every value within the limits gets the utility of its piece, values outside the limits get 0.
+    pieces are the utility_pieces of the values, when already known.
+    """
+    piece, inside = pieces or utility_pieces(values, lower_limit, upper_limit, breakpoints)
+    return np.where(inside, values * slopes[piece] + intercepts[piece], 0.0)
+
+
+@dataclass(frozen=True)
+class UtaModel:
+    """
+    Compiled UTA* utility model: the marginal utility pieces of every criterion, built once from the limits,
+    weights, benefit flags and compartment counts.
+
+    The model is immutable and hashable (two models with the same parameters are equal), so it can be kept per
+    preference profile or cached, and applied to any number of data snapshots with score() and rank().
+    """
+    lower_limits: Tuple[float, ...]
+    upper_limits: Tuple[float, ...]
+    weight_vector: Tuple[float, ...]
+    benefit_attributes: Tuple[int, ...]
+    num_of_compartments: Tuple[int, ...]
+    _pieces: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'lower_limits', tuple(float(v) for v in self.lower_limits))
+        object.__setattr__(self, 'upper_limits', tuple(float(v) for v in self.upper_limits))
+        object.__setattr__(self, 'weight_vector', tuple(float(v) for v in self.weight_vector))
+        object.__setattr__(self, 'benefit_attributes', tuple(int(v) for v in self.benefit_attributes))
+        object.__setattr__(self, 'num_of_compartments', tuple(int(v) for v in self.num_of_compartments))
+        if any(el <= 0 for el in self.num_of_compartments):
+            raise ValueError("The number of compartments must be positive")
+
+        pieces = []
+        for parameters in zip(self.lower_limits, self.upper_limits, self.weight_vector, self.benefit_attributes,
+                              self.num_of_compartments):
+            arrays = utility_breakpoints(*parameters)
+            for array in arrays:
+                array.setflags(write=False)
+            pieces.append(arrays)
+        object.__setattr__(self, '_pieces', tuple(pieces))
+
+    def score(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Global utility of every alternative: the sum of its marginal utilities (see marginal_utility).
+
+        Parameters:
+        matrix (np.ndarray): criteria matrix (alternatives x criteria), without the ID column.
+
+        Returns:
+        np.ndarray: one utility per alternative.
+        """
+        marginal = np.zeros(matrix.shape, dtype=float)
+        for j, pieces in enumerate(self._pieces):
+            marginal[:, j] = marginal_utility(matrix[:, j], self.lower_limits[j], self.upper_limits[j], *pieces)
+        return marginal.sum(axis=1)
+
+    def rank(self, matrix: np.ndarray, top_k: int = None) -> np.ndarray:
+        """
+        Row indexes of the alternatives by increasing utility (equal utilities keep the row order), as returned by
+        UTA_star; with top_k only the first top_k of them, partially sorted (see top_k_order).
+        """
+        return rank_utilities(self.score(matrix), top_k)
+
+
+def rank_utilities(utilities: np.ndarray, top_k: int = None) -> np.ndarray:
+    """
+    Indexes of the utilities in increasing order, equal utilities in index order; only the first top_k of them
+    unless top_k is None, so that a top-K ranking is the prefix of the full one.
+    """
+    return top_k_order(utilities, top_k)
+
+
+@lru_cache(maxsize=128)
+def uta_model(lower_limits: tuple, upper_limits: tuple, weight_vector: tuple, benefit_attributes: tuple,
+              num_of_compartments: tuple) -> UtaModel:
+    """Cached UtaModel for one preference profile (the arguments must be tuples)."""
+    return UtaModel(lower_limits, upper_limits, weight_vector, benefit_attributes, num_of_compartments)
+
+
+def uta_scores(matrix: np.ndarray, lower_limits, upper_limits, weight_vector, benefit_attributes,
+               num_of_compartments) -> np.ndarray:
+    """
+    Global UTA* utility of every alternative, see UtaModel.score.
+
+    Parameters:
+    matrix (np.ndarray): criteria matrix (alternatives x criteria), without the ID column.
+    lower_limits, upper_limits, weight_vector, benefit_attributes, num_of_compartments (array-like): one value per criterion.
+
+    Returns:
+    np.ndarray: one utility per alternative.
+    """
+    model = uta_model(*(tuple(v) for v in (lower_limits, upper_limits, weight_vector, benefit_attributes,
+                                          num_of_compartments)))
+    return model.score(matrix)
+
+
+def UTA_star(data: List[List[int]], lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List, num_of_compartments: List,
+             top_k: int = None)-> List:
+
+    # determining the number of criteria
+    number_of_criteria = len(data[0])-1
+    if any(el <= 0 for el in num_of_compartments):
+        return 1
+
+    # Checking the correctness of sizes
+    if all(len(actual_list) == number_of_criteria for actual_list in [lower_limits, upper_limits, weight_vector, benefit_attributes,num_of_compartments]):
+        matrix = np.asarray(data, dtype=float)[:, 1:]
+        model = uta_model(tuple(lower_limits), tuple(upper_limits), tuple(weight_vector), tuple(benefit_attributes),
+                          tuple(num_of_compartments))
+        sorted_indexes = model.rank(matrix, top_k).tolist()
+        return sorted_indexes
+    else:
+        print("Incompatible input data length")
+
+
+def UTA_star_table(table, lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List,
+                   num_of_compartments: List, top_k: int = None) -> List:
+    """
+    UTA* on a DestinationTable (see extract_data).
+
+    Unlike UTA_star, which returns row positions, this returns the IDs of the alternatives in ascending utility
+    (only the first top_k of them unless top_k is None).
+    """
+    if any(el <= 0 for el in num_of_compartments):
+        return 1
+
+    table = table.snapshot()
+    if all(len(actual_list) == table.number_of_criteria for actual_list in [lower_limits, upper_limits, weight_vector, benefit_attributes,num_of_compartments]):
+        model = uta_model(tuple(lower_limits), tuple(upper_limits), tuple(weight_vector), tuple(benefit_attributes),
+                          tuple(num_of_compartments))
+        return table.ids[model.rank(table.matrix, top_k)].tolist()
+    else:
+        print("Incompatible input data length")
+
+
+class UtaSession:
+    """
+    UTA* on a DestinationTable for parameters that change a little at a time (live ranking).
+
+    The marginal utilities of every criterion are kept between the calls: new parameters of one criterion only
+    recompute the utility breakpoints and the marginal utilities of that criterion. The pieces of the values
+    (see utility_pieces) only depend on the limits and the number of compartments, so the new normalized weights
+    of all criteria after a weight change reuse them. Every call ranks a snapshot of the table: a change of the table
+    (see DestinationTable.apply_changes) starts the session again. The rankings equal the ones of UTA_star_table.
+    A session is not thread safe, use one per window.
+
+    Parameters:
+    table (DestinationTable): the destinations, see extract_data.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._reset(table.snapshot())
+
+    def _reset(self, data):
+        self._data = data
+        self._marginal = np.zeros(data.matrix.shape, dtype=float)
+        # Criteria-major copy, every column is read as contiguous memory
+        self._columns = np.ascontiguousarray(data.matrix.T, dtype=float)
+        self._parameters = [None] * data.number_of_criteria
+        self._pieces = [(None, None)] * data.number_of_criteria
+
+    def rank(self, lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List,
+             num_of_compartments: List, top_k: int = None) -> List:
+        """IDs of the alternatives in ascending utility, see UTA_star_table."""
+        if any(el <= 0 for el in num_of_compartments):
+            return 1
+
+        if not all(len(actual_list) == self.table.number_of_criteria for actual_list in [lower_limits, upper_limits, weight_vector, benefit_attributes,num_of_compartments]):
+            print("Incompatible input data length")
+            return None
+
+        data = self.table.snapshot()
+        if data.version != self._data.version:
+            self._reset(data)
+        for j, parameters in enumerate(zip(lower_limits, upper_limits, weight_vector, benefit_attributes,
+                                           num_of_compartments)):
+            parameters = (float(parameters[0]), float(parameters[1]), float(parameters[2]), int(parameters[3]),
+                          int(parameters[4]))
+            if parameters != self._parameters[j]:
+                values = self._columns[j]
+                breakpoints, slopes, intercepts = utility_breakpoints(*parameters)
+                pieces_key = (parameters[0], parameters[1], parameters[4])
+                if self._pieces[j][0] != pieces_key:
+                    self._pieces[j] = (pieces_key, utility_pieces(values, parameters[0], parameters[1], breakpoints))
+                self._marginal[:, j] = marginal_utility(values, parameters[0], parameters[1], breakpoints, slopes,
+                                                        intercepts, self._pieces[j][1])
+                self._parameters[j] = parameters
+        return self._data.ids[rank_utilities(self._marginal.sum(axis=1), top_k)].tolist()
+
+
+def UTA_star_reference(data: List[List[int]], lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List, num_of_compartments: List)-> List:
+    """Loop version of UTA_star, kept as its reference (values equal to an upper limit are skipped there)."""
 
     # determining the number of alternatives and criteria
     number_of_alternatives = len(data)
@@ -63,10 +299,12 @@ def UTA_star(data: List[List[int]], lower_limits: List, upper_limits: List, weig
 
         # Creation of rank
         rank = [sum(row) for row in scaled_data]
-        sorted_indexes = np.argsort(rank).tolist()
+        sorted_indexes = np.argsort(rank, kind='stable').tolist()
         return sorted_indexes
     else:
         print("Incompatible input data length")
+
+
 if __name__ == "__main__":
 
     r = extract_data.get_data_from_database()
@@ -1,8 +1,7 @@
 import extract_data
 import numpy as np
-import matplotlib.pyplot as plt
 from typing import List
-import copy
+from methods.top_k import top_k_order
 
 
 def is_lower(a, b, benefit_attributes):
@@ -16,7 +15,72 @@ def is_lower(a, b, benefit_attributes):
     return True
 
 
+def _is_lower_than(rows, y, benefit):
+    """Vectorized is_lower(row, y) for every row (criteria columns only)."""
+    return np.all(np.where(benefit, rows <= y, rows >= y), axis=1)
+
+
+def _is_higher_than(rows, y, benefit):
+    """Vectorized is_lower(y, row) for every row (criteria columns only)."""
+    return np.all(np.where(benefit, y <= rows, y >= rows), axis=1)
+
+
 def filtration_of_dominated(X, benefit_attributes=None):
+    """
+    Split the points into non-dominated (P) and dominated (Q) ones.
+
+    Block-nested-loops skyline over NumPy arrays: every round takes the first remaining point, sweeps the rest
+    with vectorized dominance tests (jumping from one dominating point to the next), keeps the final point in P
+    and drops everything it dominates. The rows and their order in P and Q are the ones of
+    filtration_of_dominated_reference, but P and Q are always 2-D arrays.
+
+    Parameters:
+    X (np.ndarray): points, one per row, with the ID in column 0.
+    benefit_attributes (array-like): 1 for criteria to maximize, 0 for criteria to minimize.
+
+    Returns:
+    tuple: (P, Q) arrays.
+    """
+    number_of_criteria = X.shape[1] - 1
+    if benefit_attributes is None:
+        benefit_attributes = np.zeros(number_of_criteria)
+    benefit = np.asarray(benefit_attributes)[:number_of_criteria] == 1
+    values = X[:, 1:]
+
+    P_idxs = []
+    Q_idxs = []
+    remaining = np.arange(X.shape[0])
+    while remaining.size:
+        y = remaining[0]
+        kept = [remaining[:1]]
+        rest = remaining[1:]
+
+        # Sweep: points dominated by y go to Q, a point dominating y replaces it (and y goes to Q)
+        while rest.size:
+            replaces = _is_higher_than(values[rest], values[y], benefit)
+            first = int(np.argmax(replaces)) if replaces.any() else rest.size
+            head = rest[:first]
+            dominated = _is_lower_than(values[head], values[y], benefit)
+            Q_idxs.append(head[dominated])
+            kept.append(head[~dominated])
+            if first == rest.size:
+                break
+            Q_idxs.append(np.array([y]))
+            y = rest[first]
+            rest = rest[first + 1:]
+
+        P_idxs.append(y)
+
+        # Drop the remaining points dominated by the new element of P (the first point always is)
+        kept = np.concatenate(kept)[1:]
+        remaining = kept[~_is_lower_than(values[kept], values[y], benefit)]
+
+    Q_idxs = np.concatenate(Q_idxs) if Q_idxs else np.array([], dtype=int)
+    return X[np.array(P_idxs, dtype=int)], X[Q_idxs]
+
+
+def filtration_of_dominated_reference(X, benefit_attributes=None):
+    """Pairwise Python filtration, kept as the reference for filtration_of_dominated."""
     if X.shape[0] == 1:
         return X, []
     if benefit_attributes is None:
@@ -65,137 +129,225 @@ def internal_inconsistency(A, benefit_attributes):
         return False
 
 
-def rsm(input_data: List[List[int]], lower_limits: List, upper_limits: List, is_active: List,
-        benefit_attributes: List) -> List:
-    # determining the number of criteria
-    number_of_criteria = len(input_data[0]) - 1
+def reference_weights(A0, A1):
+    """
+    Weight of every (A0 point, A1 point) pair: its normalized rectangle volume, computed in log space with the
+    log-sum-exp shift so that many criteria cannot overflow or underflow.
 
-    # Checking the correctness of sizes
-    if all(len(actual_list) == number_of_criteria for actual_list in [lower_limits, upper_limits, benefit_attributes]):
+    Returns:
+    np.ndarray: (len(A0), len(A1)) weights summing to 1.
+    """
+    # Safe log: differences below 1e-12 are clamped, as log(0) gives -inf
+    diff = np.abs(A0[:, None, 1:] - A1[None, :, 1:])
+    log_P = np.log(np.maximum(diff, 1e-12)).sum(axis=2)
+
+    # Shift values by subtracting max to ensure exp() doesn't overflow
+    P_safe = np.exp(log_P - np.max(log_P))
+    return P_safe / np.sum(P_safe)
+
+
+def _distances(points, references):
+    """Euclidean distances between points and reference points (criteria columns only)."""
+    diff = points[:, None, 1:] - references[None, :, 1:]
+    return np.sqrt(np.einsum('nrc,nrc->nr', diff, diff))
+
+
+def rsm_scores(data, A0, A1, max_elements=1 << 22):
+    """
+    RSM score of every alternative: the weighted mean over reference pairs of l / (m + l), where l is the distance
+    to the A1 point and m the distance to the A0 point.
+
+    Parameters:
+    data (np.ndarray): alternatives, one per row, with the ID in column 0.
+    A0, A1 (np.ndarray): reference sets, same layout.
+    max_elements (int): upper bound on every temporary built at once: the (alternatives x A0 x criteria) and
+        (alternatives x A1 x criteria) differences and the (alternatives x A0 x A1) ratios.
+
+    Returns:
+    np.ndarray: one score per alternative (lower is better).
+    """
+    w = reference_weights(A0, A1)
+    criteria = A0.shape[1] - 1
+    per_alternative = max(A0.shape[0] * criteria, A1.shape[0] * criteria, A0.shape[0] * A1.shape[0], 1)
+    chunk = max(1, max_elements // per_alternative)
+    scores = np.empty(data.shape[0])
+    for start in range(0, data.shape[0], chunk):
+        points = data[start:start + chunk]
+        l = _distances(points, A1)[:, None, :]
+        m = _distances(points, A0)[:, :, None] + l
+        scores[start:start + chunk] = np.einsum('nij,ij->n', l / m, w)
+    return scores
+
+
+def rsm_scores_reference(data, A0, A1):
+    """Loop version of rsm_scores, kept as its reference."""
+    log_P = []
+
+    # Loop over reference sets (assuming i1 and j1 loops structure)
+    for i1 in range(A0.shape[0]):
+        for j1 in range(A1.shape[0]):
+
+            # Initialize log_area to 0 (equivalent to area=1 in multiplication)
+            log_area = 0.0
+
+            for idx in range(1, A0.shape[1]):
+                # Calculate difference
+                diff = np.abs(A0[i1, idx] - A1[j1, idx])
+
+                # Safe log: avoid log(0) which gives -inf
+                if diff < 1e-12:
+                    diff = 1e-12
+
+                # Sum logs instead of multiplying values
+                log_area += np.log(diff)
+
+            log_P.append(log_area)
+
+    # --- WEIGHT CALCULATION WITH LOG-SUM-EXP TRICK ---
+    log_P = np.array(log_P)
 
-        input_copy = copy.copy(input_data)
-
-        A0_list = []
-        A1_list = []
-        i = 0
-        while i < len(input_copy):
-            for j in range(len(input_copy[0]) - 1):
-                # maximize
-                if benefit_attributes[j] == 1:
-                    if input_copy[i][j + 1] < lower_limits[j]:
-                        A1_list.append(input_copy[i])
-                        input_copy.pop(i)
-                        i -= 1
-                        break
-                    elif input_copy[i][j + 1] > upper_limits[j]:
-                        A0_list.append(input_copy[i])
-                        input_copy.pop(i)
-                        i -= 1
-                        break
-                # minimize
-                else:
-                    if input_copy[i][j + 1] > upper_limits[j]:
-                        A1_list.append(input_copy[i])
-                        input_copy.pop(i)
-                        i -= 1
-                        break
-                    elif input_copy[i][j + 1] < lower_limits[j]:
-                        A0_list.append(input_copy[i])
-                        input_copy.pop(i)
-                        i -= 1
-                        break
-            i += 1
-
-        data = np.array(input_copy)
-        A0 = np.array(A0_list)
-        A1 = np.array(A1_list)
-
-        if A0.size == 0:
-            A0 = np.array([[-1] + [upper_limits[i] if benefit_attributes[i] == 1 else lower_limits[i] for i in
-                                   range(len(benefit_attributes))]])
-
-        if A1.size == 0:
-            A1 = np.array([[-1] + [lower_limits[i] if benefit_attributes[i] == 1 else upper_limits[i] for i in
-                                   range(len(benefit_attributes))]])
-
-        for i in range(len(is_active), 0, -1):
-            if is_active[i - 1] == 0:
-                data = np.delete(data, i, axis=1)
-                A0 = np.delete(A0, i, axis=1)
-                A1 = np.delete(A1, i, axis=1)
-
-        while not internal_inconsistency(A0, benefit_attributes):
-            _, A0 = filtration_of_dominated(A0, benefit_attributes)
-
-        while not internal_inconsistency(A1, benefit_attributes):
-            A1, _ = filtration_of_dominated(A1, benefit_attributes)
-
-        # print('a0: ', A0)
-        # print('a1: ', A1)
-        # print('data: ', data)
-
-        log_P = []
-
-        # Loop over reference sets (assuming i1 and j1 loops structure)
+    # Shift values by subtracting max to ensure exp() doesn't overflow
+    # The largest value becomes exp(0) = 1.0
+    max_log = np.max(log_P)
+    P_safe = np.exp(log_P - max_log)
+
+    # Normalize weights (sum will be safe now)
+    w = P_safe / np.sum(P_safe)
+
+    f = []
+    for i in range(data.shape[0]):
+        wsp = []
+        i_w = 0
         for i1 in range(A0.shape[0]):
             for j1 in range(A1.shape[0]):
+                l = 0
+                m = 0
+                for idx in range(1, A0.shape[1]):
+                    l += (A1[j1, idx] - data[i, idx]) ** 2
+                    m += (A0[i1, idx] - data[i, idx]) ** 2
+                l = np.sqrt(l)
+                m = np.sqrt(m) + l
 
-                # Initialize log_area to 0 (equivalent to area=1 in multiplication)
-                log_area = 0.0
+                wsp.append(w[i_w] * (l / m))
+
+                i_w += 1
+
+        f.append(np.concatenate([data[i, :], [np.sum(wsp)]]))
+
+    f = np.array(f)
+    return f[:, -1]
+
+
+def split_by_limits(matrix, lower_limits, upper_limits, benefit_attributes):
+    """
+    Split the alternatives into the feasible ones and the two reference sets.
+
+    The first criterion outside its limits decides: a benefit criterion below its lower limit (or a cost
+    criterion above its upper limit) sends the alternative to A1, the anti-ideal set; a benefit criterion above
+    its upper limit (or a cost criterion below its lower limit) sends it to A0, the ideal set.
+
+    Parameters:
+    matrix (np.ndarray): criteria matrix (alternatives x criteria), without the ID column.
+    lower_limits, upper_limits, benefit_attributes (array-like): one value per criterion.
+
+    Returns:
+    tuple: boolean masks (feasible, A0, A1) over the alternatives.
+    """
+    benefit = np.asarray(benefit_attributes) == 1
+    below = matrix < np.asarray(lower_limits)
+    above = matrix > np.asarray(upper_limits)
+    worse = np.where(benefit, below, above)
+    better = np.where(benefit, above, below)
+
+    outside = worse | better
+    first = np.argmax(outside, axis=1)
+    infeasible = outside.any(axis=1)
+    first_is_worse = worse[np.arange(matrix.shape[0]), first]
+    return ~infeasible, infeasible & ~first_is_worse, infeasible & first_is_worse
 
-                for idx in range(1, A0.shape[1]):
-                    # Calculate difference
-                    diff = np.abs(A0[i1, idx] - A1[j1, idx])
 
-                    # Safe log: avoid log(0) which gives -inf
-                    if diff < 1e-12:
-                        diff = 1e-12
+def rsm_array(matrix: np.ndarray, ids: np.ndarray, lower_limits: List, upper_limits: List, is_active: List,
+              benefit_attributes: List, top_k: int = None) -> List:
+    """
+    RSM engine on a criteria matrix.
 
-                    # Sum logs instead of multiplying values
-                    log_area += np.log(diff)
+    Parameters:
+    matrix (np.ndarray): criteria matrix (alternatives x criteria), without the ID column (never modified).
+    ids (np.ndarray): database ID of every row of the matrix.
+    lower_limits, upper_limits, is_active, benefit_attributes (array-like): one value per criterion.
+    top_k (int): return only the top_k best alternatives, partially sorted (equal scores then keep the row
+        order, see top_k_order); None for all of them.
 
-                log_P.append(log_area)
+    Returns:
+    List: IDs of the feasible alternatives, from the best to the worst.
+    """
+    number_of_criteria = matrix.shape[1]
+    feasible, to_A0, to_A1 = split_by_limits(matrix, lower_limits, upper_limits, benefit_attributes)
+    if not feasible.any():
+        return []
 
-        # --- WEIGHT CALCULATION WITH LOG-SUM-EXP TRICK ---
-        log_P = np.array(log_P)
+    # ID column and the active criteria
+    columns = np.array([0] + [i + 1 for i in range(number_of_criteria) if i >= len(is_active) or is_active[i] != 0])
+    data = np.column_stack([ids[feasible], matrix[feasible]])[:, columns]
+    A0 = np.column_stack([ids[to_A0], matrix[to_A0]])
+    A1 = np.column_stack([ids[to_A1], matrix[to_A1]])
 
-        # Shift values by subtracting max to ensure exp() doesn't overflow
-        # The largest value becomes exp(0) = 1.0
-        max_log = np.max(log_P)
-        P_safe = np.exp(log_P - max_log)
+    if A0.shape[0] == 0:
+        A0 = np.array([[-1] + [upper_limits[i] if benefit_attributes[i] == 1 else lower_limits[i] for i in
+                               range(len(benefit_attributes))]])
 
-        # Normalize weights (sum will be safe now)
-        w = P_safe / np.sum(P_safe)
+    if A1.shape[0] == 0:
+        A1 = np.array([[-1] + [lower_limits[i] if benefit_attributes[i] == 1 else upper_limits[i] for i in
+                               range(len(benefit_attributes))]])
 
-        f = []
-        for i in range(data.shape[0]):
-            wsp = []
-            i_w = 0
-            for i1 in range(A0.shape[0]):
-                for j1 in range(A1.shape[0]):
-                    l = 0
-                    m = 0
-                    for idx in range(1, A0.shape[1]):
-                        l += (A1[j1, idx] - data[i, idx]) ** 2
-                        m += (A0[i1, idx] - data[i, idx]) ** 2
-                    l = np.sqrt(l)
-                    m = np.sqrt(m) + l
+    A0 = A0[:, columns]
+    A1 = A1[:, columns]
 
-                    wsp.append(w[i_w] * (l / m))
+    while not internal_inconsistency(A0, benefit_attributes):
+        _, A0 = filtration_of_dominated(A0, benefit_attributes)
 
-                    i_w += 1
+    while not internal_inconsistency(A1, benefit_attributes):
+        A1, _ = filtration_of_dominated(A1, benefit_attributes)
 
-            f.append(np.concatenate([data[i, :], [np.sum(wsp)]]))
+    # print('a0: ', A0)
+    # print('a1: ', A1)
+    # print('data: ', data)
 
-        f = np.array(f)
+    scores = rsm_scores(data, A0, A1)
+    f = np.column_stack([data, scores])
 
-        sorted_indices = np.argsort(f[:, -1])
-        sorted_data = f[sorted_indices]
+    # Stable also without top_k, so that a top-K ranking is the prefix of the full one
+    sorted_indices = top_k_order(f[:, -1], top_k)
+    sorted_data = f[sorted_indices]
+
+    first_column = sorted_data[:, 0]
+    first_column = [int(i) for i in first_column]
+
+    return first_column
+
+
+def rsm(input_data: List[List[int]], lower_limits: List, upper_limits: List, is_active: List,
+        benefit_attributes: List, top_k: int = None) -> List:
+    # determining the number of criteria
+    number_of_criteria = len(input_data[0]) - 1
+
+    # Checking the correctness of sizes
+    if all(len(actual_list) == number_of_criteria for actual_list in [lower_limits, upper_limits, benefit_attributes]):
+
+        # Array view of the caller's data (never modified)
+        input_array = np.asarray(input_data)
+        return rsm_array(input_array[:, 1:], input_array[:, 0], lower_limits, upper_limits, is_active,
+                         benefit_attributes, top_k)
+    else:
+        print("Incompatible input data length")
 
-        first_column = sorted_data[:, 0]
-        first_column = [int(i) for i in first_column]
 
-        return first_column
+def rsm_table(table, lower_limits: List, upper_limits: List, is_active: List, benefit_attributes: List,
+              top_k: int = None) -> List:
+    """RSM on a DestinationTable (see extract_data): IDs of the feasible alternatives, from the best to the worst."""
+    table = table.snapshot()
+    if all(len(actual_list) == table.number_of_criteria for actual_list in [lower_limits, upper_limits, benefit_attributes]):
+        return rsm_array(table.matrix, table.ids, lower_limits, upper_limits, is_active, benefit_attributes, top_k)
     else:
         print("Incompatible input data length")
 
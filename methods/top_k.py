@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def top_k_order(scores, top_k=None, descending=False) -> np.ndarray:
+    """
+    Indexes of the best scores, in order, as the first top_k of a stable argsort.
+
+    Only the top_k winners are sorted: np.argpartition finds them in O(n), so the cost is O(n + k log k) instead
+    of O(n log n). Equal scores keep the order of their indexes, also across the k-th position.
+
+    Parameters:
+    scores (np.ndarray): one score per alternative.
+    top_k (int): number of indexes to return; None (or at least len(scores)) sorts all of them.
+    descending (bool): True if the highest score is the best.
+
+    Returns:
+    np.ndarray: indexes of the min(top_k, len(scores)) best scores, from the best.
+    """
+    keys = -np.asarray(scores) if descending else np.asarray(scores)
+    if top_k is None or top_k >= len(keys):
+        return np.argsort(keys, kind='stable')
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.intp)
+
+    kth = keys[np.argpartition(keys, top_k - 1)[top_k - 1]]
+    if np.isnan(kth):
+        # NaN scores among the winners: they are last, in index order, as in the full sort
+        return np.argsort(keys, kind='stable')[:top_k]
+
+    # The scores better than the k-th, and the first of the ones equal to it
+    winners = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[:top_k - len(winners)]
+    candidates = np.sort(np.concatenate([winners, ties]))
+    return candidates[np.argsort(keys[candidates], kind='stable')]
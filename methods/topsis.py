@@ -1,8 +1,335 @@
 from typing import List
 import math
+import numpy as np
+from methods.top_k import top_k_order
 
-def topsis(data: List[List[int]], lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List)-> List:
 
+def limits_mask(matrix: np.ndarray, lower_limits, upper_limits) -> np.ndarray:
+    """
+    Boolean mask of the alternatives whose every criterion lies within [lower, upper].
+
+    Parameters:
+    matrix (np.ndarray): criteria matrix (alternatives x criteria), without the ID column.
+    lower_limits, upper_limits (array-like): one limit per criterion.
+
+    Returns:
+    np.ndarray: boolean vector with one entry per alternative.
+    """
+    lower_limits = np.asarray(lower_limits, dtype=float)
+    upper_limits = np.asarray(upper_limits, dtype=float)
+    return np.all((matrix >= lower_limits) & (matrix <= upper_limits), axis=1)
+
+
+def column_norms(matrix: np.ndarray) -> np.ndarray:
+    """Euclidean norm of every column of the matrix, the TOPSIS normalization factors."""
+    return np.sqrt(np.einsum('ij,ij->j', matrix, matrix))
+
+
+class LimitsMask:
+    """
+    limits_mask kept up to date while the limits change.
+
+    The number of limits every alternative violates is remembered, so that new limits of one criterion only
+    rescan the column of that criterion. The version grows whenever the set of compatible alternatives changes.
+
+    Parameters:
+    matrix (np.ndarray): criteria matrix (alternatives x criteria), without the ID column.
+    """
+
+    def __init__(self, matrix: np.ndarray):
+        number_of_alternatives, number_of_criteria = matrix.shape
+        # Criteria-major copy, every column is scanned as contiguous memory
+        self._columns = np.ascontiguousarray(matrix.T, dtype=float)
+        self._outside = np.zeros((number_of_criteria, number_of_alternatives), dtype=bool)
+        self._violations = np.zeros(number_of_alternatives, dtype=np.int32)
+        self.lower_limits = np.full(number_of_criteria, -np.inf)
+        self.upper_limits = np.full(number_of_criteria, np.inf)
+        self.mask = np.ones(number_of_alternatives, dtype=bool)
+        self.version = 0
+
+    def update(self, lower_limits, upper_limits) -> bool:
+        """
+        Set the limits of every criterion.
+
+        Returns:
+        bool: True if the set of compatible alternatives changed.
+        """
+        lower_limits = np.asarray(lower_limits, dtype=float)
+        upper_limits = np.asarray(upper_limits, dtype=float)
+        changed = np.flatnonzero((lower_limits != self.lower_limits) | (upper_limits != self.upper_limits))
+        for j in changed:
+            column = self._columns[j]
+            outside = ~((column >= lower_limits[j]) & (column <= upper_limits[j]))
+            self._violations -= self._outside[j]
+            self._violations += outside
+            self._outside[j] = outside
+        self.lower_limits = lower_limits
+        self.upper_limits = upper_limits
+
+        if changed.size:
+            mask = self._violations == 0
+            if not np.array_equal(mask, self.mask):
+                self.mask = mask
+                self.version += 1
+                return True
+        return False
+
+
+def topsis_array(matrix: np.ndarray, ids: np.ndarray, weight_vector, benefit_attributes,
+                 mask: np.ndarray = None, factor: np.ndarray = None, top_k: int = None) -> np.ndarray:
+    """
+    NumPy TOPSIS engine working on a contiguous float matrix.
+
+    Parameters:
+    matrix (np.ndarray): float criteria matrix (alternatives x criteria), without the ID column.
+    ids (np.ndarray): database ID of every row of the matrix.
+    weight_vector (array-like): weight of every criterion.
+    benefit_attributes (array-like): 1 for criteria to maximize, 0 for criteria to minimize.
+    mask (np.ndarray): optional boolean vector selecting the compatible alternatives (see limits_mask).
+    factor (np.ndarray): column_norms of the compatible alternatives, when already known.
+    top_k (int): return only the top_k best alternatives (see top_k_order), None for all of them.
+
+    Returns:
+    np.ndarray: IDs of the compatible alternatives, from the best to the worst.
+    """
+    if mask is not None:
+        matrix = matrix[mask]
+        ids = ids[mask]
+    if matrix.shape[0] == 0:
+        return ids[:0]
+
+    weight_vector = np.asarray(weight_vector, dtype=float)
+    benefit = np.asarray(benefit_attributes) == 1
+
+    # Normalized decision matrix taking into account the weight vector
+    if factor is None:
+        factor = column_norms(matrix)
+    standardized = matrix / factor
+    np.subtract(1, standardized, out=standardized, where=benefit)
+    standardized *= weight_vector
+
+    # Ideal and anti-ideal vector
+    ideal_vector = standardized.min(axis=0)
+    anti_ideal_vector = standardized.max(axis=0)
+
+    # Distance calculation (squared, as in the reference implementation)
+    diff = standardized - ideal_vector
+    distance_from_ideal = np.einsum('ij,ij->i', diff, diff)
+    diff = standardized - anti_ideal_vector
+    distance_from_anti_ideal = np.einsum('ij,ij->i', diff, diff)
+
+    # Scoring coefficient, stable sort keeps the order of equal scores
+    scoring_factor = distance_from_anti_ideal / (distance_from_ideal + distance_from_anti_ideal)
+    order = top_k_order(scoring_factor, top_k, descending=True)
+    return ids[order]
+
+
+def _masked_extremes(transposed, sorted_order, sorted_values, masks, lower_limits, upper_limits, candidates=32):
+    """
+    Minimum and maximum of every criterion over the compatible alternatives of every profile.
+
+    The extremes are looked up along the per-criterion sorted order: the minimum is the first compatible alternative
+    at or above the lower limit, the maximum the last one at or below the upper limit. Only `candidates` positions
+    from the limits are tested in one go, the few (profile, criterion) pairs without a compatible alternative among
+    them are scanned in full. Small tables are simply reduced under the masks.
+
+    Parameters:
+    transposed (np.ndarray): criteria x alternatives matrix.
+    sorted_order, sorted_values (np.ndarray): criteria x alternatives, argsort of every row of transposed and the
+        sorted rows.
+    masks (np.ndarray): profiles x alternatives compatibility masks.
+    lower_limits, upper_limits (np.ndarray): profiles x criteria limits the masks were built from.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray]: (profiles x criteria) minima and maxima, inf and -inf without compatible alternatives.
+    """
+    number_of_criteria, number_of_alternatives = transposed.shape
+    if number_of_alternatives <= 16 * candidates:
+        selected = masks[:, None, :]
+        return (np.where(selected, transposed, np.inf).min(axis=2),
+                np.where(selected, transposed, -np.inf).max(axis=2))
+
+    criteria = np.arange(number_of_criteria)
+    steps = np.arange(candidates)
+    first = np.stack([np.searchsorted(sorted_values[j], lower_limits[:, j], side='left')
+                      for j in criteria], axis=1)
+    last = np.stack([np.searchsorted(sorted_values[j], upper_limits[:, j], side='right')
+                     for j in criteria], axis=1) - 1
+    extremes = []
+    for positions, empty in ((first[:, :, None] + steps, np.inf), (last[:, :, None] - steps, -np.inf)):
+        positions = np.clip(positions, 0, max(0, number_of_alternatives - 1))
+        rows = sorted_order[criteria[:, None], positions]
+        found = masks[np.arange(len(masks))[:, None, None], rows]
+        hit = found.any(axis=2)
+        values = transposed[criteria, np.take_along_axis(rows, found.argmax(axis=2)[:, :, None], axis=2)[:, :, 0]]
+        for profile, criterion in zip(*np.nonzero(~hit)):
+            column = transposed[criterion][masks[profile]]
+            values[profile, criterion] = (column.min() if empty > 0 else column.max()) if len(column) else empty
+        extremes.append(values)
+    return extremes[0], extremes[1]
+
+
+def topsis_batch(matrix: np.ndarray, ids: np.ndarray, weight_vectors, lower_limits, upper_limits,
+                 benefit_attributes, max_elements: int = 1 << 22, top_k: int = None) -> List[np.ndarray]:
+    """
+    TOPSIS for many preference profiles over the same data in one call.
+
+    Parameters:
+    matrix (np.ndarray): float criteria matrix (alternatives x criteria), without the ID column.
+    ids (np.ndarray): database ID of every row of the matrix.
+    weight_vectors, lower_limits, upper_limits (array-like): (profiles x criteria) arrays, one row per profile.
+    benefit_attributes (array-like): 1 for criteria to maximize, 0 for criteria to minimize (shared by all profiles).
+    max_elements (int): upper bound on the size of the (profiles x alternatives) arrays built at once
+        (1 << 22 floats are 32 MB); profiles are processed in chunks to respect it.
+    top_k (int): keep only the top_k best alternatives of every profile, None for all of them.
+
+    Returns:
+    List[np.ndarray]: for every profile, the IDs of its compatible alternatives from the best to the worst.
+    """
+    weight_vectors = np.atleast_2d(np.asarray(weight_vectors, dtype=float))
+    lower_limits = np.atleast_2d(np.asarray(lower_limits, dtype=float))
+    upper_limits = np.atleast_2d(np.asarray(upper_limits, dtype=float))
+    number_of_alternatives, number_of_criteria = matrix.shape
+    number_of_profiles = max(len(weight_vectors), len(lower_limits), len(upper_limits))
+    weight_vectors = np.broadcast_to(weight_vectors, (number_of_profiles, number_of_criteria))
+    lower_limits = np.broadcast_to(lower_limits, (number_of_profiles, number_of_criteria))
+    upper_limits = np.broadcast_to(upper_limits, (number_of_profiles, number_of_criteria))
+    benefit = np.asarray(benefit_attributes) == 1
+
+    # Profile independent work, shared by all profiles: criteria-major layout so that the
+    # reductions over alternatives run along contiguous memory, the squared matrix and the
+    # sorted order of every criterion (for the extremes of the compatible alternatives)
+    transposed = np.ascontiguousarray(matrix.T)
+    squared = matrix * matrix
+    sorted_order = np.argsort(transposed, axis=1, kind='stable')
+    sorted_values = np.take_along_axis(transposed, sorted_order, axis=1)
+    sign = np.where(benefit, -1.0, 1.0)
+
+    chunk = max(1, max_elements // max(1, number_of_alternatives))
+    rankings = []
+    for start in range(0, number_of_profiles, chunk):
+        stop = min(start + chunk, number_of_profiles)
+        lower, upper = lower_limits[start:stop, :, None], upper_limits[start:stop, :, None]
+
+        # Compatible alternatives of every profile (profiles x alternatives), one criterion at a time
+        masks = (transposed[0] >= lower[:, 0]) & (transposed[0] <= upper[:, 0])
+        for j in range(1, number_of_criteria):
+            masks &= transposed[j] >= lower[:, j]
+            masks &= transposed[j] <= upper[:, j]
+
+        # Column norms over the compatible alternatives of every profile
+        factor = np.sqrt(masks.astype(float) @ squared)
+
+        # The weighted normalized value w * x / factor (or w - w * x / factor for benefit criteria)
+        # is affine in x with slope `scale`, so the ideal and anti-ideal points are attained at the
+        # column minimum or maximum of the compatible alternatives (no scale without any)
+        with np.errstate(divide='ignore'):
+            scale = sign * weight_vectors[start:stop] / factor
+        column_min, column_max = _masked_extremes(transposed, sorted_order, sorted_values, masks,
+                                                  lower_limits[start:stop], upper_limits[start:stop])
+        ideal_points = np.where(scale > 0, column_min, column_max)
+        anti_ideal_points = np.where(scale > 0, column_max, column_min)
+        scale_squared = (scale * scale)[:, :, None]
+
+        # Weighted distances (profiles x alternatives), accumulated one criterion at a time
+        distance_from_ideal = np.zeros(masks.shape)
+        distance_from_anti_ideal = np.zeros(masks.shape)
+        diff = np.empty(masks.shape)
+        for j in range(number_of_criteria):
+            for points, distance in ((ideal_points, distance_from_ideal), (anti_ideal_points, distance_from_anti_ideal)):
+                np.subtract(transposed[j], points[:, j, None], out=diff)
+                diff *= diff
+                diff *= scale_squared[:, j]
+                distance += diff
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scoring_factors = distance_from_anti_ideal / (distance_from_ideal + distance_from_anti_ideal)
+
+        for mask, scoring_factor in zip(masks, scoring_factors):
+            order = top_k_order(scoring_factor[mask], top_k, descending=True)
+            rankings.append(ids[mask][order])
+    return rankings
+
+
+def topsis(data: List[List[int]], lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List,
+           top_k: int = None)-> List:
+    # determining the number of criteria
+    number_of_criteria = len(data[0]) -1
+
+    # Checking the correctness of sizes
+    if all(len(actual_list) == number_of_criteria for actual_list in [lower_limits, upper_limits, weight_vector, benefit_attributes]):
+        data = np.asarray(data)
+        matrix = np.ascontiguousarray(data[:, 1:], dtype=float)
+        ids = data[:, 0].astype(int)
+        mask = limits_mask(matrix, lower_limits, upper_limits)
+        return topsis_array(matrix, ids, weight_vector, benefit_attributes, mask, top_k=top_k).tolist()
+    else:
+        print("Incompatible input data length")
+
+
+def topsis_table(table, lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List,
+                 top_k: int = None) -> List:
+    """
+    TOPSIS on a DestinationTable (see extract_data): IDs of the compatible alternatives, from the best to the worst
+    (only the top_k best ones unless top_k is None).
+    """
+    table = table.snapshot()
+    if all(len(actual_list) == table.number_of_criteria for actual_list in [lower_limits, upper_limits, weight_vector, benefit_attributes]):
+        mask = limits_mask(table.matrix, lower_limits, upper_limits)
+        # Without a limit excluding some alternative, the norms of the whole table are already known (and exact)
+        factor = table.column_norms if mask.all() else None
+        return topsis_array(table.matrix, table.ids, weight_vector, benefit_attributes, mask, factor,
+                            top_k=top_k).tolist()
+    else:
+        print("Incompatible input data length")
+
+
+class TopsisSession:
+    """
+    TOPSIS on a DestinationTable for limits and weights that change a little at a time (live ranking).
+
+    The compatible alternatives (see LimitsMask) and their column norms are kept between the calls and only
+    recomputed when the limits change which alternatives are compatible; new weights or benefit flags reuse them.
+    Every call ranks a snapshot of the table: a change of the table (see DestinationTable.apply_changes) starts the
+    session again. The rankings equal the ones of topsis_table. A session is not thread safe, use one per window.
+
+    Parameters:
+    table (DestinationTable): the destinations, see extract_data.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._reset(table.snapshot())
+
+    def _reset(self, data):
+        self._data = data
+        self.limits = LimitsMask(data.matrix)
+        self._version = None
+        self._matrix = self._ids = self._factor = None
+
+    def rank(self, lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List,
+             top_k: int = None) -> List:
+        """IDs of the compatible alternatives from the best to the worst, see topsis_table."""
+        if not all(len(actual_list) == self.table.number_of_criteria for actual_list in [lower_limits, upper_limits, weight_vector, benefit_attributes]):
+            print("Incompatible input data length")
+            return None
+
+        data = self.table.snapshot()
+        if data.version != self._data.version:
+            self._reset(data)
+        self.limits.update(lower_limits, upper_limits)
+        if self._version != self.limits.version:
+            mask = self.limits.mask
+            self._matrix = self._data.matrix[mask]
+            self._ids = self._data.ids[mask]
+            self._factor = self._data.column_norms if mask.all() else column_norms(self._matrix)
+            self._version = self.limits.version
+        return topsis_array(self._matrix, self._ids, weight_vector, benefit_attributes, factor=self._factor,
+                            top_k=top_k).tolist()
+
+
+def topsis_reference(data: List[List[int]], lower_limits: List, upper_limits: List, weight_vector: List, benefit_attributes: List)-> List:
+    """Pure Python TOPSIS, kept as the reference for the NumPy engine."""
 
     # determining the number of alternatives and criteria
     number_of_alternatives = len(data)
@@ -68,4 +395,3 @@ def topsis(data: List[List[int]], lower_limits: List, upper_limits: List, weight
         return result
     else:
         print("Incompatible input data length")
-
@@ -0,0 +1,289 @@
+"""
+Cache of method rankings.
+
+A ranking is identified by the fingerprint of the dataset (DestinationTable.fingerprint), the method and a
+canonical hash of its parameters (limits, weights, benefit flags, options). Results live in an in-memory LRU
+tier bounded by their size in bytes and, optionally, in a directory that survives restarts. When a dataset
+changes (DestinationTable.apply_changes), invalidate drops the entries of its old fingerprint.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import numpy as np
+
+# Version of the cached results, part of every key: bump it whenever a method or the type of its result changes,
+# so that the on-disk entries of older code are never served
+CACHE_VERSION = 2
+
+# Default bounds of the two tiers
+MEMORY_CACHE_BYTES = 64 << 20
+DISK_CACHE_BYTES = 256 << 20
+
+# Share of max_disk_bytes left after pruning the on-disk tier, so that the next puts do not prune again
+DISK_PRUNE_TARGET = 0.9
+
+
+def _canonical(value):
+    """JSON-ready form of a parameter: numbers as floats (1 and 1.0 give the same key), sequences as lists."""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    return value
+
+
+def ranking_key(method, fingerprint, *args, **options):
+    """
+    Cache key of a ranking.
+
+    Parameters:
+    method (str): name of the method.
+    fingerprint (str): fingerprint of the dataset.
+    args, options: parameters of the method (limits, weights, benefit flags, ...).
+
+    Returns:
+    str: SHA-256 of the canonical JSON of all of them and CACHE_VERSION.
+    """
+    payload = {"version": CACHE_VERSION, "method": method, "dataset": fingerprint, "args": _canonical(list(args)),
+               "options": _canonical(options)}
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RankingCache:
+    """
+    Two-tier cache of rankings.
+
+    Parameters:
+    max_bytes (int): bound of the in-memory tier (pickled size of the entries); least recently used entries go first.
+    directory (str): directory of the on-disk tier, None to keep the cache in memory only.
+    max_disk_bytes (int): bound of the on-disk tier; the oldest files go first. Its size is counted once, kept up to
+        date by the puts of this instance, and the directory is only listed again when the bound is crossed (the
+        files of other processes sharing it are then counted too).
+    """
+
+    def __init__(self, max_bytes=MEMORY_CACHE_BYTES, directory=None, max_disk_bytes=DISK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Keys of the entries of every dataset fingerprint, see invalidate
+        self._dataset_keys = {}
+        self._lock = threading.Lock()
+        # Size and number of files of the on-disk tier, None until counted (see _count_disk)
+        self._disk_bytes = None
+        self._disk_entries = None
+        self._disk_lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def _remember(self, key, blob):
+        """Put a pickled entry in the memory tier, evicting the least recently used ones."""
+        if len(blob) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        self._entries[key] = blob
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def get(self, key, default=None):
+        """Cached value of the key (a fresh copy), or default."""
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(blob)
+
+        if self.directory is not None:
+            try:
+                with open(self._path(key), "rb") as file:
+                    blob = file.read()
+                value = pickle.loads(blob)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError):
+                # Unreadable, or written by code whose classes changed: a miss
+                pass
+            else:
+                with self._lock:
+                    self._remember(key, blob)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value, fingerprint=None, is_current=None):
+        """
+        Store a value in both tiers.
+
+        Parameters:
+        fingerprint (str): dataset of the value, whose entries invalidate drops.
+        is_current (callable): checked under the lock of the cache, the value is not stored when it returns False.
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if is_current is not None and not is_current():
+                return
+            self._remember(key, blob)
+            if fingerprint is not None:
+                self._dataset_keys.setdefault(fingerprint, set()).add(key)
+        if self.directory is not None:
+            try:
+                self._write(key, blob)
+            except OSError as error:
+                print(f"Cannot write the ranking cache {self.directory}: {error}")
+
+    def _write(self, key, blob):
+        """Write an entry of the on-disk tier atomically, through a temporary file of its own."""
+        path = self._path(key)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = None
+        # A unique temporary name: several processes may share the directory
+        descriptor, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(blob)
+            os.replace(temporary_path, path)
+        except BaseException:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+        self._count_disk(len(blob) - (replaced or 0), 0 if replaced is not None else 1)
+
+    def _scan_disk(self):
+        """(mtime, size, path) of every file of the on-disk tier."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return files
+
+    def _count_disk(self, added_bytes, added_entries):
+        """Account for a written file, and prune the on-disk tier when it crosses max_disk_bytes."""
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                files = self._scan_disk()
+                self._disk_bytes = sum(size for _, size, _ in files)
+                self._disk_entries = len(files)
+            else:
+                self._disk_bytes += added_bytes
+                self._disk_entries += added_entries
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove the oldest files until the on-disk tier is below DISK_PRUNE_TARGET of max_disk_bytes."""
+        files = sorted(self._scan_disk())
+        total = sum(size for _, size, _ in files)
+        entries = len(files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes * DISK_PRUNE_TARGET:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            entries -= 1
+        self._disk_bytes = total
+        self._disk_entries = entries
+
+    def cached(self, method, function, table, *args, **options):
+        """
+        function(table, *args, **options) through the cache, keyed by method, the qualified name of the function,
+        table.fingerprint and the arguments. The function ranks a snapshot of the table, the key is its fingerprint.
+        None results (invalid input) are not stored, nor the results of a table changed meanwhile (see
+        DestinationTable.apply_changes), whose old fingerprint may be invalidated already.
+        """
+        data = table.snapshot()
+        fingerprint = data.fingerprint
+        name = f"{method}:{function.__module__}.{function.__qualname__}"
+        key = ranking_key(name, fingerprint, *args, **options)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = function(data, *args, **options)
+            if value is not None:
+                self.put(key, value, fingerprint, lambda: table.version == data.version)
+        else:
+            with self._lock:
+                self._dataset_keys.setdefault(fingerprint, set()).add(key)
+        return value
+
+    def invalidate(self, fingerprint, disk=False):
+        """
+        Drop the entries computed for one dataset fingerprint, the ones of other datasets stay.
+
+        Parameters:
+        fingerprint (str): the old fingerprint of a changed dataset.
+        disk (bool): also remove the files of the on-disk tier (they stay valid if the data comes back to that content).
+
+        Returns:
+        int: number of dropped entries.
+        """
+        with self._lock:
+            keys = self._dataset_keys.pop(fingerprint, set())
+            for key in keys:
+                blob = self._entries.pop(key, None)
+                if blob is not None:
+                    self._bytes -= len(blob)
+        if disk and self.directory is not None:
+            for key in keys:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            with self._disk_lock:
+                # Counted again by the next put
+                self._disk_bytes = self._disk_entries = None
+        return len(keys)
+
+    def clear(self, disk=False):
+        """Drop the memory tier (and the files of the on-disk tier when disk is True)."""
+        with self._lock:
+            self._entries.clear()
+            self._dataset_keys.clear()
+            self._bytes = 0
+        if disk and self.directory is not None:
+            with self._disk_lock:
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(".pkl"):
+                        os.remove(entry.path)
+                self._disk_bytes = self._disk_entries = None
+
+    def stats(self):
+        """Hit/miss counters, the size of the memory tier and the size of the on-disk tier (None until counted)."""
+        with self._lock:
+            stats = {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                     "entries": len(self._entries), "bytes": self._bytes}
+        with self._disk_lock:
+            stats.update(disk_entries=self._disk_entries, disk_bytes=self._disk_bytes)
+        return stats
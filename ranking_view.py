@@ -0,0 +1,181 @@
+"""
+Virtualised display of the rankings.
+
+A ranking of 100k destinations is never turned into one text or one Treeview item per row: RankingView keeps the
+array of IDs and renders only the lines visible in its window, resolving their names when they are shown.
+TreePager shows the rows of a ttk.Treeview one page at a time.
+"""
+import tkinter as tk
+from tkinter import font as tkfont
+import numpy as np
+
+# Lines scrolled by one turn of the mouse wheel
+WHEEL_LINES = 3
+
+# Rows of a Treeview page
+PAGE_SIZE = 100
+
+
+def parse_top_k(text):
+    """Number of destinations to show from the text of an entry: None (all) when it is empty or not positive."""
+    text = text.strip()
+    if not text:
+        return None
+    top_k = int(text)
+    return top_k if top_k > 0 else None
+
+
+class RankingView(tk.Frame):
+    """
+    Scrollable "1. city, country" lines of a ranking, rendered on demand from its array of IDs.
+
+    An optional header (diagnostics or a message) is shown above the ranking and scrolls with it. A "top K" entry
+    limits the ranking to its first K destinations: the windows pass top_k to the methods, which then only sort
+    their K best alternatives.
+
+    Parameters:
+    master (tk.Misc): parent widget.
+    table (DestinationTable): names of the destinations, see extract_data.
+    """
+
+    def __init__(self, master, table, **kwargs):
+        super().__init__(master, **kwargs)
+        self.table = table
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._header = []
+        self._first = 0
+
+        self.text = tk.Text(self, wrap=tk.WORD, state=tk.DISABLED)
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self._scroll)
+        self.scrollbar.grid(row=0, column=1, sticky="nsew")
+
+        top_k_frame = tk.Frame(self)
+        top_k_frame.grid(row=1, column=0, columnspan=2, sticky="w", pady=2)
+        tk.Label(top_k_frame, text="Tylko najlepsze K (puste = wszystkie):").pack(side=tk.LEFT)
+        self.top_k_entry = tk.Entry(top_k_frame, width=8)
+        self.top_k_entry.pack(side=tk.LEFT, padx=5)
+        self.count_label = tk.Label(top_k_frame, text="")
+        self.count_label.pack(side=tk.LEFT, padx=5)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self._line_height = tkfont.Font(font=self.text["font"]).metrics("linespace")
+        self.text.bind("<Configure>", lambda event: self._render())
+        self.text.bind("<MouseWheel>", self._wheel)
+        self.text.bind("<Button-4>", lambda event: self._scroll("scroll", -WHEEL_LINES, "units"))
+        self.text.bind("<Button-5>", lambda event: self._scroll("scroll", WHEEL_LINES, "units"))
+
+    @property
+    def top_k(self):
+        """The K of the "top K" entry, None to show the whole ranking (or if the entry is not a number)."""
+        try:
+            return parse_top_k(self.top_k_entry.get())
+        except ValueError:
+            return None
+
+    def show(self, ids, header=""):
+        """Show a ranking (IDs from the first to the last), below the optional header text."""
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        if self.top_k is not None:
+            ids = ids[:self.top_k]
+        self._ids = ids
+        self._header = header.splitlines() if header else []
+        self._first = 0
+        self.count_label.config(text=f"Pozycji: {len(ids)}" if len(ids) else "")
+        self._render()
+
+    def show_message(self, text):
+        """Show only a message, without a ranking."""
+        self.show([], text)
+
+    def clear(self):
+        self.show([])
+
+    def _rows(self):
+        return len(self._header) + len(self._ids)
+
+    def _visible_rows(self):
+        return max(1, self.text.winfo_height() // self._line_height)
+
+    def _line(self, row):
+        if row < len(self._header):
+            return self._header[row]
+        position = row - len(self._header)
+        idx = int(self._ids[position])
+        if idx not in self.table:
+            # Deleted from the table after the ranking (see DestinationTable.apply_changes)
+            return f"{position + 1}. (ID {idx} usunięte)"
+        city, country = self.table.label(idx)
+        return f"{position + 1}. {city}, {country}"
+
+    def _scroll(self, action, amount=0, unit=None):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", number, "units" | "pages")
+        if action == "moveto":
+            first = int(float(amount) * self._rows())
+        elif unit == "pages":
+            first = self._first + int(amount) * self._visible_rows()
+        else:
+            first = self._first + int(amount)
+        self._first = max(0, min(first, self._rows() - self._visible_rows()))
+        self._render()
+        return "break"
+
+    def _wheel(self, event):
+        return self._scroll("scroll", -WHEEL_LINES if event.delta > 0 else WHEEL_LINES, "units")
+
+    def _render(self):
+        rows = self._rows()
+        visible = self._visible_rows()
+        self._first = max(0, min(self._first, rows - visible))
+        last = min(rows, self._first + visible)
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, "\n".join(self._line(row) for row in range(self._first, last)))
+        self.text.config(state=tk.DISABLED)
+        if rows:
+            self.scrollbar.set(self._first / rows, last / rows)
+        else:
+            self.scrollbar.set(0, 1)
+
+
+class TreePager:
+    """
+    Shows the rows of a ttk.Treeview one page at a time, with the page buttons in a frame.
+
+    Parameters:
+    tree (ttk.Treeview): the tree, emptied on every page.
+    frame (tk.Misc): parent of the page buttons.
+    number_of_rows (int): number of rows.
+    row_values (callable): values of the row with the given index, called only for the rows of the page.
+    page_size (int): rows per page.
+    """
+
+    def __init__(self, tree, frame, number_of_rows, row_values, page_size=PAGE_SIZE):
+        self.tree = tree
+        self.number_of_rows = number_of_rows
+        self.row_values = row_values
+        self.page_size = page_size
+        self.page = 0
+        self.pages = max(1, -(-number_of_rows // page_size))
+
+        self.previous_button = tk.Button(frame, text="< Poprzednia", command=lambda: self.show_page(self.page - 1))
+        self.previous_button.pack(side=tk.LEFT, padx=5)
+        self.page_label = tk.Label(frame, text="")
+        self.page_label.pack(side=tk.LEFT, padx=5)
+        self.next_button = tk.Button(frame, text="Następna >", command=lambda: self.show_page(self.page + 1))
+        self.next_button.pack(side=tk.LEFT, padx=5)
+        self.show_page(0)
+
+    def show_page(self, page):
+        self.page = max(0, min(page, self.pages - 1))
+        self.tree.delete(*self.tree.get_children())
+        start = self.page * self.page_size
+        for row in range(start, min(start + self.page_size, self.number_of_rows)):
+            self.tree.insert("", "end", values=self.row_values(row))
+
+        self.page_label.config(text=f"Strona {self.page + 1} / {self.pages}")
+        self.previous_button.config(state=tk.NORMAL if self.page > 0 else tk.DISABLED)
+        self.next_button.config(state=tk.NORMAL if self.page < self.pages - 1 else tk.DISABLED)